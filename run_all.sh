@@ -5,8 +5,9 @@ echo " Activating Python virtual environment..."
 source .venv/bin/activate
 
 # Step 1: Generate synthetic data
+# Set DATASET_SEED for a reproducible dataset; seeded runs are cached under data/cache
 echo " Step 1: Generating synthetic data..."
-python scripts/generate_fraud_detection_dataset.py
+python scripts/generate_fraud_detection_dataset.py ${DATASET_SEED:+--seed "$DATASET_SEED"}
 if [ $? -ne 0 ]; then
     echo " Error generating synthetic data. Exiting..."
     exit 1
@@ -0,0 +1,34 @@
+import sys
+import time
+import pandas as pd
+from generate_fraud_detection_dataset import (
+    num_customers, generate_customer_details, generate_policy_details,
+    generate_claim_details, generate_claim_details_batched
+)
+
+# Claim counts to benchmark (override with command-line arguments, e.g. 15000 1000000 10000000)
+claim_sizes = [int(size) for size in sys.argv[1:]] or [15000, 100000, 1000000, 10000000]
+looped_max_claims = 15000  # The row-by-row generator is only timed up to this size
+seed = 42
+
+# Build the dimension tables once
+customer_df = generate_customer_details(num_customers)
+insured_customers = customer_df[customer_df['CUST_TYP'] == 'Insured']
+policy_df = generate_policy_details(insured_customers)
+
+results = []
+for min_claims in claim_sizes:
+    if min_claims <= looped_max_claims:
+        start = time.perf_counter()
+        generate_claim_details(policy_df, customer_df, min_claims=min_claims)
+        elapsed = time.perf_counter() - start
+        results.append(['looped', min_claims, elapsed, min_claims / elapsed])
+
+    start = time.perf_counter()
+    generate_claim_details_batched(policy_df, customer_df, min_claims=min_claims, seed=seed)
+    elapsed = time.perf_counter() - start
+    results.append(['batched', min_claims, elapsed, min_claims / elapsed])
+
+results_df = pd.DataFrame(results, columns=['MODE', 'MIN_CLAIMS', 'SECONDS', 'CLAIMS_PER_SEC'])
+print("\nClaim generation throughput:")
+print(results_df.to_string(index=False, float_format=lambda x: f"{x:,.2f}"))
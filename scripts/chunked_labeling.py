@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from segmented_groups import GroupSegments
+
+
+def entity_index(frame, keys):
+    """Entity key of every row of frame as a MultiIndex (one level per key column)."""
+    return pd.MultiIndex.from_frame(frame[keys])
+
+
+class EntityAggregates:
+    """
+    Values of an engine's grouped intermediates for a file processed in row chunks.
+    A pre-pass over the chunks (add) builds per-entity totals for 'count', 'nunique' and 'sum' trackers, so
+    every chunk later sees the counts of the whole file, exactly as when it is evaluated in memory.
+    'last' trackers (previous row of the entity in file order) need no pre-pass: values carries
+    each entity's last value from one chunk to the next. Memory grows with the number of entities
+    (and distinct values) rather than with the number of rows.
+    """
+
+    def __init__(self, trackers):
+        self.trackers = list(trackers)
+        self.counts = {}
+        self.pairs = {}
+        self.last = {}
+        self.dtypes = {tracker.name: np.int64 for tracker in self.trackers}
+
+    @property
+    def columns(self):
+        """Input columns read by the pre-pass."""
+        names = [name for tracker in self.trackers if tracker.kind != 'last'
+                 for name in tracker.keys + ([tracker.column] if tracker.column else [])]
+        return list(dict.fromkeys(names))
+
+    def add(self, chunk):
+        """Pre-pass: fold a chunk into the per-entity totals."""
+        for tracker in self.trackers:
+            if tracker.kind == 'count':
+                counts = chunk[tracker.keys].value_counts()
+                total = self.counts.get(tracker.name)
+                self.counts[tracker.name] = counts if total is None else total.add(counts, fill_value=0)
+            elif tracker.kind == 'sum':
+                values = chunk[tracker.column]
+                if not (pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values)):
+                    self.dtypes[tracker.name] = np.float64
+                sums = values.groupby([chunk[key] for key in tracker.keys]).sum()
+                if not isinstance(sums.index, pd.MultiIndex):  # Single keys group into a plain Index
+                    sums.index = pd.MultiIndex.from_arrays([sums.index])
+                total = self.counts.get(tracker.name)
+                self.counts[tracker.name] = sums if total is None else total.add(sums, fill_value=0)
+            elif tracker.kind == 'nunique':
+                columns = tracker.keys + [tracker.column]
+                pairs = entity_index(chunk[columns].dropna(), columns).unique()
+                seen = self.pairs.get(tracker.name)
+                self.pairs[tracker.name] = pairs if seen is None else seen.union(pairs)
+
+    def finish(self):
+        """End of the pre-pass: distinct counts per entity."""
+        for tracker in self.trackers:
+            if tracker.kind == 'nunique' and tracker.name in self.pairs:
+                pairs = self.pairs.pop(tracker.name).to_frame(index=False)
+                self.counts[tracker.name] = pairs[tracker.keys].value_counts()
+
+    def values(self, chunk):
+        """Each tracker's values for the rows of a chunk; chunks must be passed in file order."""
+        results = {}
+        for tracker in self.trackers:
+            if tracker.kind != 'last':
+                totals = self.counts.get(tracker.name)
+                if totals is None:
+                    results[tracker.name] = np.zeros(len(chunk), dtype=self.dtypes[tracker.name])
+                else:
+                    totals = totals.reindex(entity_index(chunk, tracker.keys)).fillna(0)
+                    results[tracker.name] = totals.to_numpy(dtype=self.dtypes[tracker.name])
+                continue
+
+            segments = GroupSegments.from_columns([chunk[key] for key in tracker.keys])
+            values = chunk[tracker.column]
+            previous = pd.Series(segments.shift(values), index=chunk.index)
+            last = self.last.get(tracker.name)
+            first_rows = np.flatnonzero(segments.grouped & (segments.previous_positions() < 0))
+            if last is not None and len(first_rows):
+                carried = last.reindex(entity_index(chunk.iloc[first_rows], tracker.keys))
+                previous.iloc[first_rows] = carried.to_numpy(dtype=previous.dtype)
+
+            grouped_rows = np.flatnonzero(segments.grouped)
+            last_rows = np.zeros(segments.num_groups, dtype=np.int64)
+            last_rows[segments.codes[grouped_rows]] = grouped_rows
+            chunk_last = pd.Series(values.iloc[last_rows].to_numpy(),
+                                   index=entity_index(chunk.iloc[last_rows], tracker.keys))
+            last = chunk_last if last is None else pd.concat([last, chunk_last])
+            self.last[tracker.name] = last[~last.index.duplicated(keep='last')]
+            results[tracker.name] = previous
+        return results
+
+
+def evaluate_chunks(engine, path, chunk_size, prepare=None, profile=None, seed=None):
+    """
+    Evaluate engine on a CSV file in chunks of chunk_size rows, yielding (chunk, evaluation) in file
+    order. A first pass reads only the grouping columns to build the EntityAggregates of the engine's
+    grouped rules; the second pass evaluates the row rules chunk by chunk with those aggregates as
+    known values, so results equal evaluating the whole file at once. prepare(chunk) adjusts each
+    chunk after reading (e.g. date parsing) and must accept the pre-pass column subset. Chunks keep
+    their file row labels, so seeded per-row draws match those of the whole file.
+    """
+    aggregates = EntityAggregates(engine.entity_trackers)
+    if aggregates.columns:
+        for chunk in pd.read_csv(path, usecols=aggregates.columns, chunksize=chunk_size):
+            aggregates.add(prepare(chunk) if prepare is not None else chunk)
+        aggregates.finish()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        chunk = prepare(chunk) if prepare is not None else chunk
+        yield chunk, engine.evaluate(chunk, known=aggregates.values(chunk), profile=profile, seed=seed)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from labeling_rules import labeling_engine
+from seeded_draws import claim_key_columns
+
+# Columns of the claim submission table (app/claimsubmissionapp.py) -> unified dataset columns
+submission_columns = {
+    'CLAIM_OCCUR_DATE': 'CLM_OCCR_DT',
+    'CLAIM_REPORT_DATE': 'CLM_RPT_DT',
+    'CLAIM_STATE': 'CLM_OCCR_STATE',
+    'CLAIM_AMOUNT': 'CLM_AMT',
+    'POLICY_START_DATE': 'PLCY_STRT_DT',
+    'POLICY_END_DATE': 'PLCY_END_DT',
+    'POLICY_CLAIM_LIMIT': 'PLCY_CLAIM_LIMIT',
+    'CLAIMANT_STATE': 'CLAIMANT_CUST_STATE',
+    'INSURED_STATE': 'INSURED_CUST_STATE',
+    'MEDICAL_PROVIDER_STATE': 'MEDPROV_CUST_STATE',
+    'CLAIM_NUMBER': 'CLM_NO'
+}
+
+date_columns = ['CLM_OCCR_DT', 'CLM_RPT_DT', 'PLCY_STRT_DT', 'PLCY_END_DT']
+numeric_columns = ['CLM_AMT', 'PLCY_CLAIM_LIMIT', 'DAYS_LOST']
+
+# Seed of the sampled rules (e.g. Fraud_Rule_8), so a claim gets the same insights on every call
+claim_seed = 0
+
+
+def claim_record(claim, columns=None, engine=labeling_engine):
+    """
+    One claim (a dict, Series or one-row DataFrame) as a plain record of the engine's input columns.
+    columns renames source fields to unified names (e.g. submission_columns); dates become Timestamps,
+    amounts floats, and missing fields NaN/NaT so the rules treat them as not matching. Claim
+    identifiers are kept as well, to key the claim's seeded draws.
+    """
+    if isinstance(claim, pd.DataFrame):
+        claim = claim.iloc[0]
+    claim = dict(claim)
+    for source, target in (columns or {}).items():
+        if source in claim:
+            claim[target] = claim.pop(source)
+
+    record = {}
+    for column in list(dict.fromkeys(engine.required_columns + claim_key_columns)):
+        value = claim.get(column)
+        if column in date_columns:
+            value = pd.Timestamp(value) if value is not None and not pd.isna(value) else pd.NaT
+        elif column in numeric_columns:
+            value = float(value) if value is not None and not pd.isna(value) else np.nan
+        elif value is None:
+            value = np.nan
+        record[column] = value
+    return record
+
+
+def evaluate_claim(claim, columns=None, known=None, engine=labeling_engine, seed=claim_seed):
+    """
+    Rules fired by a single claim, in rule order, using the same rule specs as batch labeling.
+    known supplies grouped values (e.g. from an EntityStateStore); without it the claim is judged on its own.
+    Sampled rules draw from seed, keyed by the claim's ID or number, so repeated calls agree.
+    """
+    evaluation = engine.evaluate_record(claim_record(claim, columns, engine), known, seed)
+    return evaluation.fired(engine.rules)
+
+
+def claim_insights(claim, columns=None, known=None, engine=labeling_engine, seed=claim_seed):
+    """Reasons of the rules fired by a single claim, e.g. for display next to a prediction."""
+    return [f"{rule.name}: {rule.description}." for rule in evaluate_claim(claim, columns, known, engine, seed)]
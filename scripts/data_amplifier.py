@@ -0,0 +1,338 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from id_allocator import IdAllocator
+
+# Tables read by the amplifier and their date columns
+amplifier_tables = {
+    'Claim_Additional_Details.csv': ['CLMT_HIRE_DT', 'CLMT_DISAB_BGN_DT'],
+    'Claim_Status_Details.csv': ['CLM_STS_DT'],
+    'Injury_Details.csv': [],
+    'Policy_Details.csv': ['PLCY_STRT_DT', 'PLCY_END_DT']
+}
+
+
+def day_ordinals(dates):
+    """Dates as int64 days since the epoch."""
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+class EmpiricalSampler:
+    """
+    Empirical joint distribution of some columns, conditional on the values of other columns.
+    Fitted rows are grouped by their given-column codes; sampling draws a random fitted row from
+    the group of every requested row, so it reproduces the observed joint distribution within each
+    group. All columns are integer codes (see AmplifierFrame); unseen given combinations fall back
+    to the unconditional distribution.
+    """
+
+    def __init__(self, frame, columns, given=()):
+        self.columns = list(columns)
+        self.given = list(given)
+        self.radix = [frame.vocab_size(col) for col in self.given]
+
+        group_keys = self.group_keys({col: frame.codes[col] for col in self.given}, len(frame))
+        order = np.argsort(group_keys, kind='stable')
+        self.sorted_codes = {col: frame.codes[col][order] for col in self.columns}
+
+        # Dense group key -> (first sorted row, row count); keys never fitted fall back to all rows
+        key_space = int(np.prod(self.radix, dtype=np.int64)) if self.given else 1
+        counts = np.bincount(group_keys, minlength=key_space)
+        self.group_start = np.where(counts > 0, np.cumsum(counts) - counts, 0)
+        self.group_count = np.where(counts > 0, counts, len(frame))
+
+    def group_keys(self, given_codes, count):
+        """Mixed-radix key of the given-column codes of every row."""
+        keys = np.zeros(count, dtype=np.int64)
+        for col, radix in zip(self.given, self.radix):
+            keys = keys * radix + given_codes[col]
+        return keys
+
+    def sample(self, rng, given_codes=None, count=None):
+        """Codes of the sampled columns, one row per entry of given_codes (or count rows)."""
+        if self.given:
+            count = len(given_codes[self.given[0]])
+        keys = self.group_keys(given_codes or {}, count)
+        rows = self.group_start[keys] + (rng.random(count) * self.group_count[keys]).astype(np.int64)
+        return {col: self.sorted_codes[col][rows] for col in self.columns}
+
+
+class AmplifierFrame:
+    """A fitted table stored as per-column integer codes plus each column's distinct values."""
+
+    def __init__(self, df):
+        self.codes = {}
+        self.values = {}
+        for col in df.columns:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            self.codes[col] = codes.astype(np.int64)
+            self.values[col] = np.asarray(uniques)
+
+    def __len__(self):
+        return len(next(iter(self.codes.values())))
+
+    def vocab_size(self, col):
+        return len(self.values[col])
+
+    def decode(self, col, codes):
+        return self.values[col][codes]
+
+
+class DataAmplifier:
+    """
+    Scales the shipped claim, injury, status and policy tables up by vectorized resampling of
+    fitted joint distributions, e.g. fraud -> employment status / status code, severity ->
+    treatment -> days lost and risk level -> premium. Dates are modelled as offsets from an anchor
+    date so they stay mutually consistent, and all IDs are freshly allocated so the generated
+    tables reference each other consistently.
+    """
+
+    def __init__(self, data_dir='data'):
+        tables = {
+            filename: pd.read_csv(os.path.join(data_dir, filename), parse_dates=date_columns)
+            for filename, date_columns in amplifier_tables.items()
+        }
+        self.fit_claims(tables['Claim_Additional_Details.csv'], tables['Claim_Status_Details.csv'])
+        self.fit_injuries(tables['Injury_Details.csv'])
+        self.fit_policies(tables['Policy_Details.csv'])
+
+    def fit_claims(self, additional_details_df, status_df):
+        claims = additional_details_df.merge(status_df, on='CLM_DTL_ID', how='inner')
+        # Claim_Details.csv is not shipped: a claim counts as fraud if any table records a fraud reason
+        self.claim_fraud = (claims['FRAUD_REASON_ADDITIONAL'].notna()
+                            | claims['STATUS_REASON'].str.contains('fraud', case=False)).to_numpy()
+        self.fraud_by_claim = pd.Series(self.claim_fraud.astype(np.int64), index=claims['CLM_DTL_ID'])
+        disability_day = day_ordinals(claims['CLMT_DISAB_BGN_DT'])
+
+        self.additional_columns = [col for col in additional_details_df.columns if col != 'CLM_DTL_ID']
+        self.status_columns = [col for col in status_df.columns if col not in ('CLM_DTL_ID', 'CLM_STS_ID')]
+        self.claims = AmplifierFrame(pd.DataFrame({
+            'CLM_FRAUD_IND': self.claim_fraud.astype(np.int64),
+            'CLMT_DISAB_BGN_DAY': disability_day,
+            'CLMT_HIRE_OFFSET': day_ordinals(claims['CLMT_HIRE_DT']) - disability_day,
+            'CLM_STS_OFFSET': day_ordinals(claims['CLM_STS_DT']) - disability_day,
+            **{col: claims[col] for col in ['CLMT_JOB_TITLE', 'CLMT_JOB_TYP', 'CLMT_AVG_WKLY_WAGE', 'WORK_ENVIRONMENT',
+                                            'EMPLOYMENT_STATUS', 'FRAUD_REASON_ADDITIONAL', 'CLM_STS_CD',
+                                            'STATUS_REASON']}
+        }))
+        self.fraud_sampler = EmpiricalSampler(self.claims, ['CLM_FRAUD_IND'])
+        self.claim_samplers = [
+            EmpiricalSampler(self.claims, ['EMPLOYMENT_STATUS', 'FRAUD_REASON_ADDITIONAL', 'CLM_STS_CD', 'STATUS_REASON'],
+                             given=['CLM_FRAUD_IND']),
+            EmpiricalSampler(self.claims, ['CLMT_JOB_TITLE', 'CLMT_JOB_TYP', 'WORK_ENVIRONMENT']),
+            EmpiricalSampler(self.claims, ['CLMT_AVG_WKLY_WAGE'], given=['FRAUD_REASON_ADDITIONAL']),
+            EmpiricalSampler(self.claims, ['CLMT_DISAB_BGN_DAY']),
+            EmpiricalSampler(self.claims, ['CLMT_HIRE_OFFSET'], given=['FRAUD_REASON_ADDITIONAL']),
+            EmpiricalSampler(self.claims, ['CLM_STS_OFFSET'], given=['CLM_STS_CD', 'FRAUD_REASON_ADDITIONAL'])
+        ]
+
+    def fit_injuries(self, injury_df):
+        fraud = self.fraud_by_claim.reindex(injury_df['CLM_DTL_ID']).fillna(0).to_numpy(dtype=np.int64)
+        self.injury_columns = [col for col in injury_df.columns if col not in ('CLM_INJ_ID', 'CLM_DTL_ID')]
+        self.injuries = AmplifierFrame(injury_df[self.injury_columns].assign(CLM_FRAUD_IND=fraud))
+        self.injury_samplers = [
+            EmpiricalSampler(self.injuries, ['INJURY_SEVERITY', 'TREATMENT_REQUIRED'], given=['CLM_FRAUD_IND']),
+            EmpiricalSampler(self.injuries, ['DAYS_LOST'], given=['INJURY_SEVERITY', 'TREATMENT_REQUIRED']),
+            EmpiricalSampler(self.injuries, ['INJURY_BODY_PART']),
+            EmpiricalSampler(self.injuries, ['INJURY_TYPE'], given=['INJURY_SEVERITY'])
+        ]
+        injuries_per_claim = injury_df['CLM_DTL_ID'].value_counts().reindex(self.fraud_by_claim.index, fill_value=0)
+        self.injury_counts = AmplifierFrame(pd.DataFrame({'INJURY_COUNT': injuries_per_claim.to_numpy()}))
+        self.injury_count_sampler = EmpiricalSampler(self.injury_counts, ['INJURY_COUNT'])
+
+    def fit_policies(self, policy_df):
+        policy_df = policy_df.sort_values(['CUST_ID', 'PLCY_STRT_DT'], kind='stable')
+        self.policy_columns = list(policy_df.columns)
+        first_policy = ~policy_df['CUST_ID'].duplicated().to_numpy()
+
+        # Customer profile: policy count, first start date and the per-customer constant columns
+        customers = policy_df[first_policy]
+        self.policy_customers = AmplifierFrame(pd.DataFrame({
+            'POLICY_COUNT': policy_df['CUST_ID'].value_counts().reindex(customers['CUST_ID']).to_numpy(),
+            'FIRST_STRT_DAY': day_ordinals(customers['PLCY_STRT_DT']),
+            **{col: customers[col].to_numpy() for col in ['RISK_LEVEL', 'PLCY_CLAIM_LIMIT', 'BUSINESS_TYPE']}
+        }))
+        self.policy_customer_samplers = [
+            EmpiricalSampler(self.policy_customers, ['POLICY_COUNT', 'FIRST_STRT_DAY']),
+            EmpiricalSampler(self.policy_customers, ['RISK_LEVEL', 'PLCY_CLAIM_LIMIT', 'BUSINESS_TYPE'])
+        ]
+
+        # Policy terms: length, gap to the previous term, payment status and premium by risk level
+        start_day = day_ordinals(policy_df['PLCY_STRT_DT'])
+        end_day = day_ordinals(policy_df['PLCY_END_DT'])
+        renewals = np.flatnonzero(~first_policy)
+        gap = start_day[renewals] - end_day[renewals - 1]
+        self.policies = AmplifierFrame(pd.DataFrame({
+            'TERM_DAYS': end_day - start_day,
+            **{col: policy_df[col].to_numpy() for col in ['RISK_LEVEL', 'PLCY_PAYMENT_STATUS', 'PLCY_PREMIUM_AMT']}
+        }))
+        self.policy_gaps = AmplifierFrame(pd.DataFrame({'GAP_DAYS': gap if len(gap) else np.ones(1, dtype=np.int64)}))
+        self.policy_samplers = [
+            EmpiricalSampler(self.policies, ['TERM_DAYS']),
+            EmpiricalSampler(self.policies, ['PLCY_PAYMENT_STATUS', 'PLCY_PREMIUM_AMT'], given=['RISK_LEVEL'])
+        ]
+        self.policy_gap_sampler = EmpiricalSampler(self.policy_gaps, ['GAP_DAYS'])
+
+    def sample_claims(self, num_claims, rng, claim_id_start=11001, injury_id_start=21001, status_id_allocator=None,
+                      fraud_percentage=None):
+        """
+        Sample num_claims claims. Returns (additional_details_df, status_df, injury_df) linked by CLM_DTL_ID.
+        fraud_percentage overrides the fitted fraud rate.
+        """
+        claim_ids = np.arange(claim_id_start, claim_id_start + num_claims, dtype=np.int64)
+        if fraud_percentage is None:
+            fraud_codes = self.fraud_sampler.sample(rng, count=num_claims)['CLM_FRAUD_IND']
+        else:
+            fraud_values = (rng.random(num_claims) < fraud_percentage).astype(np.int64)
+            fraud_codes = pd.Index(self.claims.values['CLM_FRAUD_IND']).get_indexer(fraud_values)
+            fraud_codes = np.where(fraud_codes < 0, 0, fraud_codes)
+        codes = {'CLM_FRAUD_IND': fraud_codes}
+        for sampler in self.claim_samplers:
+            codes.update(sampler.sample(rng, codes, num_claims))
+
+        decoded = {col: self.claims.decode(col, col_codes) for col, col_codes in codes.items()}
+        disability_day = decoded['CLMT_DISAB_BGN_DAY'].astype(np.int64)
+        dates = {
+            'CLMT_DISAB_BGN_DT': disability_day,
+            'CLMT_HIRE_DT': disability_day + decoded['CLMT_HIRE_OFFSET'].astype(np.int64),
+            'CLM_STS_DT': disability_day + decoded['CLM_STS_OFFSET'].astype(np.int64)
+        }
+        decoded.update({col: days.astype('datetime64[D]') for col, days in dates.items()})
+
+        additional_details_df = pd.DataFrame({'CLM_DTL_ID': claim_ids,
+                                              **{col: decoded[col] for col in self.additional_columns}})
+        if status_id_allocator is None:
+            status_id_allocator = IdAllocator(11110000, 11110000 + max(90000, num_claims), seed=int(rng.integers(2 ** 63)))
+        status_df = pd.DataFrame({'CLM_DTL_ID': claim_ids, 'CLM_STS_ID': status_id_allocator.allocate(num_claims),
+                                  **{col: decoded[col] for col in self.status_columns}})
+
+        # Injuries: a fitted number per claim, their severity conditioned on the claim's fraud flag
+        injury_counts = self.injury_counts.decode(
+            'INJURY_COUNT', self.injury_count_sampler.sample(rng, count=num_claims)['INJURY_COUNT']).astype(np.int64)
+        claim_rows = np.repeat(np.arange(num_claims), injury_counts)
+        injury_fraud = pd.Index(self.injuries.values['CLM_FRAUD_IND']).get_indexer(
+            decoded['CLM_FRAUD_IND'].astype(np.int64)[claim_rows])
+        injury_codes = {'CLM_FRAUD_IND': np.where(injury_fraud < 0, 0, injury_fraud)}
+        for sampler in self.injury_samplers:
+            injury_codes.update(sampler.sample(rng, injury_codes, len(claim_rows)))
+        injury_df = pd.DataFrame({
+            'CLM_INJ_ID': np.arange(injury_id_start, injury_id_start + len(claim_rows), dtype=np.int64),
+            'CLM_DTL_ID': claim_ids[claim_rows],
+            **{col: self.injuries.decode(col, injury_codes[col]) for col in self.injury_columns}
+        })
+        return additional_details_df, status_df, injury_df
+
+    def sample_policies(self, num_customers, rng, customer_id_start=1, policy_id_start=1001,
+                        policy_number_allocator=None):
+        """Sample the policy histories of num_customers insured customers with consecutive CUST_IDs."""
+        customer_codes = {}
+        for sampler in self.policy_customer_samplers:
+            customer_codes.update(sampler.sample(rng, count=num_customers))
+        customer = {col: self.policy_customers.decode(col, codes) for col, codes in customer_codes.items()}
+        policy_counts = customer['POLICY_COUNT'].astype(np.int64)
+        customer_rows = np.repeat(np.arange(num_customers), policy_counts)
+        num_policies = len(customer_rows)
+
+        risk_codes = pd.Index(self.policies.values['RISK_LEVEL']).get_indexer(customer['RISK_LEVEL'][customer_rows])
+        policy_codes = {'RISK_LEVEL': np.where(risk_codes < 0, 0, risk_codes)}
+        for sampler in self.policy_samplers:
+            policy_codes.update(sampler.sample(rng, policy_codes, num_policies))
+        term_days = self.policies.decode('TERM_DAYS', policy_codes['TERM_DAYS']).astype(np.int64)
+        gap_days = self.policy_gaps.decode(
+            'GAP_DAYS', self.policy_gap_sampler.sample(rng, count=num_policies)['GAP_DAYS']).astype(np.int64)
+
+        # Consecutive terms: each start is the customer's first start plus all earlier terms and gaps
+        first_rows = np.cumsum(policy_counts) - policy_counts
+        step = np.concatenate([[0], (term_days + gap_days)[:-1]])
+        elapsed = np.cumsum(step)
+        elapsed -= np.repeat(elapsed[first_rows], policy_counts)
+        start_day = customer['FIRST_STRT_DAY'].astype(np.int64)[customer_rows] + elapsed
+
+        if policy_number_allocator is None:
+            digits = max(7, len(str(num_policies)) + 1)
+            policy_number_allocator = IdAllocator(10 ** (digits - 1), 10 ** digits, seed=int(rng.integers(2 ** 63)))
+        policy_df = pd.DataFrame({
+            'PLCY_DTL_ID': np.arange(policy_id_start, policy_id_start + num_policies, dtype=np.int64),
+            'CUST_ID': customer_id_start + customer_rows,
+            'PLCY_NO': 'COF' + pd.Series(policy_number_allocator.allocate(num_policies)).astype(str),
+            'PLCY_STRT_DT': start_day.astype('datetime64[D]'),
+            'PLCY_END_DT': (start_day + term_days).astype('datetime64[D]'),
+            'PLCY_PREMIUM_AMT': self.policies.decode('PLCY_PREMIUM_AMT', policy_codes['PLCY_PREMIUM_AMT']),
+            'PLCY_PAYMENT_STATUS': self.policies.decode('PLCY_PAYMENT_STATUS', policy_codes['PLCY_PAYMENT_STATUS']),
+            'PLCY_CLAIM_LIMIT': customer['PLCY_CLAIM_LIMIT'][customer_rows],
+            'RISK_LEVEL': customer['RISK_LEVEL'][customer_rows],
+            'BUSINESS_TYPE': customer['BUSINESS_TYPE'][customer_rows]
+        })
+        return policy_df[self.policy_columns]
+
+
+def amplify(num_claims, num_policy_customers=0, data_dir='data', output_dir=os.path.join('data', 'amplified'),
+            chunk_size=1000000, fraud_percentage=None, seed=None):
+    """
+    Fit the amplifier on the tables in data_dir and write num_claims amplified claims (additional
+    details, status, injuries) and the policies of num_policy_customers insured customers to
+    output_dir, in chunks of chunk_size so memory stays bounded.
+    """
+    rng = np.random.default_rng(seed)
+    print(f"Fitting amplifier on {data_dir}...")
+    amplifier = DataAmplifier(data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = {name: os.path.join(output_dir, name) for name in amplifier_tables}
+    for filepath in output_files.values():
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    def append(dataframe, filename):
+        filepath = output_files[filename]
+        dataframe.to_csv(filepath, mode='a', header=not os.path.exists(filepath), index=False)
+
+    status_id_allocator = IdAllocator(11110000, 11110000 + max(90000, num_claims), seed=int(rng.integers(2 ** 63)))
+    injury_id = 21001
+    sampling_seconds = 0.0
+    for chunk_start in range(0, num_claims, chunk_size):
+        chunk_claims = min(chunk_size, num_claims - chunk_start)
+        start = time.perf_counter()
+        additional_details_df, status_df, injury_df = amplifier.sample_claims(
+            chunk_claims, rng, claim_id_start=11001 + chunk_start, injury_id_start=injury_id,
+            status_id_allocator=status_id_allocator, fraud_percentage=fraud_percentage)
+        sampling_seconds += time.perf_counter() - start
+        injury_id += len(injury_df)
+        append(additional_details_df, 'Claim_Additional_Details.csv')
+        append(status_df, 'Claim_Status_Details.csv')
+        append(injury_df, 'Injury_Details.csv')
+        print(f"Amplified {chunk_start + chunk_claims}/{num_claims} claims.")
+    if num_claims:
+        print(f"Claim sampling rate: {num_claims / sampling_seconds:,.0f} claims/s")
+
+    max_policies = num_policy_customers * int(amplifier.policy_customers.values['POLICY_COUNT'].max())
+    policy_number_digits = max(7, len(str(max_policies)) + 1)
+    policy_number_allocator = IdAllocator(10 ** (policy_number_digits - 1), 10 ** policy_number_digits,
+                                          seed=int(rng.integers(2 ** 63)))
+    policy_id = 1001
+    for chunk_start in range(0, num_policy_customers, chunk_size):
+        chunk_customers = min(chunk_size, num_policy_customers - chunk_start)
+        policy_df = amplifier.sample_policies(chunk_customers, rng, customer_id_start=1 + chunk_start,
+                                              policy_id_start=policy_id, policy_number_allocator=policy_number_allocator)
+        policy_id += len(policy_df)
+        append(policy_df, 'Policy_Details.csv')
+        print(f"Amplified policies of {chunk_start + chunk_customers}/{num_policy_customers} customers.")
+
+    print(f"Amplified dataset written to {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scale the shipped CSVs up by resampling fitted distributions.")
+    parser.add_argument('--claims', type=int, default=1000000, help="Number of claims to generate")
+    parser.add_argument('--policy-customers', type=int, default=0,
+                        help="Number of insured customers whose policy histories to generate")
+    parser.add_argument('--data-dir', default='data', help="Directory with the CSVs to fit")
+    parser.add_argument('--output-dir', default=os.path.join('data', 'amplified'), help="Output directory")
+    parser.add_argument('--chunk-size', type=int, default=1000000, help="Rows sampled and written per chunk")
+    parser.add_argument('--fraud-percentage', type=float, default=None, help="Override the fitted fraud rate")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible output")
+    args = parser.parse_args()
+
+    amplify(args.claims, args.policy_customers, data_dir=args.data_dir, output_dir=args.output_dir,
+            chunk_size=args.chunk_size, fraud_percentage=args.fraud_percentage, seed=args.seed)
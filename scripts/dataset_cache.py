@@ -0,0 +1,69 @@
+import os
+import json
+import shutil
+import hashlib
+
+# Default on-disk location of cached generator outputs
+CACHE_DIR = os.path.join('data', 'cache')
+MANIFEST_FILE = 'manifest.json'
+
+
+def source_fingerprint(source_files):
+    """Hash of the generator source files, so code changes invalidate cached outputs."""
+    digest = hashlib.sha256()
+    for source_file in sorted(source_files):
+        with open(source_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(params, source_files):
+    """Content address of a generator run: seed and parameters plus the generator source."""
+    payload = json.dumps({'params': params, 'source': source_fingerprint(source_files)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_entry_dir(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key)
+
+
+def copy_output(source, destination):
+    """Copy a file or a whole directory tree, replacing whatever is at the destination."""
+    if os.path.isdir(destination):
+        shutil.rmtree(destination)
+    if os.path.isdir(source):
+        shutil.copytree(source, destination)
+    else:
+        os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+        shutil.copyfile(source, destination)
+
+
+def load_cached_outputs(key, data_dir, cache_dir=CACHE_DIR):
+    """Restore a cached run into data_dir. Returns False if the key is not cached."""
+    entry_dir = cache_entry_dir(key, cache_dir)
+    manifest_path = os.path.join(entry_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    for output in manifest['outputs']:
+        copy_output(os.path.join(entry_dir, output), os.path.join(data_dir, output))
+    print(f"Loaded cached dataset {key} ({len(manifest['outputs'])} outputs) into {data_dir}")
+    return True
+
+
+def store_outputs(key, data_dir, outputs, params, cache_dir=CACHE_DIR):
+    """Copy a finished run's outputs (paths relative to data_dir) into the cache under key."""
+    entry_dir = cache_entry_dir(key, cache_dir)
+    if os.path.isdir(entry_dir):
+        shutil.rmtree(entry_dir)
+    os.makedirs(entry_dir)
+
+    for output in outputs:
+        copy_output(os.path.join(data_dir, output), os.path.join(entry_dir, output))
+
+    # The manifest is written last, so an interrupted store never looks like a cache hit
+    with open(os.path.join(entry_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({'key': key, 'params': params, 'outputs': outputs}, f, indent=2, default=str)
+    print(f"Cached dataset {key} in {entry_dir}")
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+class DimensionIndex:
+    """
+    Row-position index over a dimension table with a unique key column.
+    Integer keys resolve through a dense key -> position array, other keys through a hash index.
+    Only the projected columns are kept, so lookups never materialize unused columns.
+    """
+
+    def __init__(self, table, key, columns):
+        keys = table[key]
+        if not keys.is_unique:
+            raise ValueError(f"Dimension key '{key}' is not unique")
+        self.key = key
+        self.table = table[list(columns)].reset_index(drop=True)
+
+        if pd.api.types.is_integer_dtype(keys) and len(keys) and keys.min() >= 0:
+            key_values = keys.to_numpy(dtype=np.int64)
+            self.positions = np.full(key_values.max() + 1, -1, dtype=np.int64)
+            self.positions[key_values] = np.arange(len(key_values))
+            self.key_index = None
+        else:
+            self.positions = None
+            self.key_index = pd.Index(keys)
+
+    def lookup(self, keys):
+        """Row positions for the given keys; -1 where a key is missing."""
+        if self.key_index is not None:
+            return self.key_index.get_indexer(keys)
+        keys = pd.to_numeric(pd.Series(keys), errors='coerce').to_numpy(dtype=float)
+        known = ~np.isnan(keys) & (keys >= 0) & (keys < len(self.positions))
+        positions = np.full(len(keys), -1, dtype=np.int64)
+        positions[known] = self.positions[keys[known].astype(np.int64)]
+        return positions
+
+    def take(self, positions, prefix='', columns=None):
+        """Projected rows at the given positions (missing rows as NA), with optional column prefix."""
+        table = self.table if columns is None else self.table[list(columns)]
+        return take_rows(table, positions, prefix)
+
+
+def take_rows(table, positions, prefix=''):
+    """Gather table rows by position with left-join semantics: position -1 yields NA values."""
+    positions = np.asarray(positions, dtype=np.int64)
+    allow_fill = bool((positions < 0).any())
+    return pd.DataFrame({
+        f"{prefix}{column}": pd.api.extensions.take(column_values(table[column]), positions, allow_fill=allow_fill)
+        for column in table.columns
+    })
+
+
+def column_values(series):
+    """Underlying values of a column: the extension array for extension dtypes, else a NumPy array."""
+    if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        return series.array
+    return series.to_numpy()
+
+
+def expand_one_to_many(parent_positions, num_parents):
+    """
+    Row layout of a left join against a one-to-many child table.
+    parent_positions gives the parent row of each child row (-1 if it has no parent).
+    Returns (parent_rows, child_rows): every parent in order, repeated once per child
+    (or once with child position -1 when it has none), children kept in their table order.
+    """
+    parent_positions = np.asarray(parent_positions, dtype=np.int64)
+    matched = np.flatnonzero(parent_positions >= 0)
+    child_order = matched[np.argsort(parent_positions[matched], kind='stable')]
+    child_counts = np.bincount(parent_positions[matched], minlength=num_parents)
+
+    row_counts = np.maximum(child_counts, 1)
+    parent_rows = np.repeat(np.arange(num_parents), row_counts)
+    child_rows = np.full(len(parent_rows), -1, dtype=np.int64)
+    child_rows[np.repeat(child_counts > 0, row_counts)] = child_order
+    return parent_rows, child_rows
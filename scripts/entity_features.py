@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from entity_state import EntityStateStore, EntityTracker
+from holiday_calendar import calendar_covering
+
+# Snapshot of the per-entity aggregates, read when scoring single claims
+ENTITY_FEATURES_FILE = 'models/entity_feature_store.pkl'
+
+# Per-entity aggregates of the claims (counts, sums and tallies), keyed by customer ID
+entity_feature_trackers = [
+    EntityTracker('CLAIMANT_CLAIM_COUNT', 'count', ['CUST_ID_CLAIMANT']),
+    EntityTracker('PROVIDER_CLAIM_COUNT', 'count', ['CUST_ID_MED_PROV']),
+    EntityTracker('INSURED_CLAIM_COUNT', 'count', ['CUST_ID_INSURED']),
+    EntityTracker('CLAIMANT_SAME_DAY_CLAIMS', 'count', ['CUST_ID_CLAIMANT', 'CLM_OCCR_DT']),
+    EntityTracker('PROVIDER_WEEKEND_CLAIMS', 'sum', ['CUST_ID_MED_PROV'], 'REPORTED_ON_WEEKEND'),
+    EntityTracker('CLAIMANT_LATE_CLAIMS', 'sum', ['CUST_ID_CLAIMANT'], 'REPORTED_LATE'),
+    EntityTracker('CLAIMANT_TOTAL_CLAIM_AMOUNT', 'sum', ['CUST_ID_CLAIMANT'], 'CLM_AMT')
+]
+
+tracked_columns = ['CUST_ID_CLAIMANT', 'CUST_ID_MED_PROV', 'CUST_ID_INSURED', 'CLM_OCCR_DT', 'CLM_RPT_DT', 'CLM_AMT']
+
+
+def tracked_frame(df):
+    """The columns the trackers read: entity keys and amounts, plus the 0/1 weekend and late-report tallies."""
+    frame = df.reindex(columns=tracked_columns)
+    for column in ['CLM_OCCR_DT', 'CLM_RPT_DT']:
+        frame[column] = pd.to_datetime(frame[column], errors='coerce')
+    frame['CLM_AMT'] = pd.to_numeric(frame['CLM_AMT'], errors='coerce')
+    report_dates = frame['CLM_RPT_DT']
+    frame['REPORTED_ON_WEEKEND'] = calendar_covering(report_dates).is_weekend(report_dates).astype(int)
+    frame['REPORTED_LATE'] = ((report_dates - frame['CLM_OCCR_DT']).dt.days > 30).astype(int)
+    return frame
+
+
+def own_claim_values(frame, values):
+    """
+    Rows with a missing entity key are an entity of their own: count 1 and the row's own sum, rather
+    than the 0 the store gives rows it cannot group.
+    """
+    values = dict(values)
+    for tracker in entity_feature_trackers:
+        missing = frame[tracker.keys].isna().any(axis=1).to_numpy()
+        if missing.any():
+            own = 1 if tracker.kind == 'count' else frame[tracker.column].fillna(0).to_numpy()
+            values[tracker.name] = np.where(missing, own, values[tracker.name])
+    return values
+
+
+def entity_feature_columns(values):
+    """Feature columns from the tracker values (entity totals including each row's own claim)."""
+    features = {name: values[name] for name in values if name != 'CLAIMANT_SAME_DAY_CLAIMS'}
+    features['MULTIPLE_SAME_DAY_CLAIMS'] = np.asarray(values['CLAIMANT_SAME_DAY_CLAIMS']) > 1
+    return features
+
+
+def entity_features(store, df):
+    """
+    Per-entity feature columns for the rows of df, which are added to the store: built from scratch
+    for a full dataset, or updated incrementally with a newly arrived batch.
+    """
+    frame = tracked_frame(df)
+    return pd.DataFrame(entity_feature_columns(own_claim_values(frame, store.apply(frame))), index=df.index)
+
+
+def update_entity_features(batch, path=ENTITY_FEATURES_FILE):
+    """Fold a new claim batch into the persisted feature store; returns the batch's entity features."""
+    store = EntityStateStore.restore(path, entity_feature_trackers)
+    features = entity_features(store, batch)
+    store.snapshot(path)
+    return features
+
+
+def claim_entity_features(store, claim, columns=None):
+    """
+    Entity features of a single claim (a dict, Series or one-row DataFrame) for scoring, looked up in
+    the store as if the claim were appended to it (the store is not changed). columns renames source
+    fields to unified names. The store only adds history for the IDs the claim carries: an aggregate
+    whose customer ID is missing gets the values of the claim by itself (count 1, its own sum).
+    """
+    claim = pd.DataFrame([claim.iloc[0] if isinstance(claim, pd.DataFrame) else dict(claim)])
+    frame = tracked_frame(claim.rename(columns=columns or {}))
+    values = own_claim_values(frame, store.record_values(frame.iloc[0].to_dict()))
+    return {name: np.asarray(value).item() for name, value in entity_feature_columns(values).items()}
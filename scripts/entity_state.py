@@ -0,0 +1,170 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from segmented_groups import GroupSegments
+
+
+class EntityTracker:
+    """
+    Per-entity state kept across batches for one grouped value of the rules, e.g. the claimant's
+    claim count or the insured's previous claim amount. kind is 'count' (rows so far), 'nunique'
+    (distinct non-missing values of column so far), 'sum' (total of column so far, e.g. a tally of a
+    0/1 column) or 'last' (column of the previous row of the entity, in arrival order); keys are the
+    entity key columns.
+    """
+
+    def __init__(self, name, kind, keys, column=None):
+        if kind not in ('count', 'nunique', 'sum', 'last'):
+            raise ValueError(f"Unknown entity state kind '{kind}'")
+        self.name = name
+        self.kind = kind
+        self.keys = list(keys)
+        self.column = column
+
+    def record_value(self, record):
+        """Value for a single claim record evaluated on its own, without any other claims of its entity."""
+        if self.kind == 'last':
+            value = record[self.column]
+            return pd.NaT if isinstance(value, pd.Timestamp) or value is pd.NaT else np.nan
+        if any(pd.isna(record[key]) for key in self.keys):
+            return 0
+        if self.kind == 'sum':
+            return record[self.column] if not pd.isna(record[self.column]) else 0
+        return 1 if self.kind == 'count' or not pd.isna(record[self.column]) else 0
+
+
+class EntityStateStore:
+    """
+    Persistent per-entity state (running counts, distinct values, last values per claimant, insured,
+    provider, ...) for labeling newly arrived claims incrementally.
+    apply(batch) returns each tracker's values for the batch's rows as if the batch were appended to
+    every claim seen so far, and folds the batch into the state. The work is proportional to the batch:
+    the batch is grouped once per tracker and only the entities it touches are read and updated.
+    snapshot/restore persist the state, so a restart resumes without replaying the history.
+
+    Counts and distinct counts cover the claims seen so far, so a claim is not re-flagged when a later
+    batch pushes its entity over a threshold; labels of the latest claims match a full relabel.
+    """
+
+    def __init__(self, trackers=()):
+        self.trackers = {tracker.name: tracker for tracker in trackers}
+        self.state = {name: {} for name in self.trackers}
+        self.rows_seen = 0
+
+    def entity_keys(self, df, tracker, segments):
+        """Key of each group of the batch (as a tuple of plain Python values), in group code order."""
+        first_rows = np.full(segments.num_groups, -1, dtype=np.int64)
+        grouped_rows = np.flatnonzero(segments.grouped)
+        first_rows[segments.codes[grouped_rows[::-1]]] = grouped_rows[::-1]
+        present = first_rows >= 0  # Combined codes may skip values
+        columns = [df[key].iloc[first_rows[present]].tolist() for key in tracker.keys]
+        keys = [None] * segments.num_groups
+        for code, key in zip(np.flatnonzero(present), zip(*columns)):
+            keys[code] = key
+        return keys
+
+    def lookup(self, df, tracker, segments, keys, update):
+        state = self.state[tracker.name]
+        sizes = segments.sizes()
+
+        if tracker.kind == 'count':
+            counts = np.array([state.get(key, 0) if key is not None else 0 for key in keys], dtype=np.int64) + sizes
+            if update:
+                state.update((key, int(count)) for key, count in zip(keys, counts) if key is not None)
+            return segments.broadcast(counts)
+
+        if tracker.kind == 'sum':
+            sums = segments.sums(df[tracker.column])
+            sums = sums + np.array([state.get(key, 0) if key is not None else 0 for key in keys], dtype=sums.dtype)
+            if update:
+                state.update((key, sum_value.item()) for key, sum_value in zip(keys, sums) if key is not None)
+            return segments.broadcast(sums)
+
+        if tracker.kind == 'nunique':
+            values = df[tracker.column]
+            rows = segments.grouped & values.notna().to_numpy()
+            distinct = {key: set(state.get(key, ())) for key in keys if key is not None}
+            for code, value in zip(segments.codes[rows], values[rows].tolist()):
+                distinct[keys[code]].add(value)
+            if update:
+                state.update(distinct)
+            return segments.broadcast(np.array([len(distinct[key]) if key is not None else 0 for key in keys],
+                                                dtype=np.int64))
+
+        # 'last': the previous row within the batch, or the entity's last value from earlier batches
+        values = df[tracker.column]
+        previous = pd.Series(segments.shift(values), index=df.index)
+        first_rows = np.flatnonzero(segments.grouped & (segments.previous_positions() < 0))
+        history = [state.get(keys[code]) for code in segments.codes[first_rows]]
+        if any(value is not None for value in history):
+            previous.iloc[first_rows] = pd.Series(history, dtype=previous.dtype).to_numpy()
+        if update:
+            last_rows = np.zeros(segments.num_groups, dtype=np.int64)
+            grouped_rows = np.flatnonzero(segments.grouped)
+            last_rows[segments.codes[grouped_rows]] = grouped_rows
+            last_values = values.iloc[last_rows].tolist()
+            state.update((key, value) for key, value in zip(keys, last_values) if key is not None)
+        return previous
+
+    def values(self, df, update=False):
+        """Each tracker's values for the rows of df, keyed by tracker name; update folds df into the state."""
+        results = {}
+        for tracker in self.trackers.values():
+            segments = GroupSegments.from_columns([df[key] for key in tracker.keys])
+            keys = self.entity_keys(df, tracker, segments)
+            results[tracker.name] = self.lookup(df, tracker, segments, keys, update)
+        if update:
+            self.rows_seen += len(df)
+        return results
+
+    def apply(self, df):
+        """Values for a newly arrived batch (rows in arrival order), which is then added to the state."""
+        return self.values(df, update=True)
+
+    def record_values(self, record):
+        """
+        Each tracker's value for a single claim record (a mapping of column -> scalar) as if it were
+        appended to the claims seen so far, without changing the state: one dictionary lookup per tracker.
+        """
+        results = {}
+        for name, tracker in self.trackers.items():
+            key = tuple(record[column] for column in tracker.keys)
+            state = self.state[name]
+            if any(pd.isna(value) for value in key) or key not in state:
+                results[name] = tracker.record_value(record)
+            elif tracker.kind == 'count':
+                results[name] = state[key] + 1
+            elif tracker.kind == 'sum':
+                results[name] = state[key] + tracker.record_value(record)
+            elif tracker.kind == 'nunique':
+                value = record[tracker.column]
+                results[name] = len(state[key] | ({value} if not pd.isna(value) else set()))
+            else:
+                results[name] = state[key]
+        return results
+
+    def snapshot(self, path):
+        """Write the state to path; the previous snapshot is replaced only once the new one is complete."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump({'trackers': {name: (tracker.kind, tracker.keys, tracker.column)
+                                      for name, tracker in self.trackers.items()},
+                         'state': self.state, 'rows_seen': self.rows_seen}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def restore(cls, path, trackers):
+        """Store for trackers with the state saved at path (an empty state if there is no snapshot yet)."""
+        store = cls(trackers)
+        if not os.path.exists(path):
+            return store
+        with open(path, 'rb') as f:
+            saved = pickle.load(f)
+        for name, tracker in store.trackers.items():
+            if saved['trackers'].get(name) != (tracker.kind, tracker.keys, tracker.column):
+                raise ValueError(f"Snapshot {path} has no state for '{name}'; rebuild it from the full history")
+            store.state[name] = saved['state'][name]
+        store.rows_seen = saved['rows_seen']
+        return store
@@ -1,40 +1,21 @@
 import pandas as pd
-import holidays
+from entity_features import ENTITY_FEATURES_FILE, entity_feature_trackers, entity_features
+from entity_state import EntityStateStore
+from holiday_calendar import calendar_covering
+from labeling_rules import labeling_rule_names
+from lookup_encoders import LookupEncoder, apply_encoders, save_encoders
+from rule_bitmask import popcount
+from state_geometry import us_state_geometry
+from time_windows import EntityTimeline
 
 #  File Paths
 CLEANED_FILE = 'data/Cleaned_Unified_Customer_Policy_Claim_Details.csv'
 FEATURED_FILE = 'data/Featured_Unified_Customer_Policy_Claim_Details.csv'
+FEATURE_ENCODERS_FILE = 'models/feature_encoders.json'
+
+#  Windows (days up to and including the claim's occurrence date) of the claimant claim counts
+CLAIM_COUNT_WINDOWS = [30, 90, 365]
 
-#  Neighboring State Logic (State Adjacency List)
-neighboring_states = {
-    'NY': ['NJ', 'CT', 'PA', 'MA', 'VT'],
-    'NJ': ['NY', 'PA', 'DE'],
-    'CA': ['OR', 'NV', 'AZ'],
-    'NV': ['CA', 'AZ', 'UT', 'ID'],
-    'PA': ['NY', 'NJ', 'OH', 'MD', 'DE', 'WV'],
-    'CT': ['NY', 'MA', 'RI'],
-    'MA': ['CT', 'NY', 'VT', 'NH'],
-    'OH': ['PA', 'MI', 'IN', 'KY', 'WV'],
-    'MI': ['OH', 'IN', 'WI'],
-    'FL': ['GA', 'AL'],
-    'TX': ['NM', 'OK', 'AR', 'LA'],
-    'IL': ['IN', 'WI', 'IA', 'MO', 'KY'],
-    'WA': ['OR', 'ID'],
-    'OR': ['CA', 'WA', 'NV', 'ID'],
-    'GA': ['FL', 'AL', 'TN', 'NC', 'SC'],
-    'NC': ['GA', 'SC', 'TN', 'VA'],
-    'SC': ['GA', 'NC'],
-    'VA': ['NC', 'TN', 'KY', 'WV', 'MD'],
-    'MD': ['VA', 'DE', 'PA', 'WV'],
-    'DE': ['MD', 'PA', 'NJ'],
-    'AZ': ['CA', 'NV', 'UT', 'NM'],
-    'UT': ['NV', 'CO', 'WY', 'ID', 'AZ'],
-    'CO': ['UT', 'NM', 'WY', 'NE', 'KS', 'OK'],
-    'NM': ['AZ', 'CO', 'TX', 'OK'],
-    'WV': ['OH', 'PA', 'MD', 'VA', 'KY'],
-    'KY': ['IL', 'IN', 'OH', 'WV', 'VA', 'TN', 'MO'],
-    'TN': ['KY', 'VA', 'NC', 'GA', 'AL', 'MS', 'AR', 'MO']
-}
 #  Injury Type Risk Mapping
 injury_risk_mapping = {
     'High': [ 'Burn', 'Amputation', 'Concussion',
@@ -51,6 +32,25 @@ body_part_risk_mapping = {
     'Low': ['Hand', 'Foot', 'Ankle', 'Fingers', 'Toes', 'Elbow', 'Knee', 'Wrist']
 }
 
+#  Risk level of each group: High = 3, Medium = 2, Low = 1 (0 for unknown values)
+risk_levels = {'High': 3, 'Medium': 2, 'Low': 1}
+injury_type_risk = LookupEncoder.from_groups('INJURY_TYPE', injury_risk_mapping, risk_levels)
+body_part_risk = LookupEncoder.from_groups('INJURY_BODY_PART', body_part_risk_mapping, risk_levels)
+
+def is_high_risk(levels):
+    return (levels == risk_levels['High']).astype(int)
+
+# Categorical features compiled to lookup tables; saved for encoding single claims when serving
+risk_level_encoders = {
+    'INJURY_TYPE_RISK_LEVEL': injury_type_risk,
+    'INJURY_BODY_PART_RISK_LEVEL': body_part_risk
+}
+high_risk_flag_encoders = {
+    'HIGH_RISK_BODY_PART_FLAG': body_part_risk.derive(is_high_risk),
+    'HIGH_RISK_INJURY_TYPE_FLAG': injury_type_risk.derive(is_high_risk)
+}
+feature_encoders = {**risk_level_encoders, **high_risk_flag_encoders}
+
 
 #  Load Data
 print("Loading cleaned dataset...")
@@ -63,32 +63,24 @@ df['DAYS_TO_POLICY_END'] = (df['PLCY_END_DT'] - df['CLM_OCCR_DT']).dt.days
 df['DAYS_FROM_POLICY_START'] = (df['CLM_OCCR_DT'] - df['PLCY_STRT_DT']).dt.days
 df['REPORT_HOUR'] = df['CLM_RPT_DT'].dt.hour
 df['REPORT_DAY_OF_WEEK'] = df['CLM_RPT_DT'].dt.dayofweek  # 0 = Monday, 6 = Sunday
-df['WEEKEND_CLAIM'] = df['REPORT_DAY_OF_WEEK'].apply(lambda x: 1 if x in [5, 6] else 0)
 
-# Dynamic holiday logic
-us_holidays = holidays.US()
-df['HOLIDAY_CLAIM'] = df['CLM_RPT_DT'].dt.date.isin(us_holidays).astype(int)
+# Holidays and weekends of every year in the data, from the precomputed calendar bitmap
+us_calendar = calendar_covering(df['CLM_OCCR_DT'], df['CLM_RPT_DT'])
+df['WEEKEND_CLAIM'] = us_calendar.is_weekend(df['CLM_RPT_DT']).astype(int)
+df['HOLIDAY_CLAIM'] = us_calendar.is_holiday(df['CLM_RPT_DT']).astype(int)
+df['BUSINESS_DAYS_TO_REPORT'] = us_calendar.business_days_between(df['CLM_OCCR_DT'], df['CLM_RPT_DT'])
 
 # Feature 2: Location-Based Features
 print("Generating location-based features...")
-def check_if_neighboring(state1, state2):
-    """Check if two states are neighbors according to the adjacency list."""
-    if state1 == state2:
-        return True
-    if state1 in neighboring_states and state2 in neighboring_states[state1]:
-        return True
-    if state2 in neighboring_states and state1 in neighboring_states[state2]:
-        return True
-    return False
-
-# Check if insured, claimant, and medical provider states are "neighbors"
-df['NEIGHBOR_STATE_FLAG'] = df.apply(
-    lambda row: int(
-        check_if_neighboring(row['INSURED_CUST_STATE'], row['CLM_OCCR_STATE']) and
-        check_if_neighboring(row['INSURED_CUST_STATE'], row['MEDPROV_CUST_STATE']) and
-        check_if_neighboring(row['CLM_OCCR_STATE'], row['MEDPROV_CUST_STATE'])
-    ), axis=1
-)
+# Check if insured, claimant, and medical provider states are "neighbors" (same state or bordering)
+are_neighbors = us_state_geometry.are_neighbors
+df['NEIGHBOR_STATE_FLAG'] = (
+    are_neighbors(df['INSURED_CUST_STATE'], df['CLM_OCCR_STATE']) &
+    are_neighbors(df['INSURED_CUST_STATE'], df['MEDPROV_CUST_STATE']) &
+    are_neighbors(df['CLM_OCCR_STATE'], df['MEDPROV_CUST_STATE'])
+).astype(int)
+# Border crossings between the insured state and the claim state (-1 when unknown or not connected by land)
+df['CLAIM_STATE_BORDER_HOPS'] = us_state_geometry.border_hops(df['INSURED_CUST_STATE'], df['CLM_OCCR_STATE'])
 
 # Count how many states do not match (if neighbors, ignore)
 df['STATE_DISCREPANCY_COUNT'] = (
@@ -100,36 +92,17 @@ df['STATE_DISCREPANCY_COUNT'] = (df['INSURED_CUST_STATE'] != df['CLM_OCCR_STATE'
                                 (df['INSURED_CUST_STATE'] != df['MEDPROV_CUST_STATE']).astype(int)
 
 # Feature 3: Claim Frequency Features
+# Per-entity aggregates come from a feature store rebuilt from the full dataset and saved for scoring
 print("Generating claim frequency features...")
-df['CLAIMANT_CLAIM_COUNT'] = df.groupby('CUST_ID_CLAIMANT')['CLM_DTL_ID'].transform('count')
-df['PROVIDER_CLAIM_COUNT'] = df.groupby('CUST_ID_MED_PROV')['CLM_DTL_ID'].transform('count')
-df['INSURED_CLAIM_COUNT'] = df.groupby('CUST_ID_INSURED')['CLM_DTL_ID'].transform('count')
+entity_store = EntityStateStore(entity_feature_trackers)
+entity_aggregates = entity_features(entity_store, df)
+df['CLAIMANT_CLAIM_COUNT'] = entity_aggregates['CLAIMANT_CLAIM_COUNT']
+df['PROVIDER_CLAIM_COUNT'] = entity_aggregates['PROVIDER_CLAIM_COUNT']
+df['INSURED_CLAIM_COUNT'] = entity_aggregates['INSURED_CLAIM_COUNT']
 
 #  Feature 4: Injury-Related Features
 print("Generating injury-related features...")
-def map_injury_risk_level(injury_type):
-    """Assign risk level to injury type: High = 3, Medium = 2, Low = 1"""
-    if injury_type in injury_risk_mapping['High']:
-        return 3
-    elif injury_type in injury_risk_mapping['Medium']:
-        return 2
-    elif injury_type in injury_risk_mapping['Low']:
-        return 1
-    return 0  # Unknown injury type (edge case)
-
-df['INJURY_TYPE_RISK_LEVEL'] = df['INJURY_TYPE'].apply(map_injury_risk_level)
-#  Feature 2: Injury Body Part Risk Level
-def map_body_part_risk_level(body_part):
-    """Assign risk level to body part: High = 3, Medium = 2, Low = 1"""
-    if body_part in body_part_risk_mapping['High']:
-        return 3
-    elif body_part in body_part_risk_mapping['Medium']:
-        return 2
-    elif body_part in body_part_risk_mapping['Low']:
-        return 1
-    return 0  # Unknown body part (edge case)
-
-df['INJURY_BODY_PART_RISK_LEVEL'] = df['INJURY_BODY_PART'].apply(map_body_part_risk_level)
+df = apply_encoders(df, risk_level_encoders)
 
 #  Feature 3: Combined Risk Score
 # Combine injury type risk and body part risk for a unified risk score
@@ -142,26 +115,32 @@ df['HIGH_RISK_FLAG'] = (df['RISK_SCORE'] >= HIGH_RISK_THRESHOLD).astype(int)
 
 #  Additional Features
 # Create feature interactions for better model performance
-df['HIGH_RISK_BODY_PART_FLAG'] = df['INJURY_BODY_PART_RISK_LEVEL'].apply(lambda x: 1 if x == 3 else 0)
-df['HIGH_RISK_INJURY_TYPE_FLAG'] = df['INJURY_TYPE_RISK_LEVEL'].apply(lambda x: 1 if x == 3 else 0)
+df = apply_encoders(df, high_risk_flag_encoders)
 
 
 #  Feature 5: Behavioral Features
 print("Generating behavioral features...")
-df['MULTIPLE_SAME_DAY_CLAIMS'] = df.groupby(['CUST_ID_CLAIMANT', 'CLM_OCCR_DT'])['CLM_DTL_ID'].transform('count') > 1
-df['PROVIDER_WEEKEND_CLAIMS'] = df.groupby('CUST_ID_MED_PROV')['REPORT_DAY_OF_WEEK'].apply(lambda x: (x > 4).sum())
+df['MULTIPLE_SAME_DAY_CLAIMS'] = entity_aggregates['MULTIPLE_SAME_DAY_CLAIMS']
+df['PROVIDER_WEEKEND_CLAIMS'] = entity_aggregates['PROVIDER_WEEKEND_CLAIMS']  # Weekend claims of the row's provider
+df['CLAIMANT_LATE_CLAIMS'] = entity_aggregates['CLAIMANT_LATE_CLAIMS']
+df['CLAIMANT_TOTAL_CLAIM_AMOUNT'] = entity_aggregates['CLAIMANT_TOTAL_CLAIM_AMOUNT']
 df['FREQUENT_LATE_CLAIMS'] = (df['DAYS_BETWEEN_REPORT_OCCUR'] > 30).astype(int)
 df['SHORT_REPORT_TIME'] = (df['DAYS_BETWEEN_REPORT_OCCUR'] < 1).astype(int)
 
-#  Feature 6: Include all 60+ Fraud Rule Indicators
+# Sliding windows over each claimant's claims, sorted by occurrence date once for every window size
+claimant_timeline = EntityTimeline([df['CUST_ID_CLAIMANT']], df['CLM_OCCR_DT'])
+for window_days in CLAIM_COUNT_WINDOWS:
+    df[f'CLAIMANT_CLAIMS_{window_days}D'] = claimant_timeline.count(window_days)
+df['CLAIMANT_PROVIDERS_180D'] = claimant_timeline.nunique(df['CUST_ID_MED_PROV'], 180)
+
+#  Feature 6: Include all Fraud Rule Indicators (packed in FRAUD_RULE_MASK)
 print("Including all fraud rule indicators...")
-fraud_rule_columns = [col for col in df.columns if 'Fraud_Rule' in col]
-print(f"Total Fraud Rule Indicators Identified: {len(fraud_rule_columns)}")
+print(f"Total Fraud Rule Indicators Identified: {len(labeling_rule_names)}")
 
 #  Feature 7: Aggregated Fraud Indicators
-df['FRAUD_RULE_SUM'] = df[fraud_rule_columns].sum(axis=1)
-df['FRAUD_RULE_COUNT'] = (df[fraud_rule_columns] > 0).sum(axis=1)
-df['FRAUD_RULE_RATIO'] = df['FRAUD_RULE_COUNT'] / len(fraud_rule_columns)
+df['FRAUD_RULE_COUNT'] = popcount(df['FRAUD_RULE_MASK'])
+df['FRAUD_RULE_SUM'] = df['FRAUD_RULE_COUNT']  # Rule flags are 0/1, so sum and count agree
+df['FRAUD_RULE_RATIO'] = df['FRAUD_RULE_COUNT'] / len(labeling_rule_names)
 
 #  Feature 8: Interaction Features
 df['REPORT_HOUR_DAY_COMBO'] = df['REPORT_HOUR'] * df['REPORT_DAY_OF_WEEK']
@@ -170,11 +149,12 @@ df['RISK_LEVEL_NUMERIC'] = df['RISK_LEVEL'].astype('category').cat.codes
 
 #  Time-Based Features
 df['DAYS_BETWEEN_REPORT_OCCUR'] = (df['CLM_RPT_DT'] - df['CLM_OCCR_DT']).dt.days
-us_holidays = holidays.US()
-df['HOLIDAY_CLAIM'] = df['CLM_RPT_DT'].dt.date.isin(us_holidays).astype(int)
-df['WEEKEND_CLAIM'] = df['CLM_RPT_DT'].dt.dayofweek.apply(lambda x: 1 if x in [5, 6] else 0)
 
 
 # Save Feature-Engineered Data
 df.to_csv(FEATURED_FILE, index=False)
 print(f"Feature-engineered dataset saved as {FEATURED_FILE}")
+save_encoders(feature_encoders, FEATURE_ENCODERS_FILE)
+print(f"Feature encoders saved as {FEATURE_ENCODERS_FILE}")
+entity_store.snapshot(ENTITY_FEATURES_FILE)
+print(f"Entity feature store ({entity_store.rows_seen} claims) saved as {ENTITY_FEATURES_FILE}")
@@ -3,6 +3,8 @@ from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.feature_selection import VarianceThreshold, SelectKBest, f_classif
 from sklearn.ensemble import RandomForestClassifier
+from labeling_rules import labeling_rule_names
+from rule_bitmask import expand_flags
 
 # File Paths
 CLEANED_FILE = 'data/Cleaned_Unified_Customer_Policy_Claim_Details.csv'
@@ -18,6 +20,10 @@ except Exception as e:
     print(f"Error loading file: {e}")
     exit()
 
+# Expand the packed rule flags into one feature column per rule
+df = df.drop(columns=['FRAUD_RULE_MASK']).join(
+    expand_flags(df['FRAUD_RULE_MASK'], labeling_rule_names, dtype='int64', index=df.index))
+
 # Separate Features and Target**
 X = df.drop(columns=['CLM_FRAUD_IND'])
 y = df['CLM_FRAUD_IND']
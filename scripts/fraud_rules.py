@@ -1,62 +1,198 @@
+import os
+import argparse
+import numpy as np
 import pandas as pd
+from chunked_labeling import evaluate_chunks
+from label_rebalancing import rebalance_labels
+from rule_bitmask import decode_reasons, popcount
+from rule_engine import (Intermediate, Rule, RuleEngine, RuleProfile, day_difference, is_in, previous_in_group,
+                         profile_path_prefix)
 
-def identify_fraud(df, fraud_percentage=0.15):
-    print("Identifying potential fraud using 21 enhanced rules...")
-
-    #  Required Conversions
-    df['CLM_RPT_DT'] = pd.to_datetime(df['CLM_RPT_DT'], errors='coerce')
-    df['CLM_OCCR_DT'] = pd.to_datetime(df['CLM_OCCR_DT'], errors='coerce')
-    df['PLCY_END_DT'] = pd.to_datetime(df['PLCY_END_DT'], errors='coerce')
-    df['PLCY_STRT_DT'] = pd.to_datetime(df['PLCY_STRT_DT'], errors='coerce')
-    df['CLMT_DISAB_BGN_DT'] = pd.to_datetime(df['CLMT_DISAB_BGN_DT'], errors='coerce')
-
-    #  Fraud Rule Implementation (21 Rules)
-    df['LATE_REPORT_FLAG'] = (df['CLM_RPT_DT'] - df['CLM_OCCR_DT']).dt.days > 30
-    df['CLAIM_AFTER_POLICY_END'] = df['CLM_OCCR_DT'] > df['PLCY_END_DT']
-    df['NEAR_POLICY_EXPIRY'] = (df['PLCY_END_DT'] - df['CLM_OCCR_DT']).dt.days < 7
-    df['SUSPICIOUS_CLAIM_AMOUNT'] = df['CLM_AMT'] > 0.9 * df['PLCY_CLAIM_LIMIT']
-    df['STATE_MISMATCH'] = df['CLM_OCCR_STATE'] != df['INSURED_CUST_STATE']
-    df['CLAIMANT_STATE_MISMATCH'] = df['CLM_OCCR_STATE'] != df['CLAIMANT_CUST_STATE']
-    df['PROVIDER_STATE_MISMATCH'] = df['CLM_OCCR_STATE'] != df['MEDPROV_CUST_STATE']
-    df['DISABILITY_DATE_FRAUD'] = df['CLMT_DISAB_BGN_DT'] < df['CLM_OCCR_DT']
-    df['BACKDATED_CLAIM'] = df['CLM_OCCR_DT'] < df['PLCY_STRT_DT']
-    df['EXCESSIVE_CLAIM_AMOUNT'] = df['CLM_AMT'] > 5 * df['PLCY_PREMIUM_AMT']
-    df['JOB_INJURY_MISMATCH'] = df.apply(lambda x: 1 if x['CLMT_JOB_TTL'] == 'Software Engineer' and x['INJURY_TYP_CD'] in ['Burn', 'Fracture'] else 0, axis=1)
-    df['EMPLOYMENT_STATUS_FRAUD'] = ((df['EMPLOYMENT_STATUS'] == 'Terminated') & (df['CLM_OCCR_DT'] > df['CLMT_HIRE_DT'])).astype(int)
-    df['DECLINED_SUSPICIOUS'] = ((df['CLM_STS_CD'] == 'Declined') & (df['STATUS_REASON'].str.contains('Insufficient Evidence', na=False))).astype(int)
-    df['LATE_STATUS_CHANGE'] = ((pd.to_datetime(df['CLM_STS_DT']) - pd.to_datetime(df['CLM_RPT_DT'])).dt.days > 60).astype(int)
-    df['INJURY_SEVERITY_MISMATCH'] = ((df['INJURY_SEVERITY'] == 'High') & (df['DAYS_LOST'] < 7)).astype(int)
-    df['RAPID_CLAIMS'] = df.groupby('CUST_ID_INSURED')['CLM_OCCR_DT'].diff().dt.days < 30
-    df['DUPLICATE_CLAIM_NO'] = df.duplicated(subset=['CLM_NO'], keep=False).astype(int)
-    df['EXCESSIVE_TREATMENT'] = (df['TREATMENT_REQUIRED'] == 'Surgery') & (df['INJURY_SEVERITY'] != 'Severe')
-    df['MULTIPLE_PROVIDERS'] = df.groupby('CLM_DTL_ID')['MEDPROV_CUST_STATE'].transform('nunique') > 1
-    df['INJURY_JOB_MISMATCH'] = df.apply(lambda x: 1 if x['CLMT_JOB_TTL'] in ['Software Engineer', 'Office Clerk'] and x['INJURY_TYP_CD'] in ['Burn', 'Fracture'] else 0, axis=1)
-
-    #  Apply all 21 rules
-    fraud_columns = [col for col in df.columns if col.endswith('FLAG') or 'FRAUD' in col or 'MISMATCH' in col]
-    df[fraud_columns] = df[fraud_columns].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
-    df['CLM_FRAUD_IND'] = df[fraud_columns].max(axis=1)
+# Fraud flags set by identify_fraud, in FRAUD_FLAG_MASK bit order
+fraud_rules = [
+    Rule('LATE_REPORT_FLAG', 'Claim reported more than 30 days after occurrence',
+         lambda values: values['Days_Delay_Reporting'] > 30, uses=['Days_Delay_Reporting']),
+    Rule('CLAIM_AFTER_POLICY_END', 'Claim occurred after the policy ended',
+         lambda values: values['CLM_OCCR_DT'] > values['PLCY_END_DT'], uses=['CLM_OCCR_DT', 'PLCY_END_DT']),
+    Rule('NEAR_POLICY_EXPIRY', 'Claim occurred less than 7 days before policy end',
+         lambda values: values['Days_To_Policy_End'] < 7, uses=['Days_To_Policy_End']),
+    Rule('SUSPICIOUS_CLAIM_AMOUNT', 'Claim amount above 90% of the policy claim limit',
+         lambda values: values['CLM_AMT'] > 0.9 * values['PLCY_CLAIM_LIMIT'], uses=['CLM_AMT', 'PLCY_CLAIM_LIMIT']),
+    Rule('STATE_MISMATCH', 'Claim occurred outside the insured state',
+         lambda values: values['CLM_OCCR_STATE'] != values['INSURED_CUST_STATE'],
+         uses=['CLM_OCCR_STATE', 'INSURED_CUST_STATE']),
+    Rule('CLAIMANT_STATE_MISMATCH', 'Claim occurred outside the claimant state',
+         lambda values: values['CLM_OCCR_STATE'] != values['CLAIMANT_CUST_STATE'],
+         uses=['CLM_OCCR_STATE', 'CLAIMANT_CUST_STATE']),
+    Rule('PROVIDER_STATE_MISMATCH', 'Claim occurred outside the medical provider state',
+         lambda values: values['CLM_OCCR_STATE'] != values['MEDPROV_CUST_STATE'],
+         uses=['CLM_OCCR_STATE', 'MEDPROV_CUST_STATE']),
+    Rule('DISABILITY_DATE_FRAUD', 'Disability began before the claim occurred',
+         lambda values: values['CLMT_DISAB_BGN_DT'] < values['CLM_OCCR_DT'],
+         uses=['CLMT_DISAB_BGN_DT', 'CLM_OCCR_DT']),
+    Rule('BACKDATED_CLAIM', 'Claim occurred before the policy started',
+         lambda values: values['CLM_OCCR_DT'] < values['PLCY_STRT_DT'], uses=['CLM_OCCR_DT', 'PLCY_STRT_DT']),
+    Rule('EXCESSIVE_CLAIM_AMOUNT', 'Claim amount over 5x the policy premium',
+         lambda values: values['CLM_AMT'] > 5 * values['PLCY_PREMIUM_AMT'], uses=['CLM_AMT', 'PLCY_PREMIUM_AMT']),
+    Rule('JOB_INJURY_MISMATCH', 'Software engineer with a burn or fracture',
+         lambda values: ((values['CLMT_JOB_TTL'] == 'Software Engineer')
+                         & is_in(values['INJURY_TYP_CD'], ['Burn', 'Fracture'])),
+         uses=['CLMT_JOB_TTL', 'INJURY_TYP_CD']),
+    Rule('EMPLOYMENT_STATUS_FRAUD', 'Terminated claimant with a claim after the hire date',
+         lambda values: ((values['EMPLOYMENT_STATUS'] == 'Terminated')
+                         & (values['CLM_OCCR_DT'] > values['CLMT_HIRE_DT'])),
+         uses=['EMPLOYMENT_STATUS', 'CLM_OCCR_DT', 'CLMT_HIRE_DT']),
+    Rule('DECLINED_SUSPICIOUS', 'Claim declined for insufficient evidence',
+         lambda values: ((values['CLM_STS_CD'] == 'Declined')
+                         & values['STATUS_REASON'].str.contains('Insufficient Evidence', na=False)),
+         uses=['CLM_STS_CD', 'STATUS_REASON']),
+    Rule('LATE_STATUS_CHANGE', 'Claim status changed more than 60 days after the report',
+         lambda values: values['Days_To_Status_Change'] > 60, uses=['Days_To_Status_Change']),
+    Rule('INJURY_SEVERITY_MISMATCH', 'High severity injury with fewer than 7 days lost',
+         lambda values: (values['INJURY_SEVERITY'] == 'High') & (values['DAYS_LOST'] < 7),
+         uses=['INJURY_SEVERITY', 'DAYS_LOST']),
+    Rule('RAPID_CLAIMS', "Claim occurred within 30 days of the insured's previous claim",
+         lambda values: values['Days_Since_Insured_Claim'] < 30, uses=['Days_Since_Insured_Claim']),
+    Rule('DUPLICATE_CLAIM_NO', 'Claim number used by another claim', group_by=['CLM_NO'], threshold=1),
+    Rule('EXCESSIVE_TREATMENT', 'Surgery for an injury that is not severe',
+         lambda values: (values['TREATMENT_REQUIRED'] == 'Surgery') & (values['INJURY_SEVERITY'] != 'Severe'),
+         uses=['TREATMENT_REQUIRED', 'INJURY_SEVERITY']),
+    Rule('MULTIPLE_PROVIDERS', 'Claim has medical providers in more than one state',
+         group_by=['CLM_DTL_ID'], aggregate='nunique', column='MEDPROV_CUST_STATE', threshold=1),
+    Rule('INJURY_JOB_MISMATCH', 'Office worker with a burn or fracture',
+         lambda values: (is_in(values['CLMT_JOB_TTL'], ['Software Engineer', 'Office Clerk'])
+                         & is_in(values['INJURY_TYP_CD'], ['Burn', 'Fracture'])),
+         uses=['CLMT_JOB_TTL', 'INJURY_TYP_CD'])
+]
+
+fraud_intermediates = [
+    day_difference('Days_Delay_Reporting', 'CLM_RPT_DT', 'CLM_OCCR_DT'),
+    day_difference('Days_To_Policy_End', 'PLCY_END_DT', 'CLM_OCCR_DT'),
+    Intermediate('Status_Date', lambda values: pd.to_datetime(values['CLM_STS_DT']), uses=['CLM_STS_DT']),
+    day_difference('Days_To_Status_Change', 'Status_Date', 'CLM_RPT_DT'),
+    previous_in_group('Previous_Insured_Claim_Date', ['CUST_ID_INSURED'], 'CLM_OCCR_DT'),
+    day_difference('Days_Since_Insured_Claim', 'CLM_OCCR_DT', 'Previous_Insured_Claim_Date')
+]
+
+fraud_flag_columns = [rule.name for rule in fraud_rules]
+fraud_engine = RuleEngine(fraud_rules, fraud_intermediates)
+# Cross-claim values of the rules that an EntityStateStore can carry between incremental batches
+fraud_entity_trackers = fraud_engine.entity_trackers
+
+
+def fraud_reasons(masks):
+    """FRAUD_REASON strings for FRAUD_FLAG_MASK values, e.g. to decode lazily when a claim is displayed."""
+    return decode_reasons(masks, fraud_flag_columns)
+
+
+def identify_fraud(df, fraud_percentage=0.15, lazy_reasons=False, entity_state=None, profile=None,
+                   strategy='random', seed=None):
+    """
+    Flag potential fraud with fraud_rules, packed into FRAUD_FLAG_MASK.
+    With lazy_reasons=True only the mask is stored; FRAUD_REASON can be derived later with fraud_reasons.
+    With an EntityStateStore over fraud_entity_trackers, df is a newly arrived batch: RAPID_CLAIMS and
+    DUPLICATE_CLAIM_NO look at the claims of earlier batches through the store, which df is added to.
+    A RuleProfile records the time, memory and hits of each rule.
+    strategy and seed choose how labels are flipped to reach fraud_percentage (see rebalance_fraud_labels).
+    """
+    print(f"Identifying potential fraud using {len(fraud_rules)} enhanced rules...")
+    df = convert_fraud_dates(df)
+
+    #  Fraud Rule Implementation (20 Rules), packed into one uint64 mask per claim
+    known = entity_state.apply(df) if entity_state is not None else None
+    evaluation = fraud_engine.evaluate(df, known=known, profile=profile)
+    df['FRAUD_FLAG_MASK'] = evaluation.to_masks()
 
     #  Control Total Fraud Percentage
-    total_claims = len(df)
-    target_fraud_claims = int(total_claims * fraud_percentage)
-    current_fraud_claims = df['CLM_FRAUD_IND'].sum()
-
-    if current_fraud_claims > target_fraud_claims:
-        excess_indices = df[df['CLM_FRAUD_IND'] == 1].sample(current_fraud_claims - target_fraud_claims).index
-        df.loc[excess_indices, 'CLM_FRAUD_IND'] = 0
-    elif current_fraud_claims < target_fraud_claims:
-        additional_fraud_indices = df[df['CLM_FRAUD_IND'] == 0].sample(target_fraud_claims - current_fraud_claims).index
-        df.loc[additional_fraud_indices, 'CLM_FRAUD_IND'] = 1
-
-    # Update the fraud reason
-    df['FRAUD_REASON'] = df.apply(lambda row: ', '.join([col for col in fraud_columns if row[col] == 1]), axis=1)
+    fraud_labels, target_fraud_claims = rebalance_fraud_labels(df['FRAUD_FLAG_MASK'].to_numpy(), fraud_percentage,
+                                                               strategy, seed)
+    df['CLM_FRAUD_IND'] = fraud_labels
+    add_fraud_reasons(df, lazy_reasons)
     print(f" Fraud rules applied. Target Fraud Claims: {target_fraud_claims} | Actual Fraud Claims: {df['CLM_FRAUD_IND'].sum()}")
     return df
 
 
+def convert_fraud_dates(df):
+    """Required Conversions of the date columns present in df."""
+    for col in ['CLM_RPT_DT', 'CLM_OCCR_DT', 'PLCY_END_DT', 'PLCY_STRT_DT', 'CLMT_DISAB_BGN_DT']:
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def rebalance_fraud_labels(masks, fraud_percentage, strategy='random', seed=None):
+    """
+    Fraud labels (0/1) for the claims with any flag in masks, with labels flipped so that exactly
+    int(len(masks) * fraud_percentage) claims are labeled as fraud. Returns the labels and that target.
+    strategy 'random' flips a seeded random choice of claims; 'risk' keeps the claims hitting the most
+    rules and unflags (or flags) by number of rules hit.
+    """
+    masks = np.asarray(masks)
+    risk = popcount(masks) if strategy == 'risk' else None
+    return rebalance_labels(masks != 0, fraud_percentage, strategy, risk=risk, seed=seed)
+
+
+def add_fraud_reasons(df, lazy_reasons=False):
+    """Update the fraud reason: one string per distinct flag combination."""
+    if lazy_reasons:
+        df.drop(columns=['FRAUD_REASON'], inplace=True, errors='ignore')  # Superseded by FRAUD_FLAG_MASK
+    else:
+        df['FRAUD_REASON'] = fraud_reasons(df['FRAUD_FLAG_MASK'].to_numpy())
+    return df
+
+
+def identify_fraud_chunked(input_path, output_path, fraud_percentage=0.15, chunk_size=100000, lazy_reasons=False,
+                           profile=None, strategy='random', seed=None):
+    """
+    identify_fraud for a CSV file too large for memory, chunk_size rows at a time; the result equals
+    identify_fraud on the whole file. Grouped rules use per-entity totals from a pre-pass, flag masks
+    are spilled to <output_path>.masks, labels are rebalanced over all claims (a few bytes per claim)
+    and a final pass appends the labeled chunks to output_path.
+    """
+    print(f"Identifying potential fraud using {len(fraud_rules)} enhanced rules...")
+    mask_path = f"{output_path}.masks"
+    with open(mask_path, 'wb') as mask_file:
+        for chunk, evaluation in evaluate_chunks(fraud_engine, input_path, chunk_size, convert_fraud_dates, profile):
+            evaluation.to_masks().tofile(mask_file)
+    masks = np.memmap(mask_path, dtype=np.uint64, mode='r')
+
+    #  Control Total Fraud Percentage
+    fraud_labels, target_fraud_claims = rebalance_fraud_labels(masks, fraud_percentage, strategy, seed)
+
+    start = 0
+    for chunk_number, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        chunk = convert_fraud_dates(chunk)
+        chunk['FRAUD_FLAG_MASK'] = np.asarray(masks[start:start + len(chunk)])
+        chunk['CLM_FRAUD_IND'] = fraud_labels[start:start + len(chunk)]
+        add_fraud_reasons(chunk, lazy_reasons)
+        chunk.to_csv(output_path, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+        start += len(chunk)
+    del masks
+    os.remove(mask_path)
+    print(f" Fraud rules applied. Target Fraud Claims: {target_fraud_claims} | Actual Fraud Claims: {fraud_labels.sum()}")
+
+
 # Usage
 if __name__ == "__main__":
-    df = pd.read_csv('data/Enhanced_Unified_Dataset.csv')
-    df = identify_fraud(df, fraud_percentage=0.15)
-    df.to_csv('data/Enhanced_Fraud_Detection.csv', index=False)
+    parser = argparse.ArgumentParser(description="Flag potential fraud in the enhanced unified dataset.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Write a per-rule time/memory/hit report next to the output")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Process the input out of core, this many rows at a time")
+    parser.add_argument('--strategy', choices=['random', 'risk'], default='random',
+                        help="Labels flipped to reach the fraud percentage: random, or by number of rules hit")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible fraud labels")
+    args = parser.parse_args()
+
+    input_path = 'data/Enhanced_Unified_Dataset.csv'
+    output_path = 'data/Enhanced_Fraud_Detection.csv'
+    profile = RuleProfile() if args.profile else None
+    if args.chunk_size is not None:
+        identify_fraud_chunked(input_path, output_path, fraud_percentage=0.15, chunk_size=args.chunk_size,
+                               profile=profile, strategy=args.strategy, seed=args.seed)
+    else:
+        df = pd.read_csv(input_path)
+        df = identify_fraud(df, fraud_percentage=0.15, profile=profile, strategy=args.strategy, seed=args.seed)
+        df.to_csv(output_path, index=False)
+    if profile is not None:
+        print(f"Rule profile written to {', '.join(profile.write(profile_path_prefix(output_path)))}")
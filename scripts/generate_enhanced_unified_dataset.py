@@ -1,86 +1,179 @@
-import pandas as pd
+import os
+import argparse
 import numpy as np
-import holidays
-import random
-
-#  Load the Unified Data
-print("Loading unified customer policy claim details dataset...")
-df = pd.read_csv('data/Unified_Customer_Policy_Claim_Details.csv')
-
-# Convert date columns to datetime
-date_columns = ['CLM_RPT_DT', 'CLM_OCCR_DT', 'PLCY_STRT_DT', 'PLCY_END_DT']
-for col in date_columns:
-    df[col] = pd.to_datetime(df[col], errors='coerce')
-
-# Initialize fraud indicator
-df['CLM_FRAUD_IND'] = 0
-
-# Time-Based Anomaly Rules
-df['Fraud_Rule_1'] = ((df['CLM_RPT_DT'] < df['CLM_OCCR_DT']) & df['CLM_RPT_DT'].notnull() & df['CLM_OCCR_DT'].notnull()).astype(int)
-df['Days_To_Policy_End'] = (df['PLCY_END_DT'] - df['CLM_OCCR_DT']).dt.days
-df['Fraud_Rule_2'] = ((df['Days_To_Policy_End'] <= 14) & (df['Days_To_Policy_End'] > 0)).astype(int)
-df['Days_From_Policy_Start'] = (df['CLM_OCCR_DT'] - df['PLCY_STRT_DT']).dt.days
-df['Fraud_Rule_3'] = ((df['Days_From_Policy_Start'] <= 14) & (df['Days_From_Policy_Start'] > 0)).astype(int)
-df['Fraud_Rule_4'] = df['CLM_RPT_DT'].dt.weekday.isin([5, 6]).astype(int)
-df['Days_Delay_Reporting'] = (df['CLM_RPT_DT'] - df['CLM_OCCR_DT']).dt.days
-df['Fraud_Rule_5'] = (df['Days_Delay_Reporting'] > 30).astype(int)
-df['Fraud_Rule_6'] = (df['Days_Delay_Reporting'] < 1).astype(int)
-df['Previous_Claim_Date'] = df.groupby('CUST_ID_CLAIMANT')['CLM_OCCR_DT'].shift(1)
-df['Days_Between_Claims'] = (df['CLM_OCCR_DT'] - df['Previous_Claim_Date']).dt.days
-df['Fraud_Rule_7'] = ((df['Days_Between_Claims'] <= 30) & (df['Days_Between_Claims'] > 0)).astype(int)
-df['CLM_RPT_DT'] = pd.to_datetime(df['CLM_RPT_DT'], errors='coerce')
-
-# Add random hour and minute if CLM_RPT_DT does not have time
-df['CLM_RPT_DT'] = df['CLM_RPT_DT'].apply(lambda x: x + pd.Timedelta(hours=random.randint(0, 23), minutes=random.randint(0, 59)) if pd.notnull(x) else x)
-
-# Rule 8: Claims reported during unusual hours (10 PM to 6 AM)
-# Only mark 1% of these claims as fraudulent
-def mark_fraud_based_on_time(x):
-    if pd.notnull(x) and (x.hour >= 22 or x.hour <= 6):
-        return 1 if random.random() <= 0.01 else 0  # 1% chance of being fraud
-    return 0
-
-df['Fraud_Rule_8'] = df['CLM_RPT_DT'].apply(mark_fraud_based_on_time)
-
-# Financial Anomaly Rules**
-df['Fraud_Rule_9'] = ((df['CLM_AMT'] > 0.9 * df['PLCY_CLAIM_LIMIT']) & df['CLM_AMT'].notnull()).astype(int)
-df['Previous_Claim_Amount'] = df.groupby('CUST_ID_INSURED')['CLM_AMT'].shift(1)
-df['Fraud_Rule_10'] = ((df['CLM_AMT'] > 3 * df['Previous_Claim_Amount']) & (df['INJURY_SEVERITY'] != 'High')).astype(int)
-df['Fraud_Rule_11'] = df.groupby(['CUST_ID_INSURED', 'CLM_AMT'])['CLM_NO'].transform('count') > 1
-df['Fraud_Rule_12'] = df.groupby('CUST_ID_CLAIMANT')['CLM_NO'].transform('count') > 5
-
-# Injury-Related Anomaly Rules**
-df['Fraud_Rule_13'] = ((df['INJURY_TYPE'] == 'Burn') & (df['INJURY_BODY_PART'] == 'Back')).astype(int)
-df['Fraud_Rule_14'] = ((df['INJURY_SEVERITY'] == 'High') & (df['TREATMENT_REQUIRED'] == 'No')).astype(int)
-df['Fraud_Rule_15'] = df.groupby(['CUST_ID_CLAIMANT', 'INJURY_BODY_PART'])['CLM_DTL_ID'].transform('count') > 2
-df['Fraud_Rule_16'] = ((df['INJURY_BODY_PART'] == 'Head') & (df['INJURY_TYPE'] == 'Burn')).astype(int)
-df['Fraud_Rule_17'] = ((df['INJURY_TYPE'] == 'Fracture') & (df['INJURY_BODY_PART'] == 'Neck')).astype(int)
-df['Fraud_Rule_18'] = ((df['INJURY_TYPE'] == 'Amputation') & (df['INJURY_BODY_PART'].isin(['Head', 'Chest', 'Back']))).astype(int)
-df['Fraud_Rule_19'] = ((df['INJURY_BODY_PART'] == 'Internal Organs') & (df['TREATMENT_REQUIRED'] == 'No')).astype(int)
-df['Fraud_Rule_20'] = df.groupby('CLM_DTL_ID')['INJURY_BODY_PART'].transform('nunique') > 3
-
-# Behavioral Anomaly Rules**
-df['Fraud_Rule_21'] = df.groupby(['CUST_ID_CLAIMANT', 'CLM_OCCR_DT'])['CLM_DTL_ID'].transform('count') > 1
-us_holidays = holidays.US(years=[2023, 2024,2022, 2021, 2022])
-df['Fraud_Rule_22'] = df['CLM_RPT_DT'].dt.date.apply(lambda x: 1 if x in us_holidays else 0)
-df['Fraud_Rule_23'] = df.groupby('CUST_ID_CLAIMANT')['CUST_ID_MED_PROV'].nunique() > 5
-df['Fraud_Rule_24'] = df.groupby(['CUST_ID_MED_PROV', 'CLM_OCCR_DT'])['CLM_DTL_ID'].transform('count') > 3
-df['Fraud_Rule_25'] = df.groupby(['CUST_ID_CLAIMANT', 'CLM_RPT_DT'])['CLM_DTL_ID'].transform('count') > 1
-df['Fraud_Rule_26'] = ((df['INJURY_SEVERITY'] == 'High') & (df['DAYS_LOST'] < 3)).astype(int)
-df['Fraud_Rule_27'] = ((df['INJURY_SEVERITY'] == 'Low') & (df['DAYS_LOST'] > 30)).astype(int)
-df['Fraud_Rule_28'] = ((df['INJURY_SEVERITY'] == 'Medium') & (df['DAYS_LOST'] > 60)).astype(int)
-df['Fraud_Rule_29'] = ((df['INJURY_SEVERITY'] == 'High') & (df['TREATMENT_REQUIRED'] == 'No')).astype(int)
-df['Fraud_Rule_30'] = ((df['INJURY_SEVERITY'] == 'Low') & (df['TREATMENT_REQUIRED'] == 'Yes')).astype(int)
-
-# Fraud Indicator Calculation**
-fraud_rules = [col for col in df.columns if 'Fraud_Rule' in col]
-df['CLM_FRAUD_IND'] = (df[fraud_rules].sum(axis=1) > 2).astype(int)
-
-# Save the Labeled Data**
-columns_to_drop = ['Days_Delay_Reporting', 'Days_Between_Claims', 'Previous_Claim_Date', 'Previous_Claim_Amount']
-df.drop(columns=columns_to_drop, inplace=True, errors='ignore')
-df.to_csv('data/Labeled_Unified_Customer_Policy_Claim_Details.csv', index=False)
-
-# Print Fraud Distribution**
-fraud_distribution = df['CLM_FRAUD_IND'].value_counts(normalize=True)
-print(f"Fraud label distribution: \n{fraud_distribution}")
+import pandas as pd
+from chunked_labeling import evaluate_chunks
+from entity_state import EntityStateStore
+from labeling_rules import labeling_engine
+from parallel_labeling import evaluate_parallel
+from rule_engine import RuleProfile, profile_path_prefix
+from rule_bitmask import popcount
+from seeded_draws import resolve_seed, row_keys, row_uniforms
+
+UNIFIED_FILE = 'data/Unified_Customer_Policy_Claim_Details.csv'
+LABELED_FILE = 'data/Labeled_Unified_Customer_Policy_Claim_Details.csv'
+ENTITY_STATE_FILE = 'data/labeling_entity_state.pkl'
+
+
+def parse_claim_dates(df):
+    """Convert the date columns present in df to datetime."""
+    date_columns = ['CLM_RPT_DT', 'CLM_OCCR_DT', 'PLCY_STRT_DT', 'PLCY_END_DT']
+    for col in date_columns:
+        if col in df:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def load_unified_claims(path):
+    """Load unified claim rows with their date columns parsed."""
+    return parse_claim_dates(pd.read_csv(path))
+
+
+def prepare_claims(df, seed=None):
+    """Initialize the fraud indicator and give report dates a seeded random time of day."""
+    # Initialize fraud indicator
+    df['CLM_FRAUD_IND'] = 0
+
+    # Add random hour and minute if CLM_RPT_DT does not have time (one draw per claim ID, NaT stays NaT)
+    if 'CLM_RPT_DT' in df:
+        minutes = np.floor(row_uniforms(resolve_seed(seed), 'CLM_RPT_DT', row_keys(df, df.index)) * 24 * 60)
+        df['CLM_RPT_DT'] = df['CLM_RPT_DT'] + pd.to_timedelta(minutes, unit='m')
+    return df
+
+
+def add_labels(df, evaluation):
+    """Store the evaluated rules of df as FRAUD_RULE_MASK and derive CLM_FRAUD_IND."""
+    df['Days_To_Policy_End'] = evaluation['Days_To_Policy_End']
+    df['Days_From_Policy_Start'] = evaluation['Days_From_Policy_Start']
+    # Rule flags are stored packed in one uint64 column; expand with rule_bitmask.expand_flags when needed
+    df['FRAUD_RULE_MASK'] = evaluation.to_masks()
+
+    # Fraud Indicator Calculation**
+    df['CLM_FRAUD_IND'] = (popcount(df['FRAUD_RULE_MASK'].to_numpy()) > 2).astype(int)
+    return df
+
+
+def label_claims(df, entity_state=None, profile=None, seed=None):
+    """
+    Add FRAUD_RULE_MASK and CLM_FRAUD_IND to the unified claim rows.
+    With an EntityStateStore the entity aggregates (previous claims, claim counts, ...) come from the
+    store and df is added to it, so a new batch is labeled without regrouping the full history.
+    A RuleProfile records the time, memory and hits of each rule and intermediate.
+    seed fixes the report times and sampled rules, so the same seed gives the same labels.
+    """
+    seed = resolve_seed(seed)
+    df = prepare_claims(df, seed)
+
+    # Evaluate Fraud_Rule_1..30 in one pass; shared intermediates (date diffs, group counts) are computed once
+    print(f"Evaluating {len(labeling_engine.rules)} fraud rules over {len(labeling_engine.plan)} shared intermediates...")
+    known = entity_state.apply(df) if entity_state is not None else None
+    evaluation = labeling_engine.evaluate(df, known=known, profile=profile, seed=seed)
+    return add_labels(df, evaluation)
+
+
+def label_claims_parallel(df, max_workers=None, num_partitions=None, seed=None):
+    """
+    label_claims on a process pool: rows are hash-partitioned by entity key and evaluated in parallel,
+    then reassembled in their original order. Labels equal those of label_claims with the same seed.
+    """
+    seed = resolve_seed(seed)
+    df = prepare_claims(df, seed)
+    evaluation = evaluate_parallel(df, 'labeling_rules', 'labeling_engine',
+                                   outputs=['Days_To_Policy_End', 'Days_From_Policy_Start'],
+                                   num_partitions=num_partitions, max_workers=max_workers, seed=seed)
+    return add_labels(df, evaluation)
+
+
+def label_claims_chunked(input_path, output_path, chunk_size, profile=None, seed=None):
+    """
+    Label a unified claims file too large for memory, chunk_size rows at a time.
+    Grouped rules use per-entity totals from a pre-pass over the grouping columns, so the labels
+    equal those of label_claims on the whole file (with the same seed); labeled chunks are appended
+    to output_path. Returns the CLM_FRAUD_IND value counts.
+    """
+    seed = resolve_seed(seed)
+    print(f"Evaluating {len(labeling_engine.rules)} fraud rules in chunks of {chunk_size} rows...")
+    label_counts = pd.Series(dtype='int64')
+    chunks = evaluate_chunks(labeling_engine, input_path, chunk_size,
+                             prepare=lambda chunk: prepare_claims(parse_claim_dates(chunk), seed),
+                             profile=profile, seed=seed)
+    for chunk_number, (chunk, evaluation) in enumerate(chunks):
+        chunk = add_labels(chunk, evaluation)
+        chunk.to_csv(output_path, mode='w' if chunk_number == 0 else 'a', header=chunk_number == 0, index=False)
+        label_counts = label_counts.add(chunk['CLM_FRAUD_IND'].value_counts(), fill_value=0)
+        print(f"Labeled chunk {chunk_number + 1} ({len(chunk)} claims)")
+    return label_counts.astype('int64')
+
+
+def label_incremental_batch(batch_dir, state_path=ENTITY_STATE_FILE, history_path=None, profile=None, seed=None):
+    """
+    Label the unified rows of an incremental batch directory against the persisted entity state.
+    Without a snapshot at state_path the state is first built from history_path (e.g. the full
+    unified dataset); the updated state is saved only once the labeled batch is written.
+    """
+    entity_state = EntityStateStore.restore(state_path, labeling_engine.entity_trackers)
+    if entity_state.rows_seen == 0 and history_path is not None:
+        print(f"Building entity state from {history_path}...")
+        entity_state.apply(load_unified_claims(history_path))
+
+    print(f"Loading incremental batch from {batch_dir}...")
+    df = load_unified_claims(os.path.join(batch_dir, os.path.basename(UNIFIED_FILE)))
+    df = label_claims(df, entity_state, profile, seed)
+    output_path = os.path.join(batch_dir, os.path.basename(LABELED_FILE))
+    df.to_csv(output_path, index=False)
+    entity_state.snapshot(state_path)
+    if profile is not None:
+        write_profile(profile, output_path)
+    print(f"Labeled {len(df)} claims; entity state covers {entity_state.rows_seen} claims")
+    return df
+
+
+def write_profile(profile, output_path):
+    """Write the rule profile report next to the labeled output."""
+    print(f"Rule profile written to {', '.join(profile.write(profile_path_prefix(output_path)))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label the unified claims with the fraud rules.")
+    parser.add_argument('--incremental-batch', default=None, metavar='DIR',
+                        help="Label only this incremental batch directory using the persisted entity state")
+    parser.add_argument('--state', default=ENTITY_STATE_FILE, help="Entity state snapshot for incremental labeling")
+    parser.add_argument('--history', default=LABELED_FILE,
+                        help="Claims to build the entity state from when there is no snapshot yet")
+    parser.add_argument('--profile', action='store_true',
+                        help="Write a per-rule time/memory/hit report next to the labeled output")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="Label the unified file out of core, this many rows at a time")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Label on this many processes, partitioning claims by entity key")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Seed for the report times and sampled rules, for reproducible labels")
+    args = parser.parse_args()
+    if args.profile and args.workers is not None:
+        parser.error("--profile times rules in this process and cannot be combined with --workers")
+    profile = RuleProfile() if args.profile else None
+
+    if args.incremental_batch is not None:
+        df = label_incremental_batch(args.incremental_batch, args.state, args.history, profile, args.seed)
+        label_counts = df['CLM_FRAUD_IND'].value_counts()
+    elif args.chunk_size is not None:
+        label_counts = label_claims_chunked(UNIFIED_FILE, LABELED_FILE, args.chunk_size, profile, args.seed)
+        if profile is not None:
+            write_profile(profile, LABELED_FILE)
+    else:
+        #  Load the Unified Data
+        print("Loading unified customer policy claim details dataset...")
+        if args.workers is not None:
+            df = label_claims_parallel(load_unified_claims(UNIFIED_FILE), max_workers=args.workers, seed=args.seed)
+        else:
+            df = label_claims(load_unified_claims(UNIFIED_FILE), profile=profile, seed=args.seed)
+
+        # Save the Labeled Data**
+        df.to_csv(LABELED_FILE, index=False)
+        if profile is not None:
+            write_profile(profile, LABELED_FILE)
+        label_counts = df['CLM_FRAUD_IND'].value_counts()
+
+    # Print Fraud Distribution**
+    fraud_distribution = label_counts / label_counts.sum()
+    print(f"Fraud label distribution: \n{fraud_distribution}")
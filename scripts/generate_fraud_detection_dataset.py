@@ -1,17 +1,32 @@
 import pandas as pd
+import numpy as np
 import random
 import faker
 import os
+import glob
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, timedelta
+from id_allocator import IdAllocator, ClaimNumberAllocator
+from dimension_join import DimensionIndex, take_rows, expand_one_to_many
+from dataset_cache import cache_key, load_cached_outputs, store_outputs
 
 # Initialize Faker
 fake = faker.Faker()
 
+# Source files whose content is part of the dataset cache key
+generator_source_files = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    for filename in ['generate_fraud_detection_dataset.py', 'id_allocator.py', 'dimension_join.py']
+]
+
 # Parameters
 num_customers = 9000  # Total number of customer records
 num_claimant = 3000  # Number of claimants
 num_insured = 3000  # Number of insured
 num_medical_provider = 3000  # Number of medical providers
+default_reference_date = date(2024, 12, 31)  # Pooled customers' dates of birth and death count back from this day
 
 # Policy generation parameters
 payment_statuses = ['Paid', 'Delinquent']
@@ -67,6 +82,45 @@ injury_types = [
     'Nerve Damage', 'Soft Tissue Injury', 'Eye Injury', 'Hearing Loss'
 ]
 
+# Batched claim generation parameters
+claim_address_pool_size = 5000  # Distinct occurrence addresses pre-generated with Faker
+report_delay_days = np.arange(4, 41)  # Report date is 4 to 40 days after occurrence
+report_delay_weights = np.where(report_delay_days > 30, 1, 19) / np.where(report_delay_days > 30, 1, 19).sum()
+
+# Columns removed from the unified dataset after joining
+unified_dropped_columns = [
+    'MEDPROV_CUST_DOD', 'MEDPROV_CUST_DOB', 'MEDPROV_CUST_GENDER', 'MEDPROV_CUST_LST_NM', 'INSURED_CUST_DOD',
+    'INSURED_CUST_DOB', 'INSURED_CUST_GENDER', 'INSURED_CUST_LST_NM', 'CUST_ID', 'INSURED_CUST_TYP',
+    'INSURED_CUST_TAX_ID_TYP', 'CLAIMANT_CUST_TYP', 'CLAIMANT_CUST_TAX_ID_TYP',
+    'MEDPROV_CUST_ID', 'MEDPROV_CUST_TAX_ID_TYP', 'INSURED_CUST_CITY', 'INSURED_CUST_ZIP',
+    'CLAIMANT_CUST_ZIP', 'MEDPROV_CUST_TYP', 'MEDPROV_CUST_ADDR', 'MEDPROV_CUST_CITY', 'MEDPROV_CUST_ZIP',
+    'MEDPROV_CUST_EMAIL', 'MEDPROV_CUST_PH_NO', 'MEDPROV_CUST_TAX_ID', 'INSURED_CUST_PH_NO', 'INSURED_CUST_EMAIL',
+    'INSURED_CUST_TAX_ID', 'CLAIMANT_CUST_ADDR', 'CLAIMANT_CUST_CITY', 'CLAIMANT_CUST_PH_NO', 'CLAIMANT_CUST_EMAIL',
+    'CLM_FRAUD_IND', 'FRAUD_REASON', 'PLCY_DTL_ID', 'INSURED_CUST_ID', 'CLM_STS_ID', 'STATUS_REASON',
+    'CLM_INJ_ID', 'FRAUD_REASON_ADDITIONAL', 'CLAIMANT_CUST_ID'
+]
+
+# Customer roles joined into the unified dataset: (column prefix, claim key column)
+unified_customer_roles = [
+    ('INSURED_', 'CUST_ID_INSURED'), ('CLAIMANT_', 'CUST_ID_CLAIMANT'), ('MEDPROV_', 'CUST_ID_MED_PROV')
+]
+
+# Claim-level fraud reasons, in bit order (bit 0 = first reason)
+claim_fraud_reasons = [
+    'Claim After Policy Expiry', 'Claim Near Policy Expiry',
+    'High Claim Amount Near Policy Limit', 'Mismatched Insured, Claimant, or Provider State'
+]
+
+# Additional-details and injury fraud reasons, in bit order
+additional_fraud_reasons = [
+    'Hire Date After Claim Occurrence', 'Disability Date Before Occurrence',
+    'Unusual Weekly Wage', 'Terminated Employee Claiming Wages'
+]
+injury_fraud_reasons = [
+    'High severity injury without treatment', 'Exaggerated workdays lost',
+    'Inconsistent injury type for {body_part}', 'Suspicious prescriber notes', 'Illogical Occupation-Injury Pair'
+]
+
 
 
 # Function to clean phone number (keep only 10 digits)
@@ -83,20 +137,12 @@ def clean_tax_id(tax_id):
     return cleaned_tax_id[:9]  # Return only the first 9 digits
 
 # Function to generate unique policy numbers
-def generate_unique_policy_number(existing_numbers):
-    while True:
-        policy_number = f"COF{random.randint(1000000, 9999999)}"
-        if policy_number not in existing_numbers:
-            existing_numbers.add(policy_number)
-            return policy_number
+def generate_unique_policy_number(policy_number_allocator):
+    return f"COF{policy_number_allocator.next_id()}"
 
 # Function to generate unique claim number
-def generate_unique_claim_number(existing_claim_numbers, year):
-    while True:
-        claim_number = f"{year}{random.randint(100000, 999999)}"
-        if claim_number not in existing_claim_numbers:
-            existing_claim_numbers.add(claim_number)
-            return claim_number
+def generate_unique_claim_number(claim_number_allocator, year):
+    return claim_number_allocator.next_claim_number(year)
 
 
 # Function to generate customer details
@@ -214,12 +260,112 @@ def generate_customer_details(num_customers):
     return customer_df
 
 
+def generate_customer_details_pooled(num_customers, num_claimant=None, num_insured=None, pool_size=5000, seed=None,
+                                     reference_date=default_reference_date):
+    """
+    Pooled version of generate_customer_details for millions of customers.
+    Name, address, city, zip and phone vocabularies are generated once with a seeded Faker and
+    customers are assembled by vectorized index sampling. Tax IDs come from a random affine
+    permutation of the 9-digit range, so they (and therefore customer profiles) are unique
+    without rejection sampling. Claimant/insured counts default to a third of num_customers each.
+    Ages are taken at reference_date rather than today, so a seeded run gives the same customers any day.
+    """
+    print(" Customer details generation (pooled) started...")
+    rng = np.random.default_rng(seed)
+    pool_fake = faker.Faker()
+    pool_fake.seed_instance(int(rng.integers(2 ** 32)))
+
+    if num_claimant is None:
+        num_claimant = num_customers // 3
+    if num_insured is None:
+        num_insured = num_customers // 3
+    if num_customers > 10 ** 9:
+        raise ValueError("Cannot issue more than 10^9 unique 9-digit tax IDs")
+
+    # Pre-generate Faker vocabularies once
+    pool_size = max(1, min(num_customers, pool_size))
+    first_name_pool = np.array([pool_fake.first_name() for _ in range(pool_size)], dtype=object)
+    last_name_pool = np.array([pool_fake.last_name() for _ in range(pool_size)], dtype=object)
+    address_pool = np.array([pool_fake.street_address() for _ in range(pool_size)], dtype=object)
+    city_pool = np.array([pool_fake.city() for _ in range(pool_size)], dtype=object)
+    zip_pool = np.array([pool_fake.zipcode() for _ in range(pool_size)], dtype=object)
+    phone_pool = np.array([clean_phone_number(pool_fake.phone_number()) for _ in range(pool_size)], dtype=object)
+    state_abbr_pool = np.array([pool_fake.state_abbr() for _ in range(min(pool_size, 500))], dtype=object)
+
+    cust_id = np.arange(1, num_customers + 1)
+    cust_type = np.where(cust_id <= num_claimant, 'Claimant',
+                         np.where(cust_id <= num_claimant + num_insured, 'Insured', 'Medical Provider')).astype(object)
+    is_claimant = cust_type == 'Claimant'
+    is_insured = cust_type == 'Insured'
+    is_provider = cust_type == 'Medical Provider'
+
+    # Names: claimants are people, insureds and medical providers are businesses
+    first_name = first_name_pool[rng.integers(0, pool_size, num_customers)]
+    last_name = last_name_pool[rng.integers(0, pool_size, num_customers)]
+    insured_prefixes = np.array(['Retail Group', 'Tech Solutions', 'Solid Foundations', 'BuildCo', 'MFG Solutions'], dtype=object)
+    provider_prefixes = np.array(['Healthcare Partners', 'Prime Health Network', 'Wellness Solutions', 'Cura Medical Services'], dtype=object)
+    suffixes = np.array(business_suffixes, dtype=object)
+    insured_names = insured_prefixes[rng.integers(0, len(insured_prefixes), num_customers)] + ' ' + suffixes[rng.integers(0, len(suffixes), num_customers)]
+    provider_names = provider_prefixes[rng.integers(0, len(provider_prefixes), num_customers)] + ' ' + suffixes[rng.integers(0, len(suffixes), num_customers)]
+    first_name = np.where(is_insured, insured_names, np.where(is_provider, provider_names, first_name))
+    last_name = np.where(is_claimant, last_name, '')
+
+    # Gender, date of birth and date of death only apply to claimants
+    gender = np.where(is_claimant, rng.choice(np.array(['Male', 'Female', 'Other'], dtype=object), size=num_customers, p=[0.49, 0.49, 0.02]), None)
+    reference_day = np.datetime64(reference_date, 'D')
+    dob = reference_day - rng.integers(int(18 * 365.25), int(86 * 365.25), num_customers)
+    dob_year = dob.astype('datetime64[Y]').astype(np.int64) + 1970
+    has_dod = is_claimant & ((dob_year < 1960) | ((dob_year > 1988) & (rng.random(num_customers) < 0.01)))
+    dod = dob + rng.integers(0, (reference_day - dob).astype(np.int64) + 1)
+    dob = np.where(is_claimant, dob, np.datetime64('NaT'))
+    dod = np.where(has_dod, dod, np.datetime64('NaT'))
+
+    # Address details: 2% weight for any US state outside the configured list
+    other_state = rng.random(num_customers) < 2 / (98 * len(states) + 2)
+    state = np.where(other_state, state_abbr_pool[rng.integers(0, len(state_abbr_pool), num_customers)],
+                     np.array(states, dtype=object)[rng.integers(0, len(states), num_customers)])
+
+    # Contact details
+    email_domain = np.where(is_claimant, 'gmail.com', 'company.com')
+    email = (pd.Series(first_name).str.lower().str.replace(' ', '') + '.' + pd.Series(last_name).str.lower()
+             + '@' + email_domain)
+
+    # Unique Tax IDs (SSN or EIN): (a * i + b) mod 10^9 is a permutation when a is coprime to 10^9
+    multiplier = int(rng.integers(10 ** 8, 10 ** 9)) | 1
+    while multiplier % 5 == 0:
+        multiplier += 2
+    tax_id = (multiplier * cust_id + int(rng.integers(0, 10 ** 9))) % 10 ** 9
+    tax_id = pd.Series(tax_id).astype(str).str.zfill(9)
+
+    customer_df = pd.DataFrame({
+        'CUST_ID': cust_id,
+        'CUST_TYP': cust_type,
+        'CUST_FRST_NM': first_name,
+        'CUST_LST_NM': last_name,
+        'CUST_GENDER': pd.Categorical(gender),
+        'CUST_DOB': pd.to_datetime(dob),
+        'CUST_DOD': pd.to_datetime(dod),
+        'CUST_ADDR': address_pool[rng.integers(0, pool_size, num_customers)],
+        'CUST_CITY': city_pool[rng.integers(0, pool_size, num_customers)],
+        'CUST_STATE': state,
+        'CUST_ZIP': zip_pool[rng.integers(0, pool_size, num_customers)],
+        'CUST_PH_NO': phone_pool[rng.integers(0, pool_size, num_customers)],
+        'CUST_EMAIL': email,
+        'CUST_TAX_ID': tax_id,
+        'CUST_TAX_ID_TYP': np.where(is_claimant, 'SSN', 'EIN').astype(object)
+    })
+
+    print(" Customer details generation completed.")
+    return customer_df
+
+
 # Function to generate policy details
-def generate_policy_details(insured_customers, min_policies=5000):
+def generate_policy_details(insured_customers, min_policies=5000, seed=None):
     print("Policy details generation started...")
     policy_data = []
     policy_id = 1001  # Start PLCY_DTL_ID at 1001
-    existing_policy_numbers = set()  # Track unique policy numbers
+    # Unique 7-digit policy numbers
+    policy_number_allocator = IdAllocator(1000000, 10000000, seed=random.getrandbits(63) if seed is None else seed)
 
     total_policies = 0
     while total_policies < min_policies:  # Ensure at least 5000 policies
@@ -234,7 +380,7 @@ def generate_policy_details(insured_customers, min_policies=5000):
                     break  # Stop once we reach the minimum required policies
 
                 # Generate unique policy number
-                policy_number = generate_unique_policy_number(existing_policy_numbers)
+                policy_number = generate_unique_policy_number(policy_number_allocator)
                 policy_start_date = start_date
                 policy_end_date = policy_start_date + timedelta(days=365)  # End date is exactly 1 year later
 
@@ -271,7 +417,7 @@ def generate_claim_details(policy_df, customer_df, min_claims=15000, fraud_perce
     print("Claim details generation started...")
     claim_data = []
     claim_id = 11001  # Start CLM_DTL_ID at 11001
-    existing_claim_numbers = set()  # Track unique claim numbers
+    claim_number_allocator = ClaimNumberAllocator(seed=random.getrandbits(63))  # Unique claim numbers per occurrence year
 
     insured_customers = customer_df[customer_df['CUST_TYP'] == 'Insured']
     claimant_customers = customer_df[customer_df['CUST_TYP'] == 'Claimant']
@@ -361,11 +507,7 @@ def generate_claim_details(policy_df, customer_df, min_claims=15000, fraud_perce
         fraud_reason_str = ', '.join(fraud_reasons)
 
         # Generate unique claim number
-        while True:
-            claim_number = f"{clm_occur_date.year}{random.randint(100000, 999999)}"
-            if claim_number not in existing_claim_numbers:
-                existing_claim_numbers.add(claim_number)
-                break
+        claim_number = generate_unique_claim_number(claim_number_allocator, clm_occur_date.year)
 
         # Append claim record
         claim_data.append([
@@ -399,6 +541,164 @@ def generate_claim_details(policy_df, customer_df, min_claims=15000, fraud_perce
     return claim_df
 
 
+def build_fraud_reason_lookup(reason_labels, none_label='None'):
+    """Build the FRAUD_REASON string for every combination of reason bits."""
+    lookup = []
+    for code in range(2 ** len(reason_labels)):
+        reasons = [label for bit, label in enumerate(reason_labels) if code & (1 << bit)]
+        lookup.append(', '.join(reasons) if reasons else none_label)
+    return np.array(lookup, dtype=object)
+
+
+def sample_active_policies(policy_start_date, policy_end_date, clm_occur_date, rng):
+    """Draw, for every occurrence date, a random policy that is in force on that date."""
+    policy_idx = np.empty(len(clm_occur_date), dtype=np.int64)
+    for occur_date in np.unique(clm_occur_date):
+        rows = np.flatnonzero(clm_occur_date == occur_date)
+        active = np.flatnonzero((policy_start_date <= occur_date) & (policy_end_date >= occur_date))
+        if len(active) == 0:
+            raise ValueError(f"No policy is in force on {occur_date}")
+        policy_idx[rows] = rng.choice(active, size=len(rows))
+    return policy_idx
+
+
+def generate_claim_details_batched(policy_df, customer_df, min_claims=15000, fraud_percentage=0.05, seed=None,
+                                   claim_id_start=11001, fraud_claims=None, claim_number_allocator=None,
+                                   report_window=None, claim_numbers=True):
+    """
+    NumPy-batched version of generate_claim_details.
+    Draws all policy/customer indices, dates, amounts and fraud flags at once with a seeded
+    numpy.random.Generator. Output columns and fraud targeting match generate_claim_details.
+    fraud_claims overrides the fraud target and claim_number_allocator lets callers (e.g. shards)
+    share one claim number space; with claim_numbers=False CLM_NO is left empty for the caller to
+    fill (e.g. allocate_claim_numbers). With report_window=(start, end), claims are reported inside
+    the window against policies in force on their occurrence date.
+    """
+    print("Claim details generation (batched) started...")
+    rng = np.random.default_rng(seed)
+    claim_count = min_claims
+
+    insured_customers = customer_df[customer_df['CUST_TYP'] == 'Insured']
+    claimant_customers = customer_df[customer_df['CUST_TYP'] == 'Claimant']
+    medical_providers = customer_df[customer_df['CUST_TYP'] == 'Medical Provider']
+
+    # Draw policy and customer rows for every claim
+    if report_window is None:
+        policy_idx = rng.integers(0, len(policy_df), claim_count)
+    insured_idx = rng.integers(0, len(insured_customers), claim_count)
+    claimant_idx = rng.integers(0, len(claimant_customers), claim_count)
+    provider_idx = rng.integers(0, len(medical_providers), claim_count)
+
+    all_policy_start_date = pd.to_datetime(policy_df['PLCY_STRT_DT']).to_numpy().astype('datetime64[D]')
+    all_policy_end_date = pd.to_datetime(policy_df['PLCY_END_DT']).to_numpy().astype('datetime64[D]')
+
+    if report_window is None:
+        policy_start_date = all_policy_start_date[policy_idx]
+        policy_end_date = all_policy_end_date[policy_idx]
+
+        # Determine claim occurrence date: regular claims skip the first and last 30 days of the
+        # policy, 2% of claims occur in the last 30 days
+        near_end = rng.random(claim_count) < 0.02
+        window_start = np.where(near_end, policy_end_date - 30, policy_start_date + 30)
+        window_end = np.where(near_end, policy_end_date, policy_end_date - 30)
+        window_days = (window_end - window_start).astype(np.int64)
+        clm_occur_date = window_start + rng.integers(0, window_days + 1)
+
+        # Generate report date ranging from 4 to 40 days after the occurrence date
+        clm_report_date = clm_occur_date + rng.choice(report_delay_days, size=claim_count, p=report_delay_weights)
+    else:
+        # Report dates fall inside the window, occurrence 4 to 40 days earlier under an in-force policy
+        report_start = np.datetime64(report_window[0], 'D')
+        report_days = (np.datetime64(report_window[1], 'D') - report_start).astype(np.int64)
+        clm_report_date = report_start + rng.integers(0, report_days + 1, claim_count)
+        clm_occur_date = clm_report_date - rng.choice(report_delay_days, size=claim_count, p=report_delay_weights)
+        policy_idx = sample_active_policies(all_policy_start_date, all_policy_end_date, clm_occur_date, rng)
+        policy_start_date = all_policy_start_date[policy_idx]
+        policy_end_date = all_policy_end_date[policy_idx]
+
+    claim_limit = policy_df['PLCY_CLAIM_LIMIT'].to_numpy(dtype=float)[policy_idx]
+
+    # Non-fraudulent amounts replicate random.triangular(10, 5000, 10000), whose mode lies
+    # above the high bound, i.e. 10 + 4990 * sqrt(2u)
+    clm_amount = np.round(10 + 4990 * np.sqrt(2 * rng.random(claim_count)), 2)
+
+    # Occurrence state defaults to the insured customer's state
+    state_values = customer_df['CUST_STATE'].unique()
+    insured_state_codes = pd.Categorical(insured_customers['CUST_STATE'], categories=state_values).codes
+    insured_state_codes = insured_state_codes[insured_idx]
+
+    # Fraud targeting: claims are fraud candidates, in order, until the target is reached
+    total_fraud_claims = int(min_claims * fraud_percentage) if fraud_claims is None else fraud_claims
+    reason_code = np.zeros(claim_count, dtype=np.int64)
+    fraud_claims_count = 0
+    next_claim = 0
+    while fraud_claims_count < total_fraud_claims and next_claim < claim_count:
+        rows = np.arange(next_claim, min(next_claim + total_fraud_claims - fraud_claims_count, claim_count))
+        next_claim = rows[-1] + 1
+
+        # Fraudulent claims tend to have higher amounts close to the claim limit
+        limit = claim_limit[rows]
+        clm_amount[rows] = np.round(rng.uniform(0.9 * limit, limit), 2)
+
+        days_to_end = (policy_end_date[rows] - clm_occur_date[rows]).astype(np.int64)
+        code = (days_to_end < 0) * 1 + (days_to_end < 7) * 2 + (np.minimum(clm_amount[rows], limit) > 0.9 * limit) * 4
+
+        # Add mismatched state logic to some frauds
+        mismatched = rng.random(len(rows)) < 0.15
+        if len(state_values) > 1:
+            other_state = rng.integers(0, len(state_values) - 1, len(rows))
+            other_state += other_state >= insured_state_codes[rows]
+            insured_state_codes[rows] = np.where(mismatched, other_state, insured_state_codes[rows])
+            code += mismatched * 8
+
+        reason_code[rows] = code
+        fraud_claims_count += int((code > 0).sum())
+
+    # Ensure claim amount does not exceed policy claim limit
+    clm_amount = np.minimum(clm_amount, claim_limit)
+    clm_fraud_ind = (reason_code > 0).astype(int)
+    fraud_reason = build_fraud_reason_lookup(claim_fraud_reasons)[reason_code]
+
+    # Unique claim numbers: year of occurrence followed by 6 distinct digits within that year
+    occur_year = clm_occur_date.astype('datetime64[Y]').astype(np.int64) + 1970
+    if not claim_numbers:
+        claim_number = pd.Series(None, index=range(claim_count), dtype=object)
+    else:
+        if claim_number_allocator is None:
+            claim_number_allocator = ClaimNumberAllocator(seed=int(rng.integers(2 ** 63)))
+        claim_number = pd.Series(claim_number_allocator.allocate(occur_year)).astype(str)
+
+    # Occurrence addresses are sampled from a pool pre-generated with a seeded Faker
+    pool_fake = faker.Faker()
+    pool_fake.seed_instance(int(rng.integers(2 ** 32)))
+    pool_size = max(1, min(claim_count, claim_address_pool_size))
+    address_pool = np.array([pool_fake.street_address() for _ in range(pool_size)], dtype=object)
+    city_pool = np.array([pool_fake.city() for _ in range(pool_size)], dtype=object)
+    zip_pool = np.array([pool_fake.zipcode() for _ in range(pool_size)], dtype=object)
+
+    claim_df = pd.DataFrame({
+        'CLM_DTL_ID': np.arange(claim_id_start, claim_id_start + claim_count),
+        'CLM_NO': claim_number,
+        'CLM_RPT_DT': clm_report_date,
+        'CLM_OCCR_DT': clm_occur_date,
+        'CLM_AMT': clm_amount,
+        'PLCY_NO': policy_df['PLCY_NO'].to_numpy()[policy_idx],
+        'CUST_ID_INSURED': insured_customers['CUST_ID'].to_numpy()[insured_idx],
+        'CUST_ID_CLAIMANT': claimant_customers['CUST_ID'].to_numpy()[claimant_idx],
+        'CUST_ID_MED_PROV': medical_providers['CUST_ID'].to_numpy()[provider_idx],
+        'CLM_OCCR_ADDR': address_pool[rng.integers(0, pool_size, claim_count)],
+        'CLM_OCCR_CITY': city_pool[rng.integers(0, pool_size, claim_count)],
+        'CLM_OCCR_ZIP': zip_pool[rng.integers(0, pool_size, claim_count)],
+        'CLM_OCCR_STATE': state_values[insured_state_codes],
+        'CLM_FRAUD_IND': clm_fraud_ind,
+        'FRAUD_REASON': fraud_reason
+    })
+
+    print(
+        f"Total Claims: {len(claim_df)} | Fraudulent Claims: {claim_df['CLM_FRAUD_IND'].sum()} (Target: {total_fraud_claims})")
+    return claim_df
+
+
 def generate_claim_additional_details(claim_df):
     print(" Generating Claim Additional Details...")
     additional_details = []
@@ -463,10 +763,10 @@ def generate_claim_additional_details(claim_df):
     print(" Claim Additional Details generated.")
     return additional_details_df
 
-def generate_injury_details(claim_df, customer_df):
+def generate_injury_details(claim_df, customer_df, injury_id_start=111001):
     print(" Generating Injury Details...")
     injury_data = []
-    injury_id = 111001  # Start injury ID from INJ111001
+    injury_id = injury_id_start  # Start injury ID from INJ111001
     injury_severities = ['Low', 'Medium', 'High']
     fraud_notes = ['suspected exaggeration', 'requires further investigation', 'inconsistent patient history']
 
@@ -548,10 +848,18 @@ def generate_injury_details(claim_df, customer_df):
     return injury_df, claim_df
 
 
-def generate_claim_status(claim_df):
+def create_claim_status_id_allocator(total_claims, seed=None, issued=0, stop=None):
+    """Unique Claim Status IDs, drawn from 11110000 onwards (at least the original 90000-ID range)."""
+    claim_status_id_start = 11100000  # Start claim status ID
+    return IdAllocator(claim_status_id_start + 10000, claim_status_id_start + 10000 + max(90000, total_claims),
+                       seed=seed, issued=issued, stop=stop)
+
+
+def generate_claim_status(claim_df, claim_status_id_allocator=None):
     print("Generating Claim Status Details...")
     status_data = []
-    claim_status_id_start = 11100000  # Start claim status ID
+    if claim_status_id_allocator is None:
+        claim_status_id_allocator = create_claim_status_id_allocator(len(claim_df), seed=random.getrandbits(63))
 
     for _, claim in claim_df.iterrows():
         clm_dtl_id = claim['CLM_DTL_ID']
@@ -582,7 +890,7 @@ def generate_claim_status(claim_df):
                 clm_sts_dt = clm_rpt_dt + timedelta(weeks=random.randint(1, 15))  # Pending up to 15 weeks
 
         # Generate unique Claim Status ID
-        clm_sts_id = claim_status_id_start + random.randint(10000, 99999)
+        clm_sts_id = claim_status_id_allocator.next_id()
 
         # Append status record
         status_data.append([
@@ -596,6 +904,280 @@ def generate_claim_status(claim_df):
     return status_df
 
 
+def generate_claim_additional_details_batched(claim_df, seed=None):
+    """
+    Array-based version of generate_claim_additional_details.
+    Default values and fraud perturbations are drawn for all claims at once and applied with masks.
+    """
+    print(" Generating Claim Additional Details (batched)...")
+    rng = np.random.default_rng(seed)
+    claim_count = len(claim_df)
+    job_titles = np.array(['Software Engineer', 'Construction Worker', 'Retail Associate', 'Nurse', 'Driver', 'Teacher'], dtype=object)
+    work_environments = np.array(['On-site', 'Remote', 'Hybrid'], dtype=object)
+    employment_statuses = np.array(['Active', 'Terminated', 'On Leave'], dtype=object)
+
+    clm_occur_date = pd.to_datetime(claim_df['CLM_OCCR_DT']).to_numpy().astype('datetime64[D]')
+    is_fraud = claim_df['CLM_FRAUD_IND'].to_numpy() == 1
+
+    # Default data
+    hire_window_start = np.datetime64('2000-01-01', 'D')
+    hire_window_days = np.maximum((clm_occur_date - 30 - hire_window_start).astype(np.int64), 0)
+    clmt_hire_date = hire_window_start + rng.integers(0, hire_window_days + 1)
+    clmt_disab_bgn_date = clm_occur_date + rng.integers(1, 31, claim_count)
+    clmt_avg_weekly_wage = np.round(rng.uniform(500, 8000, claim_count), 2)
+    job_title_idx = rng.integers(0, len(job_titles), claim_count)
+    job_title = job_titles[job_title_idx]
+    job_desc = np.array([f"{title} responsible for various operational and administrative tasks." for title in job_titles],
+                        dtype=object)[job_title_idx]
+    work_environment = work_environments[rng.integers(0, len(work_environments), claim_count)]
+
+    # Fraud-specific logic, as bits in additional_fraud_reasons order
+    hire_after_occurrence = is_fraud & (rng.random(claim_count) < 0.3)
+    clmt_hire_date = np.where(hire_after_occurrence, clm_occur_date + rng.integers(1, 31, claim_count), clmt_hire_date)
+    disability_before_occurrence = is_fraud & (rng.random(claim_count) < 0.3)
+    clmt_disab_bgn_date = np.where(disability_before_occurrence, clm_occur_date - rng.integers(90, 181, claim_count),
+                                   clmt_disab_bgn_date)
+    unusual_wage = is_fraud & (rng.random(claim_count) < 0.2)
+    clmt_avg_weekly_wage = np.where(unusual_wage, np.round(rng.uniform(10000, 20000, claim_count), 2), clmt_avg_weekly_wage)
+    terminated = is_fraud & (rng.random(claim_count) < 0.2)
+
+    # Fraud claims: terminated or any status; non-fraud claims: mostly "Active"
+    employment_status = np.where(
+        is_fraud,
+        np.where(terminated, 'Terminated', employment_statuses[rng.integers(0, len(employment_statuses), claim_count)]),
+        np.where(rng.random(claim_count) < 0.9, 'Active', 'On Leave')
+    ).astype(object)
+
+    reason_code = hire_after_occurrence * 1 + disability_before_occurrence * 2 + unusual_wage * 4 + terminated * 8
+    additional_details_df = pd.DataFrame({
+        'CLM_DTL_ID': claim_df['CLM_DTL_ID'].to_numpy(),
+        'CLMT_HIRE_DT': clmt_hire_date,
+        'CLMT_JOB_TITLE': job_title,
+        'CLMT_JOB_TYP': np.where(rng.random(claim_count) < 0.8, 'Full-time', 'Part-time').astype(object),
+        'CLMT_DISAB_BGN_DT': clmt_disab_bgn_date,
+        'CLMT_AVG_WKLY_WAGE': clmt_avg_weekly_wage,
+        'JOB_DESC': job_desc,
+        'WORK_ENVIRONMENT': work_environment,
+        'EMPLOYMENT_STATUS': employment_status,
+        'FRAUD_REASON_ADDITIONAL': build_fraud_reason_lookup(additional_fraud_reasons, none_label='')[reason_code]
+    })
+    print(" Claim Additional Details generated.")
+    return additional_details_df
+
+
+def generate_injury_details_batched(claim_df, customer_df, injury_id_start=111001, seed=None):
+    """
+    Array-based version of generate_injury_details.
+    The 1-3 injuries per claim are laid out with repeat/offset arrays, fraud perturbations are
+    applied with boolean masks and the claims' FRAUD_REASON strings are rebuilt in one grouped pass.
+    """
+    print(" Generating Injury Details (batched)...")
+    rng = np.random.default_rng(seed)
+    injury_severities = np.array(['Low', 'Medium', 'High'], dtype=object)
+    body_parts = np.array(injury_body_parts, dtype=object)
+    types = np.array(injury_types, dtype=object)
+    desk_job_roles = ['Software Engineer', 'Data Analyst', 'Office Manager', 'Accountant']
+    high_risk_injuries = ['Burn', 'Fracture', 'Sprain']
+
+    # Each claim can have 1 to 3 injuries
+    num_injuries = rng.integers(1, 4, len(claim_df))
+    claim_rows = np.repeat(np.arange(len(claim_df)), num_injuries)
+    injury_count = len(claim_rows)
+
+    injury_pob = rng.integers(0, len(body_parts), injury_count)
+    injury_severity = rng.integers(0, len(injury_severities), injury_count)
+    injury_type = rng.integers(0, len(types), injury_count)
+    treatment_required = injury_severity > 0  # Medium and High severity injuries need treatment
+    days_lost = np.where(treatment_required, rng.integers(5, 181, injury_count), rng.integers(0, 31, injury_count))
+
+    # Fraud-specific logic, as bits in injury_fraud_reasons order
+    is_fraud = claim_df['CLM_FRAUD_IND'].to_numpy()[claim_rows] == 1
+    high_without_treatment = is_fraud & (rng.random(injury_count) < 0.3) & (injury_severity == 2) & ~treatment_required
+    exaggerated = is_fraud & (rng.random(injury_count) < 0.2)
+    days_lost = np.where(exaggerated, rng.integers(181, 366, injury_count), days_lost)
+    inconsistent_type = is_fraud & (rng.random(injury_count) < 0.2)
+    injury_type = np.where(inconsistent_type, rng.integers(0, len(types), injury_count), injury_type)
+    suspicious_notes = is_fraud & (rng.random(injury_count) < 0.3)
+    if 'CLMT_JOB_TTL' in claim_df.columns:
+        desk_job = claim_df['CLMT_JOB_TTL'].isin(desk_job_roles).to_numpy()[claim_rows]
+    else:
+        desk_job = np.zeros(injury_count, dtype=bool)
+    occupation_mismatch = is_fraud & desk_job & np.isin(types[injury_type], high_risk_injuries)
+
+    injury_df = pd.DataFrame({
+        'CLM_INJ_ID': 'INJ' + pd.Series(np.arange(injury_id_start, injury_id_start + injury_count)).astype(str),
+        'CLM_DTL_ID': claim_df['CLM_DTL_ID'].to_numpy()[claim_rows],
+        'INJURY_BODY_PART': body_parts[injury_pob],
+        'INJURY_SEVERITY': injury_severities[injury_severity],
+        'INJURY_TYPE': types[injury_type],
+        'TREATMENT_REQUIRED': np.where(treatment_required, 'Yes', 'No').astype(object),
+        'DAYS_LOST': days_lost
+    })
+
+    # Injury reason strings: one lookup entry per (reason bits, body part) combination
+    reason_code = (high_without_treatment * 1 + exaggerated * 2 + inconsistent_type * 4 + suspicious_notes * 8
+                   + occupation_mismatch * 16)
+    reason_lookup = np.array([
+        build_fraud_reason_lookup([reason.format(body_part=body_part) for reason in injury_fraud_reasons], none_label='')
+        for body_part in body_parts
+    ])
+    has_reason = reason_code > 0
+    injury_reasons = pd.Series(reason_lookup[injury_pob[has_reason], reason_code[has_reason]])
+
+    # Append injury fraud reasons to each claim's FRAUD_REASON in one grouped pass
+    claim_injury_reasons = injury_reasons.groupby(claim_rows[has_reason], sort=True).agg(', '.join)
+    if len(claim_injury_reasons):
+        updated_rows = claim_injury_reasons.index.to_numpy()
+        fraud_reason_col = claim_df.columns.get_loc('FRAUD_REASON')
+        existing_reason = claim_df.iloc[updated_rows, fraud_reason_col].fillna('').astype(str).to_numpy()
+        updated_reason = pd.Series(existing_reason + ', ' + claim_injury_reasons.to_numpy()).str.strip(', ')
+        claim_df.iloc[updated_rows, fraud_reason_col] = updated_reason.to_numpy()
+
+    print(f" Injury Details generated: {len(injury_df)} injuries.")
+    return injury_df, claim_df
+
+
+def generate_claim_status_batched(claim_df, claim_status_id_allocator=None, seed=None):
+    """Array-based version of generate_claim_status."""
+    print("Generating Claim Status Details (batched)...")
+    rng = np.random.default_rng(seed)
+    claim_count = len(claim_df)
+    if claim_status_id_allocator is None:
+        claim_status_id_allocator = create_claim_status_id_allocator(claim_count, seed=int(rng.integers(2 ** 63)))
+
+    clm_rpt_dt = pd.to_datetime(claim_df['CLM_RPT_DT']).to_numpy().astype('datetime64[D]')
+    is_fraud = claim_df['CLM_FRAUD_IND'].to_numpy() == 1
+
+    # 10% of fraud claims declined, 5% of the rest pending; 25% of non-fraud claims pending
+    declined = is_fraud & (rng.random(claim_count) < 0.10)
+    pending = np.where(is_fraud, ~declined & (rng.random(claim_count) < 0.05), rng.random(claim_count) < 0.25)
+
+    clm_sts_cd = np.where(declined, 'Declined', np.where(pending, 'Pending', 'Approved')).astype(object)
+    status_reason = np.where(pending, np.where(is_fraud, 'Claim under review for suspected fraud',
+                                               'Claim under review for additional information'),
+                             'Claim approved within policy terms').astype(object)
+    if declined.any():
+        status_reason[declined] = 'Claim declined due to fraud: ' + claim_df['FRAUD_REASON'].to_numpy()[declined].astype(str)
+
+    # Approved and declined within a week, pending up to 15 weeks
+    clm_sts_dt = clm_rpt_dt + np.where(pending, 7 * rng.integers(1, 16, claim_count), rng.integers(1, 8, claim_count))
+
+    status_df = pd.DataFrame({
+        'CLM_DTL_ID': claim_df['CLM_DTL_ID'].to_numpy(),
+        'CLM_STS_ID': claim_status_id_allocator.allocate(claim_count),
+        'CLM_STS_CD': clm_sts_cd,
+        'CLM_STS_DT': clm_sts_dt,
+        'STATUS_REASON': status_reason
+    })
+    print(f"Claim Status Details generated: {len(status_df)} statuses.")
+    return status_df
+
+
+# Per-worker copies of the dimension tables for sharded generation, set by the pool initializer
+shard_context = {}
+
+
+def init_claim_shard_worker(policy_df, customer_df):
+    """Pool initializer: receive the dimension tables once per worker process."""
+    shard_context['policy_df'] = policy_df
+    shard_context['customer_df'] = customer_df
+
+
+def generate_claim_shard(shard_spec):
+    """
+    Generate one shard of claims with its additional, injury and status child tables.
+    All randomness is drawn from the shard's SeedSequence, and every ID range
+    (claim IDs, injury IDs, status IDs) is offset or partitioned by shard. Claim numbers are left
+    empty: they are allocated once all shards are done (see allocate_claim_numbers).
+    """
+    policy_df = shard_context['policy_df']
+    customer_df = shard_context['customer_df']
+    claim_offset = shard_spec['claim_offset']
+    num_claims = shard_spec['num_claims']
+
+    rng = np.random.default_rng(shard_spec['seed_sequence'])
+
+    claim_df = generate_claim_details_batched(
+        policy_df, customer_df, min_claims=num_claims, seed=rng, claim_id_start=11001 + claim_offset, fraud_claims=shard_spec['fraud_claims'],
+        claim_numbers=False
+    )
+    claim_fraud_reason = claim_df['FRAUD_REASON'].copy()  # Before injury reasons are appended
+
+    additional_details_df = generate_claim_additional_details_batched(claim_df, seed=rng)
+    # Each claim has at most 3 injuries, so 3 IDs per preceding claim keep shards disjoint
+    injury_df, claim_df = generate_injury_details_batched(claim_df, customer_df,
+                                                          injury_id_start=111001 + 3 * claim_offset, seed=rng)
+    status_id_allocator = create_claim_status_id_allocator(
+        shard_spec['total_claims'], seed=shard_spec['id_seed'], issued=claim_offset, stop=claim_offset + num_claims
+    )
+    status_df = generate_claim_status_batched(claim_df, claim_status_id_allocator=status_id_allocator, seed=rng)
+    return claim_df, claim_fraud_reason, additional_details_df, injury_df, status_df
+
+
+def claim_number_allocator_for(claims_per_year, seed):
+    """
+    Claim number allocator whose suffix holds claims_per_year numbers in every year: 6 digits
+    unless some year needs more.
+    """
+    claim_number_high = 10 ** 6
+    while claim_number_high - claim_number_high // 10 < claims_per_year:
+        claim_number_high *= 10
+    return ClaimNumberAllocator(seed=seed, low=claim_number_high // 10, high=claim_number_high)
+
+
+def allocate_claim_numbers(claim_df, seed):
+    """
+    Claim numbers of the claims in claim_df, drawn from one allocator keyed by occurrence year.
+    The suffix width follows the busiest year rather than the size of the whole run.
+    """
+    occur_year = pd.to_datetime(claim_df['CLM_OCCR_DT']).dt.year.to_numpy(dtype=np.int64)
+    busiest_year = int(np.unique(occur_year, return_counts=True)[1].max()) if len(occur_year) else 0
+    claim_number_allocator = claim_number_allocator_for(busiest_year, seed)
+    return pd.Series(claim_number_allocator.allocate(occur_year), index=claim_df.index).astype(str)
+
+
+def generate_claim_tables_sharded(policy_df, customer_df, min_claims=15000, fraud_percentage=0.05,
+                                  num_shards=None, max_workers=None, seed=None):
+    """
+    Generate claims and their additional/injury/status child tables across a process pool.
+    Each shard gets a deterministic seed spawned from the master seed, so the same seed and
+    shard count always reproduce the same dataset. Shard outputs are concatenated in shard order.
+    Returns (claim_df, claim_fraud_reason, additional_details_df, injury_df, status_df).
+    """
+    num_shards = num_shards or os.cpu_count()
+    max_workers = max_workers or min(num_shards, os.cpu_count())
+    print(f"Generating {min_claims} claims in {num_shards} shards on {max_workers} workers...")
+
+    master_seed = np.random.SeedSequence(seed)
+    shard_seeds = master_seed.spawn(num_shards)
+    id_seed = int(master_seed.generate_state(1)[0])
+
+    shard_claims = np.diff(np.linspace(0, min_claims, num_shards + 1).astype(np.int64))
+    shard_fraud_claims = np.diff(np.linspace(0, int(min_claims * fraud_percentage), num_shards + 1).astype(np.int64))
+    claim_offsets = np.concatenate(([0], np.cumsum(shard_claims)[:-1]))
+    shard_specs = [{
+        'num_claims': int(shard_claims[shard]),
+        'fraud_claims': int(shard_fraud_claims[shard]),
+        'claim_offset': int(claim_offsets[shard]),
+        'total_claims': min_claims,
+        'seed_sequence': shard_seeds[shard],
+        'id_seed': id_seed
+    } for shard in range(num_shards)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_claim_shard_worker,
+                             initargs=(policy_df, customer_df)) as executor:
+        shard_results = list(executor.map(generate_claim_shard, shard_specs))
+
+    # Stitch shard outputs together in shard order
+    claim_df, claim_fraud_reason, additional_details_df, injury_df, status_df = [
+        pd.concat(tables, ignore_index=True) for tables in zip(*shard_results)
+    ]
+    # Claim years are only known once every shard is done
+    claim_df['CLM_NO'] = allocate_claim_numbers(claim_df, id_seed)
+    print(f"Sharded generation completed: {len(claim_df)} claims, {len(injury_df)} injuries.")
+    return claim_df, claim_fraud_reason, additional_details_df, injury_df, status_df
+
+
 def merge_claimant_details(claim_df, customer_df):
     """
     Merges claimant details from customer_df into claim_df.
@@ -635,16 +1217,305 @@ def merge_claimant_details(claim_df, customer_df):
     print(" Merge completed successfully.")
     return unified_claims_df
 
+# Outputs written by the current run, relative to the 'data/' directory
+saved_outputs = []
+
 # Function to save CSV files
 def save_csv(dataframe, filename):
     """Save a DataFrame as a CSV file in the 'data/' directory."""
     filepath = os.path.join(os.getcwd(), 'data', filename)
     dataframe.to_csv(filepath, index=False)
+    saved_outputs.append(filename)
     print(f"CSV saved: {filepath}")
 
-def generate_all_csvs():
+
+def seed_all_generators(seed):
+    """Seed every source of randomness used by the looped generators: random, Faker and NumPy."""
+    random.seed(seed)
+    fake.seed_instance(seed)
+    np.random.seed(seed % 2 ** 32)
+
+
+def build_unified_dimension_indexes(policy_df, customer_df):
+    """
+    Precompute the policy and customer indexes used by join_unified_dataset.
+    Each index keeps only the columns that survive into the unified dataset.
+    """
+    policy_columns = [col for col in policy_df.columns if col != 'PLCY_NO' and col not in unified_dropped_columns]
+    role_columns = {
+        prefix: [col for col in customer_df.columns if prefix + col not in unified_dropped_columns]
+        for prefix, _ in unified_customer_roles
+    }
+    customer_columns = [col for col in customer_df.columns if any(col in cols for cols in role_columns.values())]
+    return {
+        'policy': DimensionIndex(policy_df, 'PLCY_NO', policy_columns),
+        'customer': DimensionIndex(customer_df, 'CUST_ID', customer_columns),
+        'customer_roles': role_columns
+    }
+
+
+def join_unified_dataset(claim_df, additional_details_df, injury_df, status_df, dimension_indexes):
+    """
+    Join the claim tables with policy and customer details into the unified dataset.
+    Policy and customer roles are resolved through precomputed row positions and gathered with
+    take, so the columns in unified_dropped_columns are never materialized. Claims repeat once per
+    injury, as with left merges on CLM_DTL_ID.
+    """
+    print("Joining All Data...")
+    num_claims = len(claim_df)
+    claim_ids = claim_df['CLM_DTL_ID']
+
+    # Each claim repeats once per injury (or once with empty injury columns)
+    claim_positions = DimensionIndex(claim_df[['CLM_DTL_ID']], 'CLM_DTL_ID', []).lookup(injury_df['CLM_DTL_ID'])
+    claim_rows, injury_rows = expand_one_to_many(claim_positions, num_claims)
+
+    # Resolve every dimension at claim level, then spread to the expanded rows
+    policy_index = dimension_indexes['policy']
+    customer_index = dimension_indexes['customer']
+    joined = [
+        take_rows(claim_df[[col for col in claim_df.columns if col not in unified_dropped_columns]], claim_rows),
+        policy_index.take(policy_index.lookup(claim_df['PLCY_NO'])[claim_rows])
+    ]
+    for prefix, key in unified_customer_roles:
+        customer_positions = customer_index.lookup(claim_df[key])[claim_rows]
+        joined.append(customer_index.take(customer_positions, prefix, dimension_indexes['customer_roles'][prefix]))
+
+    for child_df in [additional_details_df, status_df]:
+        child_columns = [col for col in child_df.columns if col != 'CLM_DTL_ID' and col not in unified_dropped_columns]
+        child_index = DimensionIndex(child_df, 'CLM_DTL_ID', child_columns)
+        joined.append(child_index.take(child_index.lookup(claim_ids)[claim_rows]))
+
+    injury_columns = [col for col in injury_df.columns if col != 'CLM_DTL_ID' and col not in unified_dropped_columns]
+    joined.insert(len(joined) - 1, take_rows(injury_df[injury_columns].reset_index(drop=True), injury_rows))
+
+    unified_df = pd.concat(joined, axis=1)
+    print(f"Unified dataset joined, shape: {unified_df.shape}")
+    return unified_df
+
+
+# Tables written by streaming generation, one CSV per claim-year partition
+streaming_tables = [
+    'Claim_Details.csv', 'Claim_Additional_Details.csv', 'Injury_Details.csv',
+    'Claim_Status_Details.csv', 'Unified_Customer_Policy_Claim_Details.csv'
+]
+
+
+def append_partitioned_csv(dataframe, partition_years, output_dir, filename):
+    """Append rows to <output_dir>/CLM_YEAR=<year>/<filename>, writing the header for new files."""
+    for year in np.unique(partition_years):
+        partition_dir = os.path.join(output_dir, f"CLM_YEAR={year}")
+        os.makedirs(partition_dir, exist_ok=True)
+        filepath = os.path.join(partition_dir, filename)
+        dataframe[partition_years == year].to_csv(filepath, mode='a', header=not os.path.exists(filepath), index=False)
+
+
+def generate_claims_streaming(policy_df, customer_df, min_claims=15000, fraud_percentage=0.05, chunk_size=100000,
+                              seed=None, output_dir=os.path.join('data', 'partitioned')):
+    """
+    Streaming, bounded-memory generation of claims, their child tables and the unified dataset.
+    Claims are generated in chunks of chunk_size, joined against the in-memory policy and customer
+    tables and appended to per-claim-year partition files, so peak memory depends on chunk_size
+    rather than on min_claims.
+    """
+    print(f"Streaming {min_claims} claims in chunks of {chunk_size} to {output_dir}...")
+    rng = np.random.default_rng(seed)
+
+    # Remove partition files from a previous run so chunks are not appended to stale data
+    for filename in streaming_tables:
+        for filepath in glob.glob(os.path.join(output_dir, 'CLM_YEAR=*', filename)):
+            os.remove(filepath)
+
+    # Claim years are drawn chunk by chunk, so the suffix must hold every claim of the run in one year
+    claim_number_allocator = claim_number_allocator_for(min_claims, int(rng.integers(2 ** 63)))
+    status_id_allocator = create_claim_status_id_allocator(min_claims, seed=int(rng.integers(2 ** 63)))
+    dimension_indexes = build_unified_dimension_indexes(policy_df, customer_df)  # Built once for all chunks
+    total_fraud_claims = int(min_claims * fraud_percentage)
+    fraud_claims_done = 0
+    injury_id = 111001
+
+    for chunk_start in range(0, min_claims, chunk_size):
+        chunk_claims = min(chunk_size, min_claims - chunk_start)
+        claim_id_start = 11001 + chunk_start
+
+        # Spread the fraud target evenly over the chunks
+        chunk_fraud_claims = total_fraud_claims * (chunk_start + chunk_claims) // min_claims - fraud_claims_done
+        fraud_claims_done += chunk_fraud_claims
+
+        claim_df = generate_claim_details_batched(
+            policy_df, customer_df, min_claims=chunk_claims, seed=rng, claim_id_start=claim_id_start,
+            fraud_claims=chunk_fraud_claims, claim_number_allocator=claim_number_allocator
+        )
+        claim_years = claim_df['CLM_OCCR_DT'].dt.year.to_numpy()
+        append_partitioned_csv(claim_df, claim_years, output_dir, 'Claim_Details.csv')
+
+        additional_details_df = generate_claim_additional_details_batched(claim_df, seed=rng)
+        injury_df, claim_df = generate_injury_details_batched(claim_df, customer_df, injury_id_start=injury_id, seed=rng)
+        injury_id += len(injury_df)
+        status_df = generate_claim_status_batched(claim_df, claim_status_id_allocator=status_id_allocator, seed=rng)
+        unified_df = join_unified_dataset(claim_df, additional_details_df, injury_df, status_df, dimension_indexes)
+
+        # Child and unified rows go to the partition of their claim
+        for dataframe, filename in [(additional_details_df, 'Claim_Additional_Details.csv'),
+                                    (injury_df, 'Injury_Details.csv'),
+                                    (status_df, 'Claim_Status_Details.csv'),
+                                    (unified_df, 'Unified_Customer_Policy_Claim_Details.csv')]:
+            row_years = claim_years[dataframe['CLM_DTL_ID'].to_numpy() - claim_id_start]
+            append_partitioned_csv(dataframe, row_years, output_dir, filename)
+
+        print(f"Streamed {chunk_start + chunk_claims}/{min_claims} claims.")
+
+    saved_outputs.append(os.path.relpath(output_dir, 'data'))
+    print(f"Streaming generation completed. Partitions written to {output_dir}")
+
+
+# Continuing ID sequences of incremental generation, kept next to the generated tables
+incremental_state_filename = 'incremental_state.json'
+
+
+def max_existing_id(data_dir, filename, column, default):
+    """Largest numeric ID in a column of an existing table (IDs may carry a text prefix)."""
+    filepath = os.path.join(data_dir, filename)
+    if not os.path.exists(filepath):
+        return default
+    ids = pd.read_csv(filepath, usecols=[column], dtype=str)[column].str.replace(r'\D', '', regex=True)
+    ids = pd.to_numeric(ids, errors='coerce')
+    return int(ids.max()) if ids.notna().any() else default
+
+
+def bootstrap_incremental_state(data_dir):
+    """Derive the continuing ID sequences from the tables of a full generator run."""
+    claim_tables = ['Claim_Details.csv', 'Claim_Additional_Details.csv', 'Claim_Status_Details.csv']
+    last_claim_id = max(max_existing_id(data_dir, filename, 'CLM_DTL_ID', 11000) for filename in claim_tables)
+
+    # Claim years already used by the existing claims, whose numbers must never be reissued
+    claim_details_path = os.path.join(data_dir, 'Claim_Details.csv')
+    legacy_claim_years = []
+    last_report_date = date.today() - timedelta(days=1)
+    if os.path.exists(claim_details_path):
+        claim_dates = pd.read_csv(claim_details_path, usecols=['CLM_NO', 'CLM_RPT_DT'], parse_dates=['CLM_RPT_DT'])
+        legacy_claim_years = sorted(int(year) for year in claim_dates['CLM_NO'].astype(str).str[:4].unique())
+        last_report_date = claim_dates['CLM_RPT_DT'].max().date()
+
+    return {
+        'next_claim_id': last_claim_id + 1,
+        'next_injury_id': max_existing_id(data_dir, 'Injury_Details.csv', 'CLM_INJ_ID', 111000) + 1,
+        'next_status_id': max_existing_id(data_dir, 'Claim_Status_Details.csv', 'CLM_STS_ID', 11109999) + 1,
+        'claim_number_seed': int(np.random.SeedSequence().entropy % 2 ** 63),
+        'claim_number_issued': {},
+        'legacy_claim_years': legacy_claim_years,
+        'last_report_date': last_report_date.isoformat()
+    }
+
+
+def load_incremental_state(data_dir):
+    """Load the saved incremental state, bootstrapping it from the existing tables on first use."""
+    state_path = os.path.join(data_dir, incremental_state_filename)
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            return json.load(f)
+    return bootstrap_incremental_state(data_dir)
+
+
+def save_incremental_state(data_dir, state):
+    with open(os.path.join(data_dir, incremental_state_filename), 'w') as f:
+        json.dump(state, f, indent=2)
+
+
+def allocate_fresh_claim_numbers(claim_df, claim_number_allocator, data_dir, legacy_claim_years):
+    """Re-draw any claim number that collides with a claim of the original full run."""
+    claim_numbers = claim_df['CLM_NO'].to_numpy(dtype=np.int64)
+    claim_years = claim_numbers // 10 ** claim_number_allocator.suffix_digits
+    if not np.isin(claim_years, legacy_claim_years).any():
+        return claim_df
+
+    legacy_numbers = pd.read_csv(os.path.join(data_dir, 'Claim_Details.csv'), usecols=['CLM_NO'])['CLM_NO']
+    legacy_numbers = pd.to_numeric(legacy_numbers, errors='coerce').dropna().to_numpy(dtype=np.int64)
+    colliding = np.isin(claim_numbers, legacy_numbers)
+    while colliding.any():
+        claim_numbers[colliding] = claim_number_allocator.allocate(claim_years[colliding])
+        colliding = np.isin(claim_numbers, legacy_numbers)
+    claim_df['CLM_NO'] = claim_numbers
+    return claim_df
+
+
+def generate_incremental_claims(num_claims, window_start=None, window_end=None, fraud_percentage=0.05, seed=None,
+                                data_dir='data', output_dir=os.path.join('data', 'incremental')):
+    """
+    Append a batch of num_claims new claims (with additional details, injuries, status and the
+    unified rows) against the existing Customer_Details.csv and Policy_Details.csv.
+    Claims are reported between window_start and window_end (default: the day after the previous
+    batch) under policies in force on their occurrence date. Claim, injury, status IDs and claim
+    numbers continue the sequences recorded in data/incremental_state.json, so repeated batches
+    never reuse an ID. Each batch is written to <output_dir>/batch_<start>_<end>/.
+    """
+    print("Loading Customer and Policy Details...")
+    customer_df = pd.read_csv(os.path.join(data_dir, 'Customer_Details.csv'), parse_dates=['CUST_DOB', 'CUST_DOD'],
+                              dtype={'CUST_ZIP': str, 'CUST_PH_NO': str, 'CUST_TAX_ID': str})
+    policy_df = pd.read_csv(os.path.join(data_dir, 'Policy_Details.csv'), parse_dates=['PLCY_STRT_DT', 'PLCY_END_DT'])
+
+    state = load_incremental_state(data_dir)
+    if window_start is None:
+        window_start = date.fromisoformat(state['last_report_date']) + timedelta(days=1)
+    if window_end is None:
+        window_end = window_start
+    if window_end < window_start:
+        raise ValueError(f"Window end {window_end} is before window start {window_start}")
+    print(f"Generating {num_claims} incremental claims reported {window_start} to {window_end}...")
+
+    rng = np.random.default_rng(seed)
+    claim_number_allocator = ClaimNumberAllocator(seed=state['claim_number_seed'], issued=state['claim_number_issued'])
+    claim_df = generate_claim_details_batched(
+        policy_df, customer_df, min_claims=num_claims, fraud_percentage=fraud_percentage, seed=rng,
+        claim_id_start=state['next_claim_id'], claim_number_allocator=claim_number_allocator,
+        report_window=(window_start, window_end)
+    )
+    claim_df = allocate_fresh_claim_numbers(claim_df, claim_number_allocator, data_dir, state['legacy_claim_years'])
+
+    additional_details_df = generate_claim_additional_details_batched(claim_df, seed=rng)
+    injury_df, claim_df = generate_injury_details_batched(claim_df, customer_df, injury_id_start=state['next_injury_id'],
+                                                          seed=rng)
+    # Status IDs continue as a contiguous block after the last issued one
+    status_id_allocator = IdAllocator(state['next_status_id'], state['next_status_id'] + num_claims,
+                                      seed=int(rng.integers(2 ** 63)))
+    status_df = generate_claim_status_batched(claim_df, claim_status_id_allocator=status_id_allocator, seed=rng)
+    dimension_indexes = build_unified_dimension_indexes(policy_df, customer_df)
+    unified_df = join_unified_dataset(claim_df, additional_details_df, injury_df, status_df, dimension_indexes)
+
+    batch_dir = os.path.join(output_dir, f"batch_{window_start}_{window_end}")
+    os.makedirs(batch_dir, exist_ok=True)
+    for dataframe, filename in [(claim_df, 'Claim_Details.csv'),
+                                (additional_details_df, 'Claim_Additional_Details.csv'),
+                                (injury_df, 'Injury_Details.csv'),
+                                (status_df, 'Claim_Status_Details.csv'),
+                                (unified_df, 'Unified_Customer_Policy_Claim_Details.csv')]:
+        dataframe.to_csv(os.path.join(batch_dir, filename), index=False)
+
+    # The state is saved only once the batch is fully written
+    state.update({
+        'next_claim_id': state['next_claim_id'] + num_claims,
+        'next_injury_id': state['next_injury_id'] + len(injury_df),
+        'next_status_id': state['next_status_id'] + num_claims,
+        'claim_number_issued': {str(year): count for year, count in claim_number_allocator.issued_counts().items()},
+        'last_report_date': max(date.fromisoformat(state['last_report_date']), window_end).isoformat()
+    })
+    save_incremental_state(data_dir, state)
+    print(f"Incremental batch written to {batch_dir}")
+    return batch_dir
+
+
+def generate_all_csvs(min_claims=15000, batched=False, seed=None, pooled_customers=False, num_shards=1, max_workers=None,
+                      stream=False, chunk_size=100000, reference_date=default_reference_date):
+    if seed is not None:
+        seed_all_generators(seed)
+    # Customers get their own stream so they are independent of the claim draws
+    customer_seed = np.random.SeedSequence(seed).spawn(1)[0] if seed is not None else None
+
     print("Generating Customer Details...")
-    customer_df = generate_customer_details(num_customers)
+    if pooled_customers:
+        customer_df = generate_customer_details_pooled(num_customers, num_claimant, num_insured, seed=customer_seed,
+                                                       reference_date=reference_date)
+    else:
+        customer_df = generate_customer_details(num_customers)
     save_csv(customer_df, 'Customer_Details.csv')
 
     print("Generating Policy Details...")
@@ -652,119 +1523,119 @@ def generate_all_csvs():
     policy_df = generate_policy_details(insured_customers)
     save_csv(policy_df, 'Policy_Details.csv')
 
-    print("Generating Claim Details...")
-    claim_df = generate_claim_details(policy_df, customer_df, min_claims=15000)
-    save_csv(claim_df, 'Claim_Details.csv')
-
-    print("Generating Claim Additional Details...")
-    additional_details_df = generate_claim_additional_details(claim_df)
-    save_csv(additional_details_df, 'Claim_Additional_Details.csv')
-
-    print("Generating Injury Details...")
-    injury_df, updated_claim_df = generate_injury_details(claim_df, customer_df)
-    save_csv(injury_df, 'Injury_Details.csv')
-    save_csv(updated_claim_df, 'Updated_Claim_Details.csv')
+    if stream:
+        # Streaming mode: claims, child tables and unified rows go straight to partitioned files
+        generate_claims_streaming(policy_df, customer_df, min_claims=min_claims, chunk_size=chunk_size, seed=seed)
+        return
+
+    if num_shards > 1:
+        # Sharded mode: claims and their child tables are generated in a process pool
+        claim_df, claim_fraud_reason, additional_details_df, injury_df, status_df = generate_claim_tables_sharded(
+            policy_df, customer_df, min_claims=min_claims, num_shards=num_shards, max_workers=max_workers, seed=seed)
+        save_csv(claim_df.assign(FRAUD_REASON=claim_fraud_reason), 'Claim_Details.csv')
+        save_csv(additional_details_df, 'Claim_Additional_Details.csv')
+        save_csv(injury_df, 'Injury_Details.csv')
+        save_csv(claim_df, 'Updated_Claim_Details.csv')
+        save_csv(status_df, 'Claim_Status_Details.csv')
+    else:
+        rng = np.random.default_rng(seed)  # Shared by the batched generators
+        print("Generating Claim Details...")
+        if batched:
+            claim_df = generate_claim_details_batched(policy_df, customer_df, min_claims=min_claims, seed=rng)
+        else:
+            claim_df = generate_claim_details(policy_df, customer_df, min_claims=min_claims)
+        save_csv(claim_df, 'Claim_Details.csv')
 
-    print("Generating Claim Status Details...")
-    status_df = generate_claim_status(claim_df)
-    save_csv(status_df, 'Claim_Status_Details.csv')
+        print("Generating Claim Additional Details...")
+        if batched:
+            additional_details_df = generate_claim_additional_details_batched(claim_df, seed=rng)
+        else:
+            additional_details_df = generate_claim_additional_details(claim_df)
+        save_csv(additional_details_df, 'Claim_Additional_Details.csv')
 
-    print("Merging All Data...")
+        print("Generating Injury Details...")
+        if batched:
+            injury_df, updated_claim_df = generate_injury_details_batched(claim_df, customer_df, seed=rng)
+        else:
+            injury_df, updated_claim_df = generate_injury_details(claim_df, customer_df)
+        save_csv(injury_df, 'Injury_Details.csv')
+        save_csv(updated_claim_df, 'Updated_Claim_Details.csv')
 
-    #  Step 1: Merge Claim Details with Policy Details
-    print("Merging Claim Details with Policy Details...")
-    unified_df = pd.merge(
-        claim_df,
-        policy_df,
-        on='PLCY_NO',
-        how='left'
-    )
+        print("Generating Claim Status Details...")
+        if batched:
+            status_df = generate_claim_status_batched(claim_df, seed=rng)
+        else:
+            status_df = generate_claim_status(claim_df)
+        save_csv(status_df, 'Claim_Status_Details.csv')
 
-    print("Merging Insured Customer Details...")
-    #  Step 2: Merge Insured Customer Details with Prefix
-    unified_df = pd.merge(
-        unified_df,
-        customer_df.add_prefix('INSURED_'),
-        left_on='CUST_ID_INSURED',
-        right_on='INSURED_CUST_ID',
-        how='left'
-    )
-    print(f"After merging insured customer details, shape: {unified_df.shape}")
-    print(unified_df.columns)  # Debug: Print columns
-
-    print("Merging Claimant Customer Details...")
-    #  Step 3: Merge Claimant Customer Details with Prefix
-    unified_df = pd.merge(
-        unified_df,
-        customer_df.add_prefix('CLAIMANT_'),
-        left_on='CUST_ID_CLAIMANT',
-        right_on='CLAIMANT_CUST_ID',
-        how='left'
-    )
-    print(f"After merging claimant customer details, shape: {unified_df.shape}")
-    print(unified_df.columns)  # Debug: Print columns
-
-    print("Merging Medical Provider Customer Details...")
-    #  Step 4: Merge Medical Provider Customer Details with Prefix
-    unified_df = pd.merge(
-        unified_df,
-        customer_df.add_prefix('MEDPROV_'),
-        left_on='CUST_ID_MED_PROV',
-        right_on='MEDPROV_CUST_ID',
-        how='left'
-    )
-    print(f"After merging medical provider customer details, shape: {unified_df.shape}")
-    print(unified_df.columns)  # Debug: Print columns
-
-    print("Merging Additional Claim Details...")
-    #  Step 5: Merge Claim Additional Details
-    unified_df = pd.merge(
-        unified_df,
-        additional_details_df,
-        on='CLM_DTL_ID',
-        how='left'
-    )
-    print(f"After merging additional claim details, shape: {unified_df.shape}")
-
-    print("Merging Injury Details...")
-    #  Step 6: Merge Injury Details
-    unified_df = pd.merge(
-        unified_df,
-        injury_df,
-        on='CLM_DTL_ID',
-        how='left'
-    )
-    print(f"After merging injury details, shape: {unified_df.shape}")
-
-    print("Merging Claim Status Details...")
-    #  Step 7: Merge Claim Status Details
-    unified_df = pd.merge(
-        unified_df,
-        status_df,
-        on='CLM_DTL_ID',
-        how='left'
-    )
-    print(f"After merging claim status details, shape: {unified_df.shape}")
-
-    # Drop unnecessary columns
-    unified_df.drop(columns=[ 'MEDPROV_CUST_DOD', 'MEDPROV_CUST_DOB', 'MEDPROV_CUST_GENDER', 'MEDPROV_CUST_LST_NM', 'INSURED_CUST_DOD'
-                              , 'INSURED_CUST_DOB', 'INSURED_CUST_GENDER', 'INSURED_CUST_LST_NM', 'CUST_ID', 'INSURED_CUST_TYP'
-                              , 'INSURED_CUST_TAX_ID_TYP', 'CLAIMANT_CUST_TYP', 'CLAIMANT_CUST_TAX_ID_TYP'
-                              , 'MEDPROV_CUST_ID', 'MEDPROV_CUST_TAX_ID_TYP', 'INSURED_CUST_CITY', 'INSURED_CUST_ZIP'
-                              , 'CLAIMANT_CUST_ZIP', 'MEDPROV_CUST_TYP', 'MEDPROV_CUST_ADDR', 'MEDPROV_CUST_CITY', 'MEDPROV_CUST_ZIP'
-                              , 'MEDPROV_CUST_EMAIL', 'MEDPROV_CUST_PH_NO', 'MEDPROV_CUST_TAX_ID', 'INSURED_CUST_PH_NO', 'INSURED_CUST_EMAIL'
-                              , 'INSURED_CUST_TAX_ID', 'CLAIMANT_CUST_ADDR', 'CLAIMANT_CUST_CITY', 'CLAIMANT_CUST_PH_NO', 'CLAIMANT_CUST_EMAIL'
-                              , 'CLM_FRAUD_IND', 'FRAUD_REASON',  'PLCY_DTL_ID', 'INSURED_CUST_ID', 'CLM_STS_ID', 'STATUS_REASON'
-                              , 'CLM_INJ_ID', 'FRAUD_REASON_ADDITIONAL', 'CLAIMANT_CUST_ID'
-    ], inplace=True, errors='ignore')
+    dimension_indexes = build_unified_dimension_indexes(policy_df, customer_df)
+    unified_df = join_unified_dataset(claim_df, additional_details_df, injury_df, status_df, dimension_indexes)
 
     print("Saving Unified CSV...")
     unified_csv_filename = 'Unified_Customer_Policy_Claim_Details.csv'
     save_csv(unified_df, unified_csv_filename)
     print(f"Unified CSV saved: {unified_csv_filename}")
 
+def generate_all_csvs_cached(seed, **params):
+    """
+    Seeded generate_all_csvs backed by the content-addressed dataset cache.
+    The cache key covers the seed, the generator parameters (including the reference date of the
+    pooled customers) and the generator source. The Faker customer generator dates births and
+    deaths relative to today, so without pooled customers today's date is part of the key instead.
+    A repeat run with the same key restores the cached outputs into 'data/' instead of regenerating them.
+    """
+    reference_date = params.get('reference_date', default_reference_date)
+    if not params.get('pooled_customers'):
+        reference_date = date.today()
+    cache_params = dict(params, seed=seed, num_customers=num_customers, num_claimant=num_claimant,
+                        num_insured=num_insured, reference_date=reference_date.isoformat())
+    cache_params.pop('max_workers', None)  # Worker count does not change the output
+    key = cache_key(cache_params, generator_source_files)
+    data_dir = os.path.join(os.getcwd(), 'data')
+    if load_cached_outputs(key, data_dir):
+        return
+
+    saved_outputs.clear()
+    generate_all_csvs(seed=seed, **params)
+    store_outputs(key, data_dir, list(saved_outputs), cache_params)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the synthetic fraud detection dataset.")
+    parser.add_argument('--min-claims', type=int, default=15000, help="Number of claims to generate")
+    parser.add_argument('--batched', action='store_true',
+                        help="Use the NumPy-batched claim, additional details, injury and status generators")
+    parser.add_argument('--pooled-customers', action='store_true', help="Use the pooled customer generator")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Generate claims and child tables in this many shards (uses the batched generator)")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size for sharded generation")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream claims in chunks to per-year partition files under data/partitioned")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Claims per chunk in streaming mode")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Master seed for Faker, random and NumPy; seeded runs are cached under data/cache")
+    parser.add_argument('--reference-date', type=date.fromisoformat, default=default_reference_date,
+                        help="Day the pooled customers' ages are taken at (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="Always regenerate, even for a cached seed")
+    parser.add_argument('--incremental', type=int, default=None, metavar='N',
+                        help="Append N new claims against the existing customer and policy CSVs in data/")
+    parser.add_argument('--window-start', type=date.fromisoformat, default=None,
+                        help="First report date of the incremental batch (default: day after the last batch)")
+    parser.add_argument('--window-end', type=date.fromisoformat, default=None,
+                        help="Last report date of the incremental batch (default: the window start)")
+    args = parser.parse_args()
+
     try:
-        generate_all_csvs()
+        if args.incremental is not None:
+            generate_incremental_claims(args.incremental, window_start=args.window_start, window_end=args.window_end,
+                                        seed=args.seed)
+        else:
+            params = dict(min_claims=args.min_claims, batched=args.batched, pooled_customers=args.pooled_customers,
+                          num_shards=args.shards, max_workers=args.workers, stream=args.stream,
+                          chunk_size=args.chunk_size, reference_date=args.reference_date)
+            if args.seed is not None and not args.no_cache:
+                generate_all_csvs_cached(args.seed, **params)
+            else:
+                generate_all_csvs(seed=args.seed, **params)
     except Exception as e:
         print(f" An error occurred: {e}")
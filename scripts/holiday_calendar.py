@@ -0,0 +1,103 @@
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import holidays
+from dataset_cache import CACHE_DIR
+
+# Bits of a day in the calendar bitmap
+WEEKEND = np.uint8(1)
+HOLIDAY = np.uint8(2)
+
+CALENDAR_CACHE_DIR = os.path.join(CACHE_DIR, 'calendar')
+
+
+def day_ordinals(dates, missing=-1):
+    """Days since 1970-01-01 of a datetime column, array or single timestamp (missing for NaT)."""
+    if np.ndim(dates) == 0:
+        dates = np.datetime64('NaT') if pd.isna(dates) else pd.Timestamp(dates).to_datetime64()
+    days = np.asarray(dates, dtype='datetime64[D]')
+    return np.where(np.isnat(days), missing, days.astype(np.int64))
+
+
+class HolidayCalendar:
+    """
+    Weekends and US holidays of first_year..last_year as a bitmap indexed by day ordinal, plus a running
+    count of business days. Holiday, weekend and business-day-gap queries over datetime columns are
+    then integer array lookups, without building Python date objects per row. Dates outside the years
+    covered (and missing dates) are neither holidays nor weekends.
+    """
+
+    def __init__(self, first_year, last_year, flags, country='US'):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.country = country
+        self.flags = flags
+        self.origin = int(np.datetime64(f'{first_year:04d}-01-01', 'D').astype(np.int64))
+        # business_days[i]: business days among the first i days of the calendar
+        business = (flags == 0).astype(np.int32)
+        self.business_days = np.concatenate([[0], np.cumsum(business, dtype=np.int32)])
+
+    @classmethod
+    def build(cls, first_year, last_year, country='US'):
+        """Compute the bitmap from the holidays package."""
+        days = np.arange(np.datetime64(f'{first_year:04d}-01-01'), np.datetime64(f'{last_year + 1:04d}-01-01'),
+                         dtype='datetime64[D]').astype(np.int64)
+        flags = np.zeros(len(days), dtype=np.uint8)
+        # 1970-01-01 was a Thursday, so (ordinal + 3) % 7 is the weekday with Monday = 0
+        flags[(days + 3) % 7 >= 5] |= WEEKEND
+        country_holidays = holidays.country_holidays(country, years=range(first_year, last_year + 1))
+        flags[day_ordinals(sorted(country_holidays)) - days[0]] |= HOLIDAY
+        return cls(first_year, last_year, flags, country)
+
+    @classmethod
+    def load(cls, first_year, last_year, country='US', cache_dir=CALENDAR_CACHE_DIR):
+        """The calendar of the given years, read from cache_dir or built and cached there."""
+        path = os.path.join(cache_dir, f'{country}_{first_year}_{last_year}.npy')
+        if os.path.exists(path):
+            return cls(first_year, last_year, np.load(path), country)
+
+        calendar = cls.build(first_year, last_year, country)
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary_path = f"{path}.tmp.npy"
+        np.save(temporary_path, calendar.flags)
+        os.replace(temporary_path, path)
+        return calendar
+
+    def positions(self, dates):
+        """Bitmap positions of dates, -1 for dates outside the calendar or missing."""
+        positions = day_ordinals(dates, missing=self.origin - 1) - self.origin
+        return np.where((positions >= 0) & (positions < len(self.flags)), positions, -1)
+
+    def day_flags(self, dates):
+        """WEEKEND/HOLIDAY bits of each date (0 outside the calendar)."""
+        positions = self.positions(dates)
+        return np.where(positions >= 0, self.flags[np.maximum(positions, 0)], np.uint8(0))
+
+    def is_holiday(self, dates):
+        return self.day_flags(dates) & HOLIDAY != 0
+
+    def is_weekend(self, dates):
+        return self.day_flags(dates) & WEEKEND != 0
+
+    def business_days_between(self, start, end):
+        """Business days (neither weekend nor holiday) from start up to, not including, end; NaN when missing."""
+        start_positions, end_positions = self.positions(start), self.positions(end)
+        gaps = (self.business_days[np.maximum(end_positions, 0)]
+                - self.business_days[np.maximum(start_positions, 0)]).astype(np.float64)
+        return np.where((start_positions >= 0) & (end_positions >= 0), gaps, np.nan)
+
+
+@lru_cache(maxsize=None)
+def us_calendar(first_year, last_year):
+    """US calendar of the given years, loaded from disk once per process."""
+    return HolidayCalendar.load(first_year, last_year)
+
+
+def calendar_covering(*date_columns):
+    """US calendar of every year present in the given datetime columns (or single timestamps)."""
+    days = np.concatenate([np.ravel(day_ordinals(dates, missing=np.iinfo(np.int64).min)) for dates in date_columns])
+    years = days[days != np.iinfo(np.int64).min].astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+    if len(years) == 0:
+        return us_calendar(1970, 1970)
+    return us_calendar(int(years.min()), int(years.max()))
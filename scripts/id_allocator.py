@@ -0,0 +1,113 @@
+import numpy as np
+
+# Feistel network parameters
+FEISTEL_ROUNDS = 4
+MIX_MULTIPLIER_1 = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIER_2 = np.uint64(0xBF58476D1CE4E5B9)
+
+
+class IdAllocator:
+    """
+    Hands out unique IDs from the range [low, high) in a shuffled order.
+    The n-th ID is a keyed Feistel permutation of n (with cycle-walking to stay inside the
+    range), so allocation is O(1) per ID and only a counter is kept, however many IDs were issued.
+    Allocators sharing a seed but given disjoint [issued, stop) position windows never collide.
+    """
+
+    def __init__(self, low, high, seed=None, issued=0, stop=None):
+        if high <= low:
+            raise ValueError(f"Empty ID range [{low}, {high})")
+        self.low = low
+        self.size = high - low
+        self.issued = issued  # Permutation position of the next ID
+        self.stop = self.size if stop is None else min(stop, self.size)
+
+        # Balanced Feistel halves covering at least the size of the range
+        total_bits = max(2, int(self.size - 1).bit_length())
+        total_bits += total_bits % 2
+        self.half_bits = np.uint64(total_bits // 2)
+        self.half_mask = np.uint64((1 << (total_bits // 2)) - 1)
+        self.round_keys = np.random.default_rng(seed).integers(0, 2 ** 63, FEISTEL_ROUNDS, dtype=np.uint64)
+
+    @property
+    def remaining(self):
+        return self.stop - self.issued
+
+    def _round(self, right, key):
+        """Feistel round function: a 64-bit mix of the right half and the round key."""
+        mixed = (right ^ key) * MIX_MULTIPLIER_1
+        mixed ^= mixed >> np.uint64(29)
+        mixed *= MIX_MULTIPLIER_2
+        mixed ^= mixed >> np.uint64(32)
+        return mixed & self.half_mask
+
+    def _feistel(self, values):
+        left = values >> self.half_bits
+        right = values & self.half_mask
+        for key in self.round_keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << self.half_bits) | right
+
+    def permute(self, positions):
+        """Map positions in [0, size) to their shuffled offsets in [0, size)."""
+        values = self._feistel(np.asarray(positions, dtype=np.uint64))
+        outside = values >= self.size
+        while outside.any():  # Cycle-walk values that fall outside the range
+            values[outside] = self._feistel(values[outside])
+            outside = values >= self.size
+        return values.astype(np.int64)
+
+    def allocate(self, count):
+        """Allocate a block of count unique IDs as an int64 array."""
+        if count > self.remaining:
+            raise ValueError(f"ID range exhausted: requested {count}, {self.remaining} remaining")
+        positions = np.arange(self.issued, self.issued + count, dtype=np.uint64)
+        self.issued += count
+        return self.low + self.permute(positions)
+
+    def next_id(self):
+        """Allocate a single unique ID."""
+        return int(self.allocate(1)[0])
+
+
+class ClaimNumberAllocator:
+    """
+    Allocates claim numbers of the form <year><6 digits>, with an independent
+    IdAllocator namespace per claim year. low/high widen the suffix (e.g. <year><7 digits>).
+    issued restores per-year counts saved from issued_counts() to continue an earlier sequence.
+    """
+
+    def __init__(self, seed=None, low=100000, high=1000000, issued=None):
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 63)
+        self.low = low
+        self.high = high
+        self.suffix_digits = len(str(high - 1))
+        self.initial_issued = {int(year): count for year, count in (issued or {}).items()}
+        self.namespaces = {}  # year -> IdAllocator
+
+    def namespace(self, year):
+        year = int(year)
+        if year not in self.namespaces:
+            self.namespaces[year] = IdAllocator(self.low, self.high, seed=[self.seed, year],
+                                                issued=self.initial_issued.get(year, 0))
+        return self.namespaces[year]
+
+    def issued_counts(self):
+        """Claim numbers issued so far per year, including restored counts."""
+        counts = dict(self.initial_issued)
+        for year, allocator in self.namespaces.items():
+            counts[year] = allocator.issued
+        return counts
+
+    def allocate(self, years):
+        """Allocate one claim number per entry of years, returned as int64 (year * 10^suffix_digits + suffix)."""
+        years = np.asarray(years, dtype=np.int64)
+        suffixes = np.empty(len(years), dtype=np.int64)
+        for year in np.unique(years):
+            rows = np.flatnonzero(years == year)
+            suffixes[rows] = self.namespace(year).allocate(len(rows))
+        return years * 10 ** self.suffix_digits + suffixes
+
+    def next_claim_number(self, year):
+        """Allocate a single claim number string for the given year."""
+        return f"{int(year)}{self.namespace(year).next_id()}"
@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def rebalance_labels(flagged, target_rate, strategy='random', risk=None, seed=None):
+    """
+    0/1 labels for the flagged rows, with labels flipped so that exactly int(len(flagged) * target_rate)
+    rows are positive. Works on arrays only, without copying any frame.
+    strategy 'random' flips a seeded random choice of rows. strategy 'risk' ranks rows by risk (e.g. the
+    number of rules hit): the lowest-risk flagged rows are unflagged, or the highest-risk unflagged rows
+    are flagged, found with argpartition; ties between equal integer risks are broken at random.
+    Returns the labels and the target count.
+    """
+    labels = np.asarray(flagged).astype(np.int64)
+    target = int(len(labels) * target_rate)
+    current = int(labels.sum())
+    if current == target:
+        return labels, target
+
+    rng = np.random.default_rng(seed)
+    removing = current > target
+    candidates = np.flatnonzero(labels == (1 if removing else 0))
+    count = abs(current - target)
+    if strategy == 'random':
+        chosen = rng.choice(candidates, count, replace=False)
+    elif strategy == 'risk':
+        if risk is None:
+            raise ValueError("The 'risk' strategy needs a risk score per row")
+        scores = np.asarray(risk)[candidates]
+        if np.issubdtype(scores.dtype, np.integer):
+            scores = scores + rng.random(len(candidates))  # Random order within each risk level
+        scores = scores if removing else -scores  # Unflag the lowest risks, flag the highest ones
+        chosen = candidates[np.argpartition(scores, count - 1)[:count]]
+    else:
+        raise ValueError(f"Unknown rebalancing strategy '{strategy}'")
+    labels[chosen] = 0 if removing else 1
+    return labels, target
@@ -0,0 +1,114 @@
+from holiday_calendar import calendar_covering
+from rule_engine import Intermediate, Rule, RuleEngine, between, day_difference, hour, is_in, previous_in_group, weekday
+
+
+def report_is_holiday(values):
+    """US holidays of every report year present in the data, looked up in the precomputed calendar."""
+    report_dates = values['CLM_RPT_DT']
+    return calendar_covering(report_dates).is_holiday(report_dates)
+
+
+# Shared intermediates of the labeling rules
+labeling_intermediates = [
+    day_difference('Days_To_Policy_End', 'PLCY_END_DT', 'CLM_OCCR_DT'),
+    day_difference('Days_From_Policy_Start', 'CLM_OCCR_DT', 'PLCY_STRT_DT'),
+    day_difference('Days_Delay_Reporting', 'CLM_RPT_DT', 'CLM_OCCR_DT'),
+    previous_in_group('Previous_Claim_Date', ['CUST_ID_CLAIMANT'], 'CLM_OCCR_DT'),
+    day_difference('Days_Between_Claims', 'CLM_OCCR_DT', 'Previous_Claim_Date'),
+    previous_in_group('Previous_Claim_Amount', ['CUST_ID_INSURED'], 'CLM_AMT'),
+    Intermediate('Report_Weekday', lambda values: weekday(values['CLM_RPT_DT']), uses=['CLM_RPT_DT']),
+    Intermediate('Report_Hour', lambda values: hour(values['CLM_RPT_DT']), uses=['CLM_RPT_DT']),
+    Intermediate('Report_Is_Holiday', report_is_holiday, uses=['CLM_RPT_DT']),
+    Intermediate('High_Severity_Untreated',
+                 lambda values: (values['INJURY_SEVERITY'] == 'High') & (values['TREATMENT_REQUIRED'] == 'No'),
+                 uses=['INJURY_SEVERITY', 'TREATMENT_REQUIRED'])
+]
+
+
+def night_report_sample(values):
+    """Reports between 10 PM and 6 AM, of which only 1% are marked."""
+    night = (values['Report_Hour'] >= 22) | (values['Report_Hour'] <= 6)
+    return night & (values.uniforms('Fraud_Rule_8') <= 0.01)
+
+
+# Fraud_Rule_1..30, in output column order
+labeling_rules = [
+    # Time-based anomaly rules
+    Rule('Fraud_Rule_1', 'Claim reported before it occurred',
+         lambda values: values['CLM_RPT_DT'] < values['CLM_OCCR_DT'], uses=['CLM_RPT_DT', 'CLM_OCCR_DT']),
+    Rule('Fraud_Rule_2', 'Claim occurred within 14 days of policy end',
+         lambda values: between(values['Days_To_Policy_End'], 1, 14), uses=['Days_To_Policy_End']),
+    Rule('Fraud_Rule_3', 'Claim occurred within 14 days of policy start',
+         lambda values: between(values['Days_From_Policy_Start'], 1, 14), uses=['Days_From_Policy_Start']),
+    Rule('Fraud_Rule_4', 'Claim reported on a weekend',
+         lambda values: is_in(values['Report_Weekday'], [5, 6]), uses=['Report_Weekday']),
+    Rule('Fraud_Rule_5', 'Claim reported more than 30 days after occurrence',
+         lambda values: values['Days_Delay_Reporting'] > 30, uses=['Days_Delay_Reporting']),
+    Rule('Fraud_Rule_6', 'Claim reported on the day of occurrence or earlier',
+         lambda values: values['Days_Delay_Reporting'] < 1, uses=['Days_Delay_Reporting']),
+    Rule('Fraud_Rule_7', 'Claimant filed another claim within the previous 30 days',
+         lambda values: between(values['Days_Between_Claims'], 1, 30), uses=['Days_Between_Claims']),
+    Rule('Fraud_Rule_8', 'Claim reported at night (1% sample)', night_report_sample, uses=['Report_Hour']),
+
+    # Financial anomaly rules
+    Rule('Fraud_Rule_9', 'Claim amount above 90% of the policy claim limit',
+         lambda values: values['CLM_AMT'] > 0.9 * values['PLCY_CLAIM_LIMIT'], uses=['CLM_AMT', 'PLCY_CLAIM_LIMIT']),
+    Rule('Fraud_Rule_10', "Claim amount over 3x the insured's previous claim without a high severity injury",
+         lambda values: (values['CLM_AMT'] > 3 * values['Previous_Claim_Amount']) & (values['INJURY_SEVERITY'] != 'High'),
+         uses=['CLM_AMT', 'Previous_Claim_Amount', 'INJURY_SEVERITY']),
+    Rule('Fraud_Rule_11', 'Insured has another claim with the same amount',
+         group_by=['CUST_ID_INSURED', 'CLM_AMT'], threshold=1),
+    Rule('Fraud_Rule_12', 'Claimant has more than 5 claims', group_by=['CUST_ID_CLAIMANT'], threshold=5),
+
+    # Injury-related anomaly rules
+    Rule('Fraud_Rule_13', 'Burn injury to the back',
+         lambda values: (values['INJURY_TYPE'] == 'Burn') & (values['INJURY_BODY_PART'] == 'Back'),
+         uses=['INJURY_TYPE', 'INJURY_BODY_PART']),
+    Rule('Fraud_Rule_14', 'High severity injury without treatment',
+         lambda values: values['High_Severity_Untreated'], uses=['High_Severity_Untreated']),
+    Rule('Fraud_Rule_15', 'Claimant injured the same body part more than twice',
+         group_by=['CUST_ID_CLAIMANT', 'INJURY_BODY_PART'], threshold=2),
+    Rule('Fraud_Rule_16', 'Burn injury to the head',
+         lambda values: (values['INJURY_BODY_PART'] == 'Head') & (values['INJURY_TYPE'] == 'Burn'),
+         uses=['INJURY_TYPE', 'INJURY_BODY_PART']),
+    Rule('Fraud_Rule_17', 'Neck fracture',
+         lambda values: (values['INJURY_TYPE'] == 'Fracture') & (values['INJURY_BODY_PART'] == 'Neck'),
+         uses=['INJURY_TYPE', 'INJURY_BODY_PART']),
+    Rule('Fraud_Rule_18', 'Amputation of the head, chest or back',
+         lambda values: (values['INJURY_TYPE'] == 'Amputation') & is_in(values['INJURY_BODY_PART'], ['Head', 'Chest', 'Back']),
+         uses=['INJURY_TYPE', 'INJURY_BODY_PART']),
+    Rule('Fraud_Rule_19', 'Internal organ injury without treatment',
+         lambda values: (values['INJURY_BODY_PART'] == 'Internal Organs') & (values['TREATMENT_REQUIRED'] == 'No'),
+         uses=['INJURY_BODY_PART', 'TREATMENT_REQUIRED']),
+    Rule('Fraud_Rule_20', 'Claim has injuries to more than 3 body parts',
+         group_by=['CLM_DTL_ID'], aggregate='nunique', column='INJURY_BODY_PART', threshold=3),
+
+    # Behavioral anomaly rules
+    Rule('Fraud_Rule_21', 'Claimant has several claims occurring on the same day',
+         group_by=['CUST_ID_CLAIMANT', 'CLM_OCCR_DT'], threshold=1),
+    Rule('Fraud_Rule_22', 'Claim reported on a US holiday',
+         lambda values: values['Report_Is_Holiday'], uses=['Report_Is_Holiday']),
+    Rule('Fraud_Rule_23', 'Claimant used more than 5 medical providers',
+         group_by=['CUST_ID_CLAIMANT'], aggregate='nunique', column='CUST_ID_MED_PROV', threshold=5),
+    Rule('Fraud_Rule_24', 'Medical provider has more than 3 claims occurring on the same day',
+         group_by=['CUST_ID_MED_PROV', 'CLM_OCCR_DT'], threshold=3),
+    Rule('Fraud_Rule_25', 'Claimant reported several claims at the same time',
+         group_by=['CUST_ID_CLAIMANT', 'CLM_RPT_DT'], aggregate='nunique', column='CLM_DTL_ID', threshold=1),
+    Rule('Fraud_Rule_26', 'High severity injury with fewer than 3 days lost',
+         lambda values: (values['INJURY_SEVERITY'] == 'High') & (values['DAYS_LOST'] < 3),
+         uses=['INJURY_SEVERITY', 'DAYS_LOST']),
+    Rule('Fraud_Rule_27', 'Low severity injury with more than 30 days lost',
+         lambda values: (values['INJURY_SEVERITY'] == 'Low') & (values['DAYS_LOST'] > 30),
+         uses=['INJURY_SEVERITY', 'DAYS_LOST']),
+    Rule('Fraud_Rule_28', 'Medium severity injury with more than 60 days lost',
+         lambda values: (values['INJURY_SEVERITY'] == 'Medium') & (values['DAYS_LOST'] > 60),
+         uses=['INJURY_SEVERITY', 'DAYS_LOST']),
+    Rule('Fraud_Rule_29', 'High severity injury without treatment',
+         lambda values: values['High_Severity_Untreated'], uses=['High_Severity_Untreated']),
+    Rule('Fraud_Rule_30', 'Low severity injury with treatment',
+         lambda values: (values['INJURY_SEVERITY'] == 'Low') & (values['TREATMENT_REQUIRED'] == 'Yes'),
+         uses=['INJURY_SEVERITY', 'TREATMENT_REQUIRED'])
+]
+
+labeling_rule_names = [rule.name for rule in labeling_rules]  # Bit order of FRAUD_RULE_MASK
+labeling_engine = RuleEngine(labeling_rules, labeling_intermediates)
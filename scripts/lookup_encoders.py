@@ -0,0 +1,76 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+class LookupEncoder:
+    """
+    A category -> value table compiled against a fixed vocabulary: column values are factorized into
+    vocabulary codes and encoded with one take from a code -> value array. The last entry of the array
+    is the default, used for missing values and categories outside the vocabulary.
+    The compiled arrays serialize to plain JSON (to_dict/from_dict), so batch feature engineering and
+    the serving path encode claims with the same tables.
+    """
+
+    def __init__(self, column, vocabulary, values):
+        self.column = column
+        self.vocabulary = list(vocabulary)
+        self.values = np.asarray(values)
+        if len(self.values) != len(self.vocabulary) + 1:
+            raise ValueError(f"Encoder of '{column}' needs one value per category plus the default")
+
+    @classmethod
+    def from_groups(cls, column, groups, levels, default=0):
+        """
+        Compile a table declared as groups of categories, e.g. {'High': ['Burn', ...], 'Low': [...]},
+        with levels giving each group's value ({'High': 3, 'Low': 1}). A category listed in several
+        groups takes the value of the first one.
+        """
+        table = {}
+        for group, categories in groups.items():
+            for category in categories:
+                table.setdefault(category, levels[group])
+        return cls(column, table, list(table.values()) + [default])
+
+    def derive(self, transform):
+        """Encoder of a value computed from this one (e.g. a flag of the highest level) on the same codes."""
+        return LookupEncoder(self.column, self.vocabulary, transform(self.values))
+
+    def codes(self, values):
+        """Vocabulary code of each value; the default's code for missing or unknown values."""
+        if np.ndim(values) == 0:
+            return self.codes([values])[0]
+        codes = pd.Categorical(np.asarray(values, dtype=object), categories=self.vocabulary).codes.astype(np.int64)
+        return np.where(codes < 0, len(self.vocabulary), codes)
+
+    def encode(self, values):
+        """Encoded values of a column, array or single value."""
+        return self.values.take(self.codes(values))
+
+    def to_dict(self):
+        return {'column': self.column, 'vocabulary': self.vocabulary, 'values': self.values.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['column'], data['vocabulary'], data['values'])
+
+
+def apply_encoders(df, encoders):
+    """Add one column per encoder (feature name -> LookupEncoder) to df, encoding its source column."""
+    for name, encoder in encoders.items():
+        df[name] = encoder.encode(df[encoder.column])
+    return df
+
+
+def save_encoders(encoders, path):
+    """Write encoders (feature name -> LookupEncoder) to a JSON file."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({name: encoder.to_dict() for name, encoder in encoders.items()}, f, indent=2)
+
+
+def load_encoders(path):
+    """Encoders written by save_encoders."""
+    with open(path) as f:
+        return {name: LookupEncoder.from_dict(data) for name, data in json.load(f).items()}
@@ -0,0 +1,103 @@
+import os
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from rule_engine import RuleEvaluation
+from seeded_draws import resolve_seed
+
+# Engine used by the labeling worker processes, set by the pool initializer
+worker_context = {}
+
+
+def init_labeling_worker(engine_module, engine_name):
+    """Pool initializer: rule specs hold lambdas, so workers import the engine by name instead of unpickling it."""
+    worker_context['engine'] = getattr(importlib.import_module(engine_module), engine_name)
+
+
+def hash_partitions(keys, num_partitions):
+    """
+    Row positions of each partition when rows are hash-partitioned by an entity key column (file order
+    kept). Partitions no row hashes to are left out, so workers are never handed an empty frame.
+    """
+    partition_ids = pd.util.hash_array(np.asarray(keys)) % np.uint64(num_partitions)
+    order = np.argsort(partition_ids, kind='stable')
+    bounds = np.searchsorted(partition_ids[order], np.arange(num_partitions + 1, dtype=np.uint64))
+    return [order[bounds[partition]:bounds[partition + 1]] for partition in range(num_partitions)
+            if bounds[partition] < bounds[partition + 1]]
+
+
+def compute_partition_values(spec):
+    """Worker: the grouped intermediates of one entity key over the rows of a partition."""
+    values = worker_context['engine'].compute(spec['frame'], spec['names'])
+    return {name: np.asarray(value) for name, value in values.items()}
+
+
+def evaluate_partition(spec):
+    """Worker: all rules over the rows of a partition, with other entities' grouped values given as known."""
+    frame = spec['frame']
+    known = {name: pd.Series(values, index=frame.index) for name, values in spec['known'].items()}
+    evaluation = worker_context['engine'].evaluate(frame, known=known, seed=spec['seed'])
+    return evaluation.flags, {name: np.asarray(evaluation[name]) for name in spec['outputs']}
+
+
+def scatter(partition_values, partitions, num_rows):
+    """Reassemble per-partition arrays into arrays in the original row order."""
+    results = {}
+    for positions, values in zip(partitions, partition_values):
+        for name, value in values.items():
+            if name not in results:
+                results[name] = np.empty(num_rows, dtype=value.dtype)
+            results[name][positions] = value
+    return results
+
+
+def evaluate_parallel(df, engine_module, engine_name, outputs=(), num_partitions=None, max_workers=None, seed=None):
+    """
+    Evaluate a rule engine on df across a process pool, with results identical to
+    engine.evaluate(df, seed=seed). The engine is given by module and attribute name.
+    Grouped intermediates are split by the entity they group on. Rows are hash-partitioned by the
+    entity with the most grouped rules (e.g. CUST_ID_CLAIMANT) and each partition evaluates every
+    rule. The grouped values of the other entities (insured, provider, claim, ...) come from one
+    extra shuffle per entity, hash-partitioned by that entity's key. Returns a RuleEvaluation with
+    the flags and the requested output intermediates in the original row order.
+    """
+    engine = getattr(importlib.import_module(engine_module), engine_name)
+    seed = resolve_seed(seed)  # Every partition draws from the same seed
+    if len(df) == 0:
+        return engine.evaluate(df, seed=seed)
+    max_workers = max_workers or os.cpu_count()
+    num_partitions = num_partitions or max_workers
+    trackers_by_entity = {}
+    for tracker in engine.entity_trackers:
+        trackers_by_entity.setdefault(tracker.keys[0], []).append(tracker)
+    primary_entity = max(trackers_by_entity, key=lambda entity: len(trackers_by_entity[entity]), default=None)
+    print(f"Evaluating {len(engine.rules)} rules in {num_partitions} partitions on {max_workers} workers...")
+
+    known = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_labeling_worker,
+                             initargs=(engine_module, engine_name)) as executor:
+        # Shuffle once per secondary entity: its grouped values need all of its rows in one partition
+        for entity, trackers in trackers_by_entity.items():
+            if entity == primary_entity:
+                continue
+            columns = list(dict.fromkeys(column for tracker in trackers
+                                         for column in tracker.keys + ([tracker.column] if tracker.column else [])))
+            partitions = hash_partitions(df[entity], num_partitions)
+            specs = [{'frame': df[columns].iloc[positions], 'names': [tracker.name for tracker in trackers]}
+                     for positions in partitions]
+            known.update(scatter(executor.map(compute_partition_values, specs), partitions, len(df)))
+
+        # Evaluate every rule on partitions of the primary entity
+        partitions = hash_partitions(df[primary_entity], num_partitions) if primary_entity is not None else \
+            np.array_split(np.arange(len(df)), min(num_partitions, len(df)))
+        specs = [{'frame': df[engine.required_columns].iloc[positions],
+                  'known': {name: values[positions] for name, values in known.items()},
+                  'outputs': list(outputs), 'seed': seed} for positions in partitions]
+        partition_results = list(executor.map(evaluate_partition, specs))
+
+    evaluation = RuleEvaluation(df, seed=seed)
+    flags = scatter([flags for flags, _ in partition_results], partitions, len(df))
+    evaluation.flags = {rule.name: flags[rule.name] for rule in engine.rules}
+    evaluation.values.update(scatter([values for _, values in partition_results], partitions, len(df)))
+    return evaluation
@@ -26,6 +26,7 @@ dtypes = {
     'INJURY_SEVERITY': 'category',
     'DAYS_LOST': 'float64',
     'CLM_FRAUD_IND': 'int8',
+    'FRAUD_RULE_MASK': 'uint64',
     'INSURED_CUST_ADDR': 'str',
     'INSURED_CUST_STATE': 'category',
     'CLAIMANT_CUST_FRST_NM': 'str',
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+# Rule flags are packed into one uint64 per row, so a rule set holds at most 64 flags
+MAX_FLAGS = 64
+
+
+def pack_flags(flags, names=None):
+    """
+    Pack boolean flags into one uint64 mask per row: bit i is set when flag names[i] is true.
+    flags is a DataFrame or a mapping of name -> array; names defaults to its key order.
+    """
+    names = list(flags.keys()) if names is None else list(names)
+    if len(names) > MAX_FLAGS:
+        raise ValueError(f"Cannot pack {len(names)} flags into a {MAX_FLAGS}-bit mask")
+    masks = None
+    for bit, name in enumerate(names):
+        flag = np.asarray(flags[name]).astype(bool).astype(np.uint64)
+        masks = flag << np.uint64(bit) if masks is None else masks | (flag << np.uint64(bit))
+    return masks if masks is not None else np.zeros(0, dtype=np.uint64)
+
+
+def as_masks(values):
+    """Mask column values (e.g. int64 or float as read back from CSV) as a uint64 array."""
+    if isinstance(values, np.ndarray) and values.dtype == np.uint64:
+        return values
+    return np.asarray(pd.to_numeric(pd.Series(values)).fillna(0), dtype=np.uint64)
+
+
+def popcount(masks):
+    """Number of set flags per row."""
+    return np.bitwise_count(as_masks(masks)).astype(np.int64)
+
+
+def test_bit(masks, bit):
+    """Whether flag number bit is set in every row."""
+    return (as_masks(masks) >> np.uint64(bit)) & np.uint64(1) == 1
+
+
+def test_flag(masks, names, name):
+    """Whether the flag called name (out of the packed names) is set in every row."""
+    return test_bit(masks, list(names).index(name))
+
+
+def decode_reasons(masks, names, separator=', '):
+    """
+    Reason string per row, listing the names of its set flags.
+    Masks are factorized first, so each distinct flag combination is joined only once.
+    """
+    codes, unique_masks = pd.factorize(as_masks(masks))
+    reasons = np.array([
+        separator.join(name for bit, name in enumerate(names) if (int(mask) >> bit) & 1) for mask in unique_masks
+    ], dtype=object)
+    return reasons[codes]
+
+
+def expand_flags(masks, names, dtype=np.int8, index=None):
+    """Unpack masks into one 0/1 column per flag name, e.g. for model features or display."""
+    masks = as_masks(masks)
+    return pd.DataFrame({name: test_bit(masks, bit).astype(dtype) for bit, name in enumerate(names)}, index=index)
@@ -0,0 +1,351 @@
+import csv
+import json
+import os
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from entity_state import EntityTracker
+from rule_bitmask import pack_flags
+from seeded_draws import resolve_seed, row_keys, row_uniforms
+from segmented_groups import GroupSegments, combine_codes, factorize_column
+
+
+class Intermediate:
+    """
+    A named value shared by rules, e.g. a date difference or a group count.
+    compute receives the RuleEvaluation and returns one value per input row; uses lists the
+    columns and intermediates it reads, so the engine can order and deduplicate the work;
+    requires lists intermediates it builds on that the engine registers alongside it; tracker, if
+    set, is the EntityTracker that can supply its values incrementally from an EntityStateStore.
+    """
+
+    def __init__(self, name, compute, uses=(), requires=(), tracker=None):
+        self.name = name
+        self.compute = compute
+        self.uses = list(uses)
+        self.requires = list(requires)
+        self.tracker = tracker
+
+
+class Rule:
+    """
+    Declarative rule spec, declared once and evaluated by a RuleEngine.
+    Row rules give a predicate over columns and intermediates (listed in uses). Grouped rules give
+    group_by keys and an aggregate ('count' of rows or 'nunique' of column) and flag every row whose
+    group aggregate exceeds threshold; their key codes, groupings and aggregates are shared intermediates.
+    """
+
+    def __init__(self, name, description, predicate=None, uses=(), group_by=None, aggregate='count', column=None,
+                 threshold=None):
+        self.name = name
+        self.description = description
+        self.group_by = list(group_by) if group_by is not None else None
+        if self.group_by is None:
+            self.predicate = predicate
+            self.uses = list(uses)
+        else:
+            self.aggregate = group_aggregate(self.group_by, aggregate, column)
+            self.predicate = lambda values: values[self.aggregate.name] > threshold
+            self.uses = [self.aggregate.name]
+
+
+def group_segments_name(keys):
+    return f"groups[{','.join(keys)}]"
+
+
+def group_aggregate_name(keys, aggregate, column=None):
+    return f"{aggregate}[{','.join(keys)}]" + (f"({column})" if column else '')
+
+
+def column_codes(column):
+    """Intermediate: dense codes of a column, factorized once and shared by every grouping that uses it."""
+    return Intermediate(f"codes[{column}]", lambda values: factorize_column(values[column]), uses=[column])
+
+
+def group_segments(keys):
+    """Intermediate: GroupSegments of the rows over the given entity keys (rows with a missing key are ungrouped)."""
+    code_names = [f"codes[{key}]" for key in keys]
+    return Intermediate(group_segments_name(keys),
+                        lambda values: GroupSegments(combine_codes([values[name] for name in code_names])),
+                        uses=code_names, requires=[column_codes(key) for key in keys])
+
+
+def group_aggregate(keys, aggregate, column=None):
+    """Intermediate: the rows' group size ('count') or distinct values of column ('nunique')."""
+    segments_name = group_segments_name(keys)
+    name = group_aggregate_name(keys, aggregate, column if aggregate == 'nunique' else None)
+    if aggregate == 'count':
+        return Intermediate(name, lambda values: values[segments_name].count(),
+                            uses=[segments_name], requires=[group_segments(keys)],
+                            tracker=EntityTracker(name, 'count', keys))
+    if aggregate == 'nunique':
+        return Intermediate(name, lambda values: values[segments_name].nunique(values[f"codes[{column}]"]),
+                            uses=[segments_name, f"codes[{column}]"],
+                            requires=[group_segments(keys), column_codes(column)],
+                            tracker=EntityTracker(name, 'nunique', keys, column))
+    raise ValueError(f"Unknown group aggregate '{aggregate}'")
+
+
+def previous_in_group(name, keys, column):
+    """Intermediate: the previous row's value of column within the group (file order), NaN for the first."""
+    segments_name = group_segments_name(keys)
+    return Intermediate(name,
+                        lambda values: pd.Series(values[segments_name].shift(values[column]), index=values.df.index),
+                        uses=[segments_name, column], requires=[group_segments(keys)],
+                        tracker=EntityTracker(name, 'last', keys, column))
+
+
+def whole_days(deltas):
+    """Whole days of a timedelta column or of a single timedelta (NaN when missing)."""
+    return deltas.dt.days if isinstance(deltas, pd.Series) else deltas.days
+
+
+def weekday(timestamps):
+    """Day of the week (Monday=0) of a datetime column or of a single timestamp."""
+    return timestamps.dt.weekday if isinstance(timestamps, pd.Series) else timestamps.weekday()
+
+
+def hour(timestamps):
+    """Hour of a datetime column or of a single timestamp."""
+    return timestamps.dt.hour if isinstance(timestamps, pd.Series) else timestamps.hour
+
+
+def is_in(values, options):
+    """Membership test of a column or of a single value."""
+    return values.isin(options) if isinstance(values, pd.Series) else values in options
+
+
+def between(values, low, high):
+    """low <= values <= high, for a column or a single value (False when missing)."""
+    return (values >= low) & (values <= high)
+
+
+def day_difference(name, later, earlier):
+    """Intermediate: whole days between two date columns (later - earlier)."""
+    return Intermediate(name, lambda values: whole_days(values[later] - values[earlier]), uses=[later, earlier])
+
+
+class RuleEvaluation:
+    """
+    Values of one evaluation: input columns, computed intermediates and the resulting rule flags.
+    Indexing by name returns an intermediate if one was computed (or supplied), else the input column.
+    """
+
+    def __init__(self, df, known=None, seed=None):
+        self.df = df
+        self.seed = resolve_seed(seed)  # Unseeded evaluations draw fresh values
+        self.values = dict(known or {})
+        self.flags = {}
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        return self.df[name]
+
+    def uniforms(self, stream):
+        """One seeded uniform draw per row, keyed by claim ID so chunks, partitions and batches draw alike."""
+        return row_uniforms(self.seed, stream, row_keys(self.df, self.df.index))
+
+    def to_frame(self, dtype=np.int64):
+        """Rule flags as DataFrame columns in rule order, aligned with the input index."""
+        return pd.DataFrame({name: flag.astype(dtype) for name, flag in self.flags.items()}, index=self.df.index)
+
+    def to_masks(self):
+        """Rule flags packed into one uint64 per row, bit i being the i-th rule."""
+        return pack_flags(self.flags)
+
+
+class RecordEvaluation:
+    """
+    Values of the evaluation of a single claim record (a mapping of column -> scalar).
+    Rules and intermediates see scalars instead of columns, so the same specs serve both paths.
+    """
+
+    def __init__(self, record, known=None, seed=None):
+        self.record = record
+        self.seed = resolve_seed(seed)  # Unseeded evaluations draw fresh values
+        self.values = dict(known or {})
+        self.flags = {}
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        return self.record[name]
+
+    def uniforms(self, stream):
+        """A single seeded uniform draw for the record, keyed by its claim ID like the rows of a frame."""
+        return row_uniforms(self.seed, stream, row_keys(self.record, np.zeros(1, dtype=np.int64)))[0]
+
+    def fired(self, rules):
+        """The given rules (in order) whose flag is set."""
+        return [rule for rule in rules if self.flags[rule.name]]
+
+
+class RuleProfile:
+    """
+    Wall time, allocated memory and hit count of every rule and intermediate, accumulated over one or
+    more evaluations (e.g. the chunks of a run). Memory is the peak traced by tracemalloc while the
+    step runs, above what was allocated before it; hits are set flags (or true values of boolean
+    intermediates). Tracing memory slows evaluation down, so it can be turned off.
+    """
+
+    fields = ['kind', 'name', 'calls', 'rows', 'seconds', 'peak_allocated_bytes', 'hits', 'hit_rate']
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.steps = {}
+
+    def measure(self, kind, name, compute, rows):
+        """Run compute() and record its cost under name; returns its result."""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = compute()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - allocated_before if self.trace_memory else None
+
+        values = np.asarray(result) if kind == 'rule' or isinstance(result, (pd.Series, np.ndarray)) else None
+        hits = int(np.count_nonzero(values)) if values is not None and values.dtype == bool else None
+        step = self.steps.setdefault(name, {'kind': kind, 'name': name, 'calls': 0, 'rows': 0, 'seconds': 0.0,
+                                            'peak_allocated_bytes': None, 'hits': None})
+        step['calls'] += 1
+        step['rows'] += rows
+        step['seconds'] += seconds
+        if peak is not None:
+            step['peak_allocated_bytes'] = max(step['peak_allocated_bytes'] or 0, peak)
+        if hits is not None:
+            step['hits'] = (step['hits'] or 0) + hits
+        return result
+
+    def report(self):
+        """One entry per rule and intermediate, most expensive first."""
+        entries = []
+        for step in self.steps.values():
+            hit_rate = step['hits'] / step['rows'] if step['hits'] is not None and step['rows'] else None
+            entries.append(dict(step, hit_rate=hit_rate))
+        return sorted(entries, key=lambda entry: entry['seconds'], reverse=True)
+
+    def write(self, path_prefix):
+        """Write the report as <path_prefix>.json and <path_prefix>.csv; returns both paths."""
+        report = self.report()
+        json_path, csv_path = f"{path_prefix}.json", f"{path_prefix}.csv"
+        with open(json_path, 'w') as f:
+            json.dump({'total_seconds': sum(entry['seconds'] for entry in report), 'steps': report}, f, indent=2)
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fields)
+            writer.writeheader()
+            writer.writerows(report)
+        return json_path, csv_path
+
+
+def profile_path_prefix(output_path):
+    """Location of the rule profile report written next to a labeled output file."""
+    return f"{os.path.splitext(output_path)[0]}_rule_profile"
+
+
+class RuleEngine:
+    """
+    Compiles rule specs into an evaluation plan.
+    Every intermediate needed by any rule (including the group codes and aggregates of grouped
+    rules) is computed exactly once, in dependency order, before all rule predicates run as
+    vectorized expressions. Cost therefore grows with the number of distinct intermediates rather
+    than with the number of rules; identical group keys or aggregates are shared between rules.
+    """
+
+    def __init__(self, rules, intermediates=()):
+        self.rules = list(rules)
+        self.intermediates = {}
+        for intermediate in intermediates:
+            self.add_intermediate(intermediate)
+        for rule in self.rules:
+            if rule.group_by is not None:
+                self.add_intermediate(rule.aggregate)
+        self.plan = self.compile()
+        # A single record is not grouped: tracked intermediates come from known values or the record alone
+        self.record_plan = self.compile(known={tracker.name for tracker in self.entity_trackers})
+
+    def add_intermediate(self, intermediate):
+        """Register an intermediate and the ones it requires; the first one registered under a name wins."""
+        if intermediate.name in self.intermediates:
+            return
+        self.intermediates[intermediate.name] = intermediate
+        for required in intermediate.requires:
+            self.add_intermediate(required)
+
+    def compile(self, known=(), targets=None):
+        """
+        Intermediates required by the rules (or by the targets intermediates), in dependency order,
+        each listed once; known ones and what only they need are excluded.
+        """
+        plan = []
+
+        def visit(name):
+            if name in plan or name in known or name not in self.intermediates:
+                return
+            for dependency in self.intermediates[name].uses:
+                visit(dependency)
+            plan.append(name)
+
+        for name in targets if targets is not None else [name for rule in self.rules for name in rule.uses]:
+            visit(name)
+        return plan
+
+    @property
+    def entity_trackers(self):
+        """Trackers of the planned intermediates that an EntityStateStore can supply incrementally."""
+        return [self.intermediates[name].tracker for name in self.plan if self.intermediates[name].tracker is not None]
+
+    @property
+    def required_columns(self):
+        """Input columns read by the rules and their intermediates."""
+        names = [name for rule in self.rules for name in rule.uses]
+        names += [name for intermediate in self.intermediates.values() for name in intermediate.uses]
+        return list(dict.fromkeys(name for name in names if name not in self.intermediates))
+
+    def evaluate(self, df, known=None, profile=None, seed=None):
+        """
+        Evaluate all rules on df in one pass. known maps intermediate names to precomputed values
+        (e.g. entity aggregates from an EntityStateStore); those intermediates, and any intermediates
+        only they need, are not computed. A RuleProfile records the cost and hits of every step.
+        seed fixes the per-row random draws of sampling rules (see seeded_draws.row_uniforms).
+        """
+        evaluation = RuleEvaluation(df, known, seed)
+
+        def run(kind, name, compute):
+            return compute() if profile is None else profile.measure(kind, name, compute, len(df))
+
+        for name in self.compile(evaluation.values) if known else self.plan:
+            intermediate = self.intermediates[name]
+            evaluation.values[name] = run('intermediate', name, lambda: intermediate.compute(evaluation))
+        for rule in self.rules:
+            evaluation.flags[rule.name] = run('rule', rule.name,
+                                              lambda: np.asarray(rule.predicate(evaluation), dtype=bool))
+        return evaluation
+
+    def compute(self, df, names, known=None, seed=None):
+        """Only the named intermediates for df (and what they need), e.g. the grouped values of one entity."""
+        evaluation = RuleEvaluation(df, known, seed)
+        for name in self.compile(evaluation.values, targets=names):
+            evaluation.values[name] = self.intermediates[name].compute(evaluation)
+        return {name: evaluation[name] for name in names}
+
+    def evaluate_record(self, record, known=None, seed=None):
+        """
+        Evaluate all rules on one claim record without building a frame. record maps every column in
+        required_columns to a scalar (NaN/NaT when missing). Grouped values (previous claim, counts) are
+        taken from known, e.g. EntityStateStore.values of the claim, or else from the claim by itself.
+        """
+        evaluation = RecordEvaluation(record, known, seed)
+        for tracker in self.entity_trackers:
+            if tracker.name not in evaluation.values:
+                evaluation.values[tracker.name] = tracker.record_value(record)
+        for name in self.record_plan:
+            if name not in evaluation.values:
+                evaluation.values[name] = self.intermediates[name].compute(evaluation)
+        for rule in self.rules:
+            evaluation.flags[rule.name] = bool(rule.predicate(evaluation))
+        return evaluation
@@ -0,0 +1,46 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Claim identifier columns that key the draws, in order of preference
+claim_key_columns = ['CLM_DTL_ID', 'CLM_NO']
+
+
+def resolve_seed(seed=None):
+    """The given seed, or a fresh random one, so every part of a run draws from the same seed."""
+    return int(np.random.SeedSequence(seed).entropy)
+
+
+def row_uniforms(seed, stream, row_keys):
+    """
+    One uniform draw in [0, 1) per row, a pure function of (seed, stream, row key): rows keep their
+    draw whether the data is processed whole, in chunks, in partitions or in later batches. row_keys
+    are typically claim identifiers (see row_keys); stream names the use, so different uses are independent.
+    """
+    salt = np.uint64(int.from_bytes(hashlib.sha256(f"{seed}:{stream}".encode()).digest()[:8], 'little'))
+    bits = pd.util.hash_array(np.asarray(row_keys), categorize=False) ^ salt
+    # splitmix64 finalizer: numeric keys ignore hash_array's hash_key, so the seed is mixed in here
+    bits ^= bits >> np.uint64(30)
+    bits *= np.uint64(0xBF58476D1CE4E5B9)
+    bits ^= bits >> np.uint64(27)
+    bits *= np.uint64(0x94D049BB133111EB)
+    bits ^= bits >> np.uint64(31)
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def row_keys(values, default):
+    """
+    Keys of the draws of a frame's rows (or of one record): its first claim identifier column with
+    any value, so a claim keeps its draws when rows are filtered, reordered or arrive in another
+    batch; default (e.g. the row labels) when there is none. Rows of the same claim, one per injury,
+    share their draws.
+    """
+    for column in claim_key_columns:
+        if column in values and not np.all(pd.isna(values[column])):
+            keys = np.atleast_1d(np.asarray(values[column]))
+            if keys.dtype.kind == 'U':
+                keys = keys.astype(object)  # A single record's string ID, hashed like a column of them
+            if keys.dtype.kind == 'f' and not np.isnan(keys).any():
+                keys = keys.astype(np.int64)  # Same hash whether a chunk parsed the IDs as ints or floats
+            return keys
+    return default
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from dimension_join import column_values
+
+
+def factorize_column(values):
+    """Dense integer codes of a column's values, -1 for missing values."""
+    codes, _ = pd.factorize(values if isinstance(values, pd.Series) else pd.Series(values))
+    return codes.astype(np.int64)
+
+
+def combine_codes(code_arrays):
+    """Dense codes of the combination of several code arrays; -1 where any part is missing."""
+    combined = np.asarray(code_arrays[0], dtype=np.int64)
+    if len(combined) == 0:
+        return combined
+    for codes in code_arrays[1:]:
+        codes = np.asarray(codes, dtype=np.int64)
+        present = (combined >= 0) & (codes >= 0)
+        pairs = combined[present] * (int(codes.max()) + 1) + codes[present]
+        combined = np.full(len(codes), -1, dtype=np.int64)
+        combined[present] = pd.factorize(pairs)[0]
+    return combined
+
+
+def stable_code_order(codes, num_codes):
+    """
+    Stable argsort of non-negative integer codes below num_codes, as an LSD radix sort over
+    16-bit digits (numpy radix-sorts 16-bit keys), i.e. linear in the number of rows.
+    """
+    order = np.arange(len(codes))
+    if num_codes <= 1:
+        return order  # A single code (or none) is already in order
+    shift = 0
+    while shift < (num_codes - 1).bit_length():
+        digits = ((codes[order] >> shift) & 0xFFFF).astype(np.uint16)
+        order = order[np.argsort(digits, kind='stable')]
+        shift += 16
+    return order
+
+
+class GroupSegments:
+    """
+    Rows grouped by a (possibly compound) entity key, given as dense group codes.
+    Counts and distinct counts are bincounts over the codes; order-dependent operations (shift,
+    diff) use a single stable radix sort by code, done lazily and shared by every column shifted
+    within this grouping. Rows with a missing key (-1) belong to no group, as in pandas groupby.
+    """
+
+    def __init__(self, codes):
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.grouped = self.codes >= 0
+        self.num_groups = int(self.codes.max()) + 1 if len(self.codes) else 0
+        self.previous_rows = None
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Group rows by the combination of the given columns."""
+        return cls(combine_codes([factorize_column(column) for column in columns]))
+
+    def broadcast(self, group_values, fill=0):
+        """Per-group values spread back to the rows of each group (fill for ungrouped rows)."""
+        result = np.full(len(self.codes), fill, dtype=np.asarray(group_values).dtype)
+        result[self.grouped] = group_values[self.codes[self.grouped]]
+        return result
+
+    def sizes(self):
+        return np.bincount(self.codes[self.grouped], minlength=self.num_groups)
+
+    def count(self):
+        """Size of each row's group (0 for ungrouped rows)."""
+        return self.broadcast(self.sizes())
+
+    def sums(self, values):
+        """Sum of each group's values (missing values count as 0); integer for integer or boolean values."""
+        values = values if isinstance(values, pd.Series) else pd.Series(values)
+        weights = values.fillna(0).to_numpy(dtype=np.float64)
+        sums = np.bincount(self.codes[self.grouped], weights=weights[self.grouped], minlength=self.num_groups)
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+            return sums.astype(np.int64)
+        return sums
+
+    def nunique(self, value_codes):
+        """Number of distinct non-missing values (given as codes) in each row's group."""
+        value_codes = np.asarray(value_codes, dtype=np.int64)
+        rows = self.grouped & (value_codes >= 0)
+        pairs = combine_codes([self.codes[rows], value_codes[rows]])
+        pair_groups = np.zeros(int(pairs.max()) + 1 if len(pairs) else 0, dtype=np.int64)
+        pair_groups[pairs] = self.codes[rows]  # Every row of a pair belongs to the same group
+        return self.broadcast(np.bincount(pair_groups, minlength=self.num_groups))
+
+    def previous_positions(self):
+        """Row position of the previous row of the same group in file order, -1 for a group's first row."""
+        if self.previous_rows is None:
+            order = np.flatnonzero(self.grouped)
+            order = order[stable_code_order(self.codes[order], self.num_groups)]
+            sorted_codes = self.codes[order]
+            group_starts = np.ones(len(order), dtype=bool)
+            group_starts[1:] = sorted_codes[1:] != sorted_codes[:-1]
+            previous = np.empty(len(order), dtype=np.int64)
+            previous[1:] = order[:-1]
+            previous[group_starts] = -1
+            self.previous_rows = np.full(len(self.codes), -1, dtype=np.int64)
+            self.previous_rows[order] = previous
+        return self.previous_rows
+
+    def shift(self, values):
+        """Value of the previous row of the same group (missing for a group's first row), like groupby().shift(1)."""
+        values = values if isinstance(values, pd.Series) else pd.Series(values)
+        return pd.api.extensions.take(column_values(values), self.previous_positions(), allow_fill=True)
+
+    def diff(self, values):
+        """Difference to the previous row of the same group, like groupby().diff()."""
+        values = values if isinstance(values, pd.Series) else pd.Series(values)
+        return values.to_numpy() - self.shift(values)
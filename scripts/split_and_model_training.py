@@ -9,6 +9,8 @@ from xgboost import XGBClassifier
 import joblib
 import shap
 import streamlit as st
+from labeling_rules import labeling_rule_names
+from rule_bitmask import expand_flags
 
 
 # Paths
@@ -21,6 +23,10 @@ print("Loading cleaned dataset...")
 df = pd.read_csv(INPUT_FILE, parse_dates=['CLM_RPT_DT', 'CLM_OCCR_DT', 'PLCY_STRT_DT', 'PLCY_END_DT'], low_memory=False)
 print(f"Data loaded. Shape: {df.shape}")
 
+# Expand the packed rule flags into one feature column per rule
+df = df.drop(columns=['FRAUD_RULE_MASK']).join(
+    expand_flags(df['FRAUD_RULE_MASK'], labeling_rule_names, dtype='int64', index=df.index))
+
 # Extract useful features from datetime columns
 df['CLM_RPT_YEAR'] = df['CLM_RPT_DT'].dt.year
 df['CLM_RPT_MONTH'] = df['CLM_RPT_DT'].dt.month
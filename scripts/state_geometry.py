@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+#  Neighboring State Logic (land borders of the 50 states and DC; territories have none)
+neighboring_states = {
+    'AL': ['FL', 'GA', 'MS', 'TN'],
+    'AK': [],
+    'AZ': ['CA', 'CO', 'NM', 'NV', 'UT'],
+    'AR': ['LA', 'MO', 'MS', 'OK', 'TN', 'TX'],
+    'CA': ['AZ', 'NV', 'OR'],
+    'CO': ['AZ', 'KS', 'NE', 'NM', 'OK', 'UT', 'WY'],
+    'CT': ['MA', 'NY', 'RI'],
+    'DE': ['MD', 'NJ', 'PA'],
+    'DC': ['MD', 'VA'],
+    'FL': ['AL', 'GA'],
+    'GA': ['AL', 'FL', 'NC', 'SC', 'TN'],
+    'HI': [],
+    'ID': ['MT', 'NV', 'OR', 'UT', 'WA', 'WY'],
+    'IL': ['IA', 'IN', 'KY', 'MO', 'WI'],
+    'IN': ['IL', 'KY', 'MI', 'OH'],
+    'IA': ['IL', 'MN', 'MO', 'NE', 'SD', 'WI'],
+    'KS': ['CO', 'MO', 'NE', 'OK'],
+    'KY': ['IL', 'IN', 'MO', 'OH', 'TN', 'VA', 'WV'],
+    'LA': ['AR', 'MS', 'TX'],
+    'ME': ['NH'],
+    'MD': ['DC', 'DE', 'PA', 'VA', 'WV'],
+    'MA': ['CT', 'NH', 'NY', 'RI', 'VT'],
+    'MI': ['IN', 'OH', 'WI'],
+    'MN': ['IA', 'ND', 'SD', 'WI'],
+    'MS': ['AL', 'AR', 'LA', 'TN'],
+    'MO': ['AR', 'IA', 'IL', 'KS', 'KY', 'NE', 'OK', 'TN'],
+    'MT': ['ID', 'ND', 'SD', 'WY'],
+    'NE': ['CO', 'IA', 'KS', 'MO', 'SD', 'WY'],
+    'NV': ['AZ', 'CA', 'ID', 'OR', 'UT'],
+    'NH': ['MA', 'ME', 'VT'],
+    'NJ': ['DE', 'NY', 'PA'],
+    'NM': ['AZ', 'CO', 'OK', 'TX'],
+    'NY': ['CT', 'MA', 'NJ', 'PA', 'VT'],
+    'NC': ['GA', 'SC', 'TN', 'VA'],
+    'ND': ['MN', 'MT', 'SD'],
+    'OH': ['IN', 'KY', 'MI', 'PA', 'WV'],
+    'OK': ['AR', 'CO', 'KS', 'MO', 'NM', 'TX'],
+    'OR': ['CA', 'ID', 'NV', 'WA'],
+    'PA': ['DE', 'MD', 'NJ', 'NY', 'OH', 'WV'],
+    'RI': ['CT', 'MA'],
+    'SC': ['GA', 'NC'],
+    'SD': ['IA', 'MN', 'MT', 'ND', 'NE', 'WY'],
+    'TN': ['AL', 'AR', 'GA', 'KY', 'MO', 'MS', 'NC', 'VA'],
+    'TX': ['AR', 'LA', 'NM', 'OK'],
+    'UT': ['AZ', 'CO', 'ID', 'NV', 'WY'],
+    'VT': ['MA', 'NH', 'NY'],
+    'VA': ['DC', 'KY', 'MD', 'NC', 'TN', 'WV'],
+    'WA': ['ID', 'OR'],
+    'WV': ['KY', 'MD', 'OH', 'PA', 'VA'],
+    'WI': ['IA', 'IL', 'MI', 'MN'],
+    'WY': ['CO', 'ID', 'MT', 'NE', 'SD', 'UT'],
+    # Territories and freely associated states (Faker's state_abbr also yields these)
+    'AS': [], 'FM': [], 'GU': [], 'MH': [], 'MP': [], 'PR': [], 'PW': [], 'VI': []
+}
+
+
+class StateGeometry:
+    """
+    States factorized into integer codes with a boolean adjacency matrix and a matrix of border
+    crossings (hops) between every pair of states. Neighbor and distance features of state columns are
+    then fancy-indexing lookups over the codes instead of per-row dict lookups. Unknown or missing
+    states get the last code, which borders nothing and is unreachable (hops -1).
+    Lookups accept columns, arrays or single state codes, so rules and the dashboard can share them.
+    """
+
+    def __init__(self, neighbors=neighboring_states):
+        self.states = list(neighbors)
+        self.unknown = len(self.states)
+        adjacency = np.zeros((self.unknown + 1, self.unknown + 1), dtype=bool)
+        codes = {state: code for code, state in enumerate(self.states)}
+        for state, bordering in neighbors.items():
+            for neighbor in bordering:
+                adjacency[codes[state], codes[neighbor]] = adjacency[codes[neighbor], codes[state]] = True
+        self.adjacency = adjacency
+        self.hops = self.border_crossings(adjacency)
+
+    @staticmethod
+    def border_crossings(adjacency):
+        """Fewest border crossings between every pair of states (breadth-first over the matrix), -1 if none."""
+        hops = np.where(np.eye(len(adjacency), dtype=bool), 0, -1).astype(np.int16)
+        reached = np.eye(len(adjacency), dtype=bool)
+        frontier = reached.copy()
+        distance = 0
+        while frontier.any():
+            distance += 1
+            frontier = (frontier.astype(np.uint8) @ adjacency.astype(np.uint8)).astype(bool) & ~reached
+            hops[frontier] = distance
+            reached |= frontier
+        hops[-1, -1] = -1  # Unknown states are not the same state as each other
+        return hops
+
+    def codes(self, states):
+        """Integer code of each state (the unknown code for missing or unrecognized values)."""
+        if np.ndim(states) == 0:
+            return self.codes([states])[0]
+        codes = pd.Categorical(np.asarray(states, dtype=object), categories=self.states).codes.astype(np.int64)
+        return np.where(codes < 0, self.unknown, codes)
+
+    def are_neighbors(self, first, second, include_same=True):
+        """Whether two state columns border each other (or, with include_same, are the same state)."""
+        neighbors = self.adjacency[self.codes(first), self.codes(second)]
+        if include_same:
+            neighbors = neighbors | (np.asarray(first, dtype=object) == np.asarray(second, dtype=object))
+        return neighbors
+
+    def border_hops(self, first, second):
+        """Border crossings between two state columns: 0 same state, 1 neighbors, -1 unknown or no land route."""
+        return self.hops[self.codes(first), self.codes(second)]
+
+
+# Shared geometry of the US states, built once per process
+us_state_geometry = StateGeometry()
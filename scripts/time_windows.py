@@ -0,0 +1,76 @@
+import numpy as np
+from holiday_calendar import day_ordinals
+from segmented_groups import GroupSegments, combine_codes, factorize_column
+
+
+class EntityTimeline:
+    """
+    Claims of each entity sorted once by date, for sliding time-window aggregates of any window size.
+    Rows are ordered by one composite integer key (entity code, day), so the claims in a window are a
+    contiguous range of the sorted rows found with searchsorted: counts are differences of the bounds,
+    sums differences of prefix sums, and distinct counts a difference array over the same order.
+    Every window size reuses the single O(n log n) sort.
+    A window of N days ends on the claim's date and includes it (and the entity's other claims of that
+    day); rows with a missing entity key or date belong to no timeline and get 0.
+    """
+
+    def __init__(self, keys, dates):
+        entity_codes = combine_codes([factorize_column(key) for key in keys])
+        days = day_ordinals(dates, missing=np.iinfo(np.int64).min)
+        rows = np.flatnonzero((entity_codes >= 0) & (days != np.iinfo(np.int64).min))
+        self.num_rows = len(entity_codes)
+        first_day = int(days[rows].min()) if len(rows) else 0
+        offsets = days[rows] - first_day
+        self.stride = int(offsets.max()) + 1 if len(rows) else 1  # Days spanned: keys of two entities never overlap
+        composite = entity_codes[rows] * self.stride + offsets
+        order = np.argsort(composite, kind='stable')
+        self.rows = rows[order]
+        self.keys = composite[order]
+        self.offsets = offsets[order]
+        self.entity_codes = entity_codes[self.rows]
+        self.entity_starts = self.keys - self.offsets  # Key of day 0 of each sorted row's entity
+
+    def bounds(self, window_days):
+        """Range [lower, upper) of sorted rows in each sorted row's window."""
+        window_starts = self.entity_starts + np.maximum(self.offsets - (window_days - 1), 0)
+        lower = np.searchsorted(self.keys, window_starts, side='left')
+        return lower, np.searchsorted(self.keys, self.keys, side='right')
+
+    def scatter(self, sorted_values):
+        """Values of the sorted rows back in the original row order (0 for rows without a timeline)."""
+        result = np.zeros(self.num_rows, dtype=sorted_values.dtype)
+        result[self.rows] = sorted_values
+        return result
+
+    def count(self, window_days):
+        """Claims of each row's entity in the window_days days ending on the row's date."""
+        lower, upper = self.bounds(window_days)
+        return self.scatter(upper - lower)
+
+    def sum(self, values, window_days):
+        """Sum of values (missing as 0) over each row's window, from prefix sums in timeline order."""
+        sorted_values = np.nan_to_num(np.asarray(values, dtype=np.float64)[self.rows])
+        prefix = np.concatenate([[0.0], np.cumsum(sorted_values)])
+        lower, upper = self.bounds(window_days)
+        return self.scatter(prefix[upper] - prefix[lower])
+
+    def nunique(self, values, window_days):
+        """
+        Distinct non-missing values (e.g. providers) over each row's window. A claim adds its value to the
+        windows ending from its own day until window_days - 1 days later, but not to those that still
+        hold the previous claim with the same value: an interval of sorted rows per claim, summed with
+        a difference array.
+        """
+        value_codes = factorize_column(values)[self.rows]
+        present = value_codes >= 0
+        pairs = GroupSegments(combine_codes([self.entity_codes, value_codes]))
+        previous = pairs.previous_positions()  # Previous claim of the same entity and value, by date
+        first_keys = np.where(previous >= 0, np.maximum(self.keys, self.keys[np.maximum(previous, 0)] + window_days),
+                              self.keys)
+        last_keys = np.minimum(self.keys + (window_days - 1), self.entity_starts + self.stride - 1)
+        starts = np.searchsorted(self.keys, first_keys, side='left')
+        ends = np.searchsorted(self.keys, last_keys, side='right')
+        counted = present & (starts < ends)
+        changes = (np.bincount(starts[counted], minlength=len(self.keys) + 1)
+                   - np.bincount(ends[counted], minlength=len(self.keys) + 1))
+        return self.scatter(np.cumsum(changes[:-1]))